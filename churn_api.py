@@ -1,15 +1,112 @@
-from fastapi import FastAPI
+import time
+IMPORT_START_TIME = time.perf_counter()
+
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, UploadFile, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 import pandas as pd
+import os
 import sys
+from dataclasses import asdict
+from datetime import datetime
 
-from src.pydantic_model.pydantinc_model import UserInput
+from src.pydantic_model.pydantinc_model import UserInput, validate_input_frame
 from src.exception.exception import CustomerChurnException
-from src.pipeline.training_pipeline import TrainingPipeline
-from src.utils.ml_utils import preprocess
+from src.logging.logger import logging
+from src.entity.config_entity import TrainingPipelineConfig
+from src.serving.model_registry import ModelRegistry
+from src.serving.drift_monitor import DriftMonitor
+from src.serving.training_jobs import TrainingJobManager
+from src.serving.micro_batcher import MicroBatcher
+from src.serving.prediction_cache import PredictionCache
+from src.serving.metrics import ServingMetrics, MetricsMiddleware
+from src.serving.readiness import ColdStartTracker
+from src.utils.ml_utils import predict_proba_batch
+from src.constant.serving import BATCH_PREDICTION_CHUNK_SIZE, BATCH_PREDICTION_FILE_FORMATS
+
+def run_training(progress_callback)->dict:
+    # Training pulls in every pipeline component, it is only imported once a replica actually trains
+    from src.pipeline.training_pipeline import TrainingPipeline
+
+    # Every job gets its own artifact directory, the registry swaps the new model in once it is written
+    training_pipeline = TrainingPipeline(
+        TrainingPipelineConfig(timestamp=datetime.now()), progress_callback=progress_callback
+    )
+    model_trainer_artifact = training_pipeline.initiate_training_pipeline()
+
+    model_registry.load()
+
+    return asdict(model_trainer_artifact)
+
+def predict_frame(input_data: pd.DataFrame):
+    model_bundle = model_registry.bundle
+
+    if model_bundle.inference_graph is not None:
+        # The graph needs none of the estimators, so they are left pickled
+        encoder = preprocessor = model = None
+    else:
+        encoder, preprocessor, model = model_bundle.encoder, model_bundle.preprocessor, model_bundle.model
+
+    predictions = predict_proba_batch(
+        input_data, encoder, preprocessor, model, BATCH_PREDICTION_CHUNK_SIZE,
+        inference_graph=model_bundle.inference_graph, serving_metrics=serving_metrics
+    )
+
+    drift_monitor.observe_frame(model_bundle.version, model_bundle.reference_profile, input_data)
+
+    return predictions
+
+def predict_records(records: list)->list:
+    model_bundle = model_registry.bundle
+
+    inference_graph = model_bundle.inference_graph
+    if inference_graph is not None:
+        start_time = time.perf_counter()
+        features = inference_graph.impute(inference_graph.encode_records(records))
+        preprocessed_time = time.perf_counter()
+        predictions = inference_graph.predict_transformed(features)
+        serving_metrics.observe_stage("preprocessing", preprocessed_time - start_time)
+        serving_metrics.observe_stage("predict_proba", time.perf_counter() - preprocessed_time)
+
+        drift_monitor.observe_records(model_bundle.version, model_bundle.reference_profile, records)
+
+        return predictions.tolist()
+
+    input_data = pd.DataFrame(records, columns=list(UserInput.model_fields))
+
+    return predict_frame(input_data).tolist()
+
+serving_metrics = ServingMetrics()
+model_registry = ModelRegistry()
+drift_monitor = DriftMonitor()
+training_jobs = TrainingJobManager(run_training)
+micro_batcher = MicroBatcher(predict_records)
+prediction_cache = PredictionCache(tuple(UserInput.model_fields))
+cold_start = ColdStartTracker(IMPORT_START_TIME)
+
+def load_model():
+    try:
+        model_registry.load()
+        cold_start.mark_ready()
+    except Exception as e:
+        # The registry watcher keeps retrying, until then the replica reports itself as not ready
+        logging.info(f"Initial Model Load Failed : {e}")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await micro_batcher.start()
+    # The model loads in the background so the port opens straight away, /ready turns 200 once it is resident
+    model_loader = asyncio.get_running_loop().run_in_executor(None, load_model)
+    model_registry.start_watcher()
+    yield
+    await model_loader
+    await micro_batcher.stop()
+    model_registry.stop_watcher()
+    training_jobs.shutdown()
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 origins = ["*"]
 
 app.add_middleware(
@@ -19,30 +116,212 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"]
 )
+app.add_middleware(MetricsMiddleware, serving_metrics=serving_metrics)
 
 @app.get('/')
 def home():
     return "Customer Churn Predicition API"
 
-@app.get('/train')
+@app.get('/ready')
+def readiness():
+    try:
+        ready = model_registry.is_loaded and micro_batcher.is_running
+        if model_registry.is_loaded:
+            # Covers a model that arrived through the watcher or a training job after a failed first load
+            cold_start.mark_ready()
+
+        return JSONResponse(status_code=200 if ready else 503, content={
+            "ready" : ready,
+            "model_version" : model_registry.bundle.version if model_registry.is_loaded else None,
+            "cold_start" : cold_start.report()
+        })
+    except Exception as e:
+        raise CustomerChurnException(e,sys)
+
+@app.api_route('/train', methods=["GET", "POST"])
 def model_train():
     try:
-        training_pipeline = TrainingPipeline()
-        training_pipeline.initiate_training_pipeline()
+        job, submitted = training_jobs.submit()
+
+        # A run that is already in flight is returned instead of starting a second one
+        return JSONResponse(status_code=202 if submitted else 409, content=job)
+    except Exception as e:
+        raise CustomerChurnException(e,sys)
+
+@app.get('/train/jobs')
+def training_job_list():
+    try:
+        return JSONResponse(status_code=200, content=training_jobs.list())
+    except Exception as e:
+        raise CustomerChurnException(e,sys)
+
+@app.get('/train/jobs/{job_id}')
+def training_job_status(job_id: str):
+    try:
+        job = training_jobs.get(job_id)
+        if job is None:
+            return JSONResponse(status_code=404, content={'error' : f"Unknown training job : {job_id}"})
+
+        return JSONResponse(status_code=200, content=job)
+    except Exception as e:
+        raise CustomerChurnException(e,sys)
+
+@app.get('/train/jobs/{job_id}/progress')
+def training_job_progress(job_id: str):
+    try:
+        job = training_jobs.get(job_id)
+        if job is None:
+            return JSONResponse(status_code=404, content={'error' : f"Unknown training job : {job_id}"})
 
-        return JSONResponse(status_code=200, content="Training Successfully Completed!")
+        return JSONResponse(status_code=200, content={
+            key : job[key] for key in ("job_id", "status", "current_stage", "progress", "stages")
+        })
     except Exception as e:
-        return CustomerChurnException(e,sys)
+        raise CustomerChurnException(e,sys)
+
+@app.get('/model/status')
+def model_status():
+    try:
+        return JSONResponse(status_code=200, content=model_registry.status())
+    except Exception as e:
+        raise CustomerChurnException(e,sys)
 
 @app.post('/predict')
-def churn_prediction(data: UserInput):
+async def churn_prediction(data: UserInput, request: Request):
     try:
-        input_data = pd.DataFrame([data.model_dump()])
+        # Everything between the request arriving and the handler running is body parsing and validation
+        serving_metrics.observe_stage("validation", time.perf_counter() - request.state.request_start_time)
+        model_bundle = model_registry.bundle
+        record = data.model_dump()
 
-        test_data, model = preprocess(input_data)
+        prediction = prediction_cache.get(model_bundle.version, record)
+        cached = prediction is not None
+        if cached:
+            # Repeated payloads still count towards live drift, they are real traffic
+            drift_monitor.observe_record(model_bundle.version, model_bundle.reference_profile, record)
+        else:
+            # Concurrent requests are queued into one vectorized call instead of scoring one row each
+            prediction = await micro_batcher.submit(record)
+            prediction_cache.put(model_bundle.version, record, prediction)
 
-        prediction = model.predict_proba(test_data)[0][1]
+        # Sampled by the logging backend, only one in every LOG_SAMPLE_RATES["prediction"] reaches the queue
+        logging.info("Prediction served", extra={
+            "event" : "prediction", "model_version" : model_bundle.version, "predicted" : prediction, "cached" : cached
+        })
 
         return JSONResponse(status_code=200, content={'predicted' : prediction})
     except Exception as e:
-        raise CustomerChurnException(e,sys)
\ No newline at end of file
+        raise CustomerChurnException(e,sys)
+
+@app.get('/predict/metrics')
+def prediction_metrics():
+    try:
+        return JSONResponse(status_code=200, content=micro_batcher.metrics())
+    except Exception as e:
+        raise CustomerChurnException(e,sys)
+
+@app.get('/metrics')
+def metrics():
+    try:
+        # Registry and batcher state is read at scrape time so the request path pays nothing for it
+        batcher_metrics = micro_batcher.metrics()
+        gauges = [
+            ("churn_micro_batch_queue_depth", "gauge", "Requests waiting for the micro-batcher.",
+             [("", {}, batcher_metrics["queue_depth"])]),
+            ("churn_micro_batch_in_flight", "gauge", "Micro-batches currently being scored.",
+             [("", {}, batcher_metrics["in_flight_batches"])]),
+            ("churn_model_reloads_total", "counter", "Model versions swapped in by the registry.",
+             [("", {}, model_registry.reload_count)]),
+            ("churn_cold_start_seconds", "gauge", "Time from importing the API to the import finishing and to the model being resident.",
+             [("", {"phase" : phase}, seconds) for phase, seconds in (
+                 ("import", cold_start.import_seconds), ("ready", cold_start.ready_seconds)
+             ) if seconds is not None])
+        ]
+        if model_registry.is_loaded:
+            model_bundle = model_registry.bundle
+            gauges.append(
+                ("churn_model_load_seconds", "gauge", "Time taken to load the serving model.",
+                 [("", {"version" : model_bundle.version}, round(model_bundle.load_time, 6))])
+            )
+            gauges.append(
+                ("churn_model_loaded_timestamp_seconds", "gauge", "Unix time the serving model was loaded.",
+                 [("", {"version" : model_bundle.version}, model_bundle.loaded_at.timestamp())])
+            )
+
+        return PlainTextResponse(serving_metrics.render(gauges), media_type="text/plain; version=0.0.4")
+    except Exception as e:
+        raise CustomerChurnException(e,sys)
+
+@app.get('/predict/cache')
+def prediction_cache_stats():
+    try:
+        return JSONResponse(status_code=200, content=prediction_cache.stats())
+    except Exception as e:
+        raise CustomerChurnException(e,sys)
+
+@app.post('/predict/cache/clear')
+def prediction_cache_clear():
+    try:
+        prediction_cache.clear()
+        return JSONResponse(status_code=200, content=prediction_cache.stats())
+    except Exception as e:
+        raise CustomerChurnException(e,sys)
+
+def score_batch(input_data: pd.DataFrame)->JSONResponse:
+    predictions = predict_frame(input_data)
+
+    return JSONResponse(status_code=200, content={'predicted' : predictions.tolist()})
+
+@app.post('/predict/batch')
+def churn_batch_prediction(data: list[UserInput], request: Request):
+    try:
+        serving_metrics.observe_stage("validation", time.perf_counter() - request.state.request_start_time)
+        input_data = pd.DataFrame([record.model_dump() for record in data], columns=list(UserInput.model_fields))
+
+        return score_batch(input_data)
+    except Exception as e:
+        raise CustomerChurnException(e,sys)
+
+@app.post('/predict/batch/file')
+def churn_file_prediction(file: UploadFile):
+    try:
+        file_format = BATCH_PREDICTION_FILE_FORMATS.get(os.path.splitext(file.filename or "")[1].lower())
+        if file_format is None:
+            return JSONResponse(
+                status_code=415, content={'error' : f"Supported file types : {list(BATCH_PREDICTION_FILE_FORMATS)}"}
+            )
+
+        if file_format == "csv":
+            input_data = pd.read_csv(file.file)
+        else:
+            input_data = pd.read_json(file.file, lines=True)
+
+        start_time = time.perf_counter()
+        input_data, errors = validate_input_frame(input_data)
+        serving_metrics.observe_stage("validation", time.perf_counter() - start_time)
+        if errors:
+            return JSONResponse(status_code=422, content=errors)
+
+        return score_batch(input_data)
+    except Exception as e:
+        raise CustomerChurnException(e,sys)
+
+@app.get('/drift')
+def drift_report():
+    try:
+        model_bundle = model_registry.bundle
+        drift_monitor.sync(model_bundle.version, model_bundle.reference_profile)
+
+        return JSONResponse(status_code=200, content=drift_monitor.report())
+    except Exception as e:
+        raise CustomerChurnException(e,sys)
+
+@app.post('/drift/reset')
+def drift_reset():
+    try:
+        drift_monitor.reset()
+        return JSONResponse(status_code=200, content=drift_monitor.report())
+    except Exception as e:
+        raise CustomerChurnException(e,sys)
+
+cold_start.mark_imported()
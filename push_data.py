@@ -1,33 +1,53 @@
 import os
 import sys
-import json
+import time
 import pymongo
 import pandas as pd
 from dotenv import load_dotenv
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from pymongo.errors import BulkWriteError, AutoReconnect, ConnectionFailure, NetworkTimeout
 
 from src.exception.exception import CustomerChurnException
+from src.logging.logger import logging
 from src.constant import training
 
 load_dotenv()
 
 MONGO_DB_URL = os.getenv("MONGO_DB_URL")
 
+DUPLICATE_KEY_ERROR_CODE = 11000
+TRANSIENT_ERRORS = (AutoReconnect, ConnectionFailure, NetworkTimeout)
+
 class CustomerDataExtract:
     def __init__(self):
         try:
             pass
         except Exception as e:
             raise CustomerChurnException(e,sys)
-        
+
+    @staticmethod
+    def dataframe_to_records(dataframe: pd.DataFrame)->list:
+        # Native Python values with None for missing cells, the same documents the old JSON round trip produced
+        return dataframe.astype(object).where(dataframe.notna(), None).to_dict("records")
+
     def csv_to_json_converter(self,file_path):
         try:
             data = pd.read_csv(file_path)
             data.reset_index(drop=True, inplace=True)
-            records = list(json.loads(data.T.to_json()).values())
+            records = self.dataframe_to_records(data)
             return records
         except Exception as e:
             raise CustomerChurnException(e,sys)
-    
+
+    def iter_csv_batches(self, file_path: str, chunk_size: int = training.PUSH_DATA_CHUNK_SIZE,
+                         batch_size: int = training.PUSH_DATA_BATCH_SIZE):
+        try:
+            for chunk in pd.read_csv(file_path, chunksize=chunk_size):
+                for start in range(0, len(chunk), batch_size):
+                    yield self.dataframe_to_records(chunk.iloc[start:start + batch_size])
+        except Exception as e:
+            raise CustomerChurnException(e,sys)
+
     def insert_data_mongodb(self,records,database,collection):
         try:
             self.database = database
@@ -44,13 +64,86 @@ class CustomerDataExtract:
             return len(self.records)
         except Exception as e:
             raise CustomerChurnException(e,sys)
-        
+
+    def insert_batch(self, collection, records: list, max_retries: int = training.PUSH_DATA_MAX_RETRIES,
+                     retry_backoff: float = training.PUSH_DATA_RETRY_BACKOFF)->int:
+        inserted = 0
+        for attempt in range(max_retries + 1):
+            try:
+                result = collection.insert_many(records, ordered=False)
+                return inserted + len(result.inserted_ids)
+            except BulkWriteError as e:
+                # insert_many stamps an _id on every record, so a duplicate key on retry means an earlier attempt landed it
+                write_errors = e.details["writeErrors"]
+                failed = [error for error in write_errors if error["code"] != DUPLICATE_KEY_ERROR_CODE]
+                inserted += e.details["nInserted"] + len(write_errors) - len(failed)
+                if not failed or attempt == max_retries:
+                    if failed:
+                        # The records that did land are still counted by the caller
+                        e.inserted = inserted
+                        raise
+                    return inserted
+                records = [records[error["index"]] for error in failed]
+            except TRANSIENT_ERRORS as e:
+                if attempt == max_retries:
+                    e.inserted = inserted
+                    raise
+            logging.info(f"Retrying batch of {len(records)} records, attempt {attempt + 1} of {max_retries}")
+            time.sleep(retry_backoff * 2 ** attempt)
+        return inserted
+
+    def bulk_insert_csv(self, file_path: str, database: str, collection: str,
+                        chunk_size: int = training.PUSH_DATA_CHUNK_SIZE,
+                        batch_size: int = training.PUSH_DATA_BATCH_SIZE,
+                        max_workers: int = training.PUSH_DATA_MAX_WORKERS,
+                        max_retries: int = training.PUSH_DATA_MAX_RETRIES)->dict:
+        try:
+            start_time = time.perf_counter()
+            self.mongo_client = pymongo.MongoClient(MONGO_DB_URL, maxPoolSize=max_workers)
+            self.collection = self.mongo_client[database][collection]
+
+            number_of_records, inserted, batches, failed_batches = 0, 0, 0, 0
+            pending = set()
+
+            def collect(futures):
+                nonlocal inserted, failed_batches
+                for future in futures:
+                    try:
+                        inserted += future.result()
+                    except Exception as e:
+                        inserted += getattr(e, "inserted", 0)
+                        failed_batches += 1
+                        logging.info(f"Batch insert failed after {max_retries} retries : {e}")
+
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                for records in self.iter_csv_batches(file_path, chunk_size, batch_size):
+                    # Bound the batches in flight so memory stays flat regardless of file size
+                    if len(pending) >= max_workers * 2:
+                        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        collect(done)
+                    pending.add(executor.submit(self.insert_batch, self.collection, records, max_retries))
+                    number_of_records += len(records)
+                    batches += 1
+                collect(wait(pending).done)
+
+            elapsed = time.perf_counter() - start_time
+            report = {
+                "records" : number_of_records,
+                "inserted" : inserted,
+                "batches" : batches,
+                "failed_batches" : failed_batches,
+                "elapsed_seconds" : round(elapsed, 3),
+                "records_per_second" : round(inserted / elapsed, 1) if elapsed > 0 else None
+            }
+            logging.info(f"Bulk Insert Report : {report}")
+            return report
+        except Exception as e:
+            raise CustomerChurnException(e,sys)
+
 if __name__ == "__main__":
     file_path = "Customer_Data/Churn_Modelling.csv"
     churnobj = CustomerDataExtract()
-    records = churnobj.csv_to_json_converter(file_path=file_path)
-    print(records)
-    no_of_records = churnobj.insert_data_mongodb(
-        records=records,database=training.DATABASE_NAME,collection=training.COLLECTION_NAME
+    report = churnobj.bulk_insert_csv(
+        file_path=file_path,database=training.DATABASE_NAME,collection=training.COLLECTION_NAME
     )
-    print(no_of_records)
\ No newline at end of file
+    print(report)
@@ -0,0 +1,45 @@
+import sys
+import json
+import argparse
+
+from src.exception.exception import CustomerChurnException
+from src.benchmark.benchmark_suite import BenchmarkSuite, compare_results, load_results
+from src.constant.benchmark import BENCHMARK_SIZES, BENCHMARK_DEFAULT_SIZES, BENCHMARK_DIR, BENCHMARK_MODEL_TRAINER_MAX_ROWS
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the training pipeline and the prediction API")
+    parser.add_argument("--sizes", nargs="+", choices=list(BENCHMARK_SIZES), default=BENCHMARK_DEFAULT_SIZES)
+    parser.add_argument("--benchmark-dir", default=BENCHMARK_DIR)
+    parser.add_argument("--baseline", help="Results file of an earlier run to check for regressions")
+    parser.add_argument("--max-train-rows", type=int, default=BENCHMARK_MODEL_TRAINER_MAX_ROWS,
+                        help="Sizes above this many rows stop after data transformation")
+    parser.add_argument("--no-serving", action="store_true", help="Only benchmark the training stages")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    try:
+        args = parse_args()
+
+        api_module = None
+        if not args.no_serving:
+            import churn_api
+            api_module = churn_api
+
+        benchmark_suite = BenchmarkSuite(benchmark_dir=args.benchmark_dir, model_trainer_max_rows=args.max_train_rows)
+        results = benchmark_suite.run(args.sizes, api_module=api_module)
+        results_file_path = benchmark_suite.save_results(results)
+        print(json.dumps(results, indent=2))
+        print(f"Results written to {results_file_path}")
+
+        if args.baseline:
+            comparison = compare_results(results, load_results(args.baseline))
+            for metric_name, comparison_metric in comparison["metrics"].items():
+                flag = "REGRESSION" if comparison_metric["regressed"] else ""
+                print(
+                    f"{metric_name:60s} {comparison_metric['baseline']:>14} -> {comparison_metric['current']:>14} "
+                    f"{comparison_metric['change']:+.1%} {flag}"
+                )
+            if comparison["regressions"]:
+                sys.exit(1)
+    except Exception as e:
+        raise CustomerChurnException(e,sys)
@@ -0,0 +1,284 @@
+import io
+import os
+import json
+import sys
+import time
+import platform
+import subprocess
+import numpy as np
+from datetime import datetime
+
+from src.exception.exception import CustomerChurnException
+from src.logging.logger import logging
+from src.components.data_ingestion import DataIngestion
+from src.components.data_validation import DataValidation
+from src.components.data_transformation import DataTransformation
+from src.components.model_trainer import ModelTrainer
+from src.entity.artifact_entity import DataIngestionArtifact
+from src.entity.config_entity import (
+    TrainingPipelineConfig,
+    DataIngestionConfig,
+    DataValidationConfig,
+    DataTransformationConfig,
+    ModelTrainerConfig
+)
+from src.serving.model_registry import ModelRegistry
+from src.serving.readiness import ColdStartTracker
+from src.pydantic_model.pydantinc_model import UserInput
+from src.benchmark.synthetic_data import SyntheticChurnData
+from src.utils.main_utils import read_json_file, write_json_file
+from src.utils.instrumentation import PeakMemoryMonitor
+from src.constant.benchmark import (
+    BENCHMARK_SIZES, BENCHMARK_DIR, BENCHMARK_RUNS_DIR_NAME, BENCHMARK_RESULTS_DIR_NAME,
+    BENCHMARK_MODEL_TRAINER_MAX_ROWS, BENCHMARK_MEMORY_SAMPLE_INTERVAL, BENCHMARK_SINGLE_REQUESTS,
+    BENCHMARK_BATCH_SIZE, BENCHMARK_BATCH_REQUESTS, BENCHMARK_FILE_ROWS, BENCHMARK_REGRESSION_THRESHOLDS,
+    BENCHMARK_RANDOM_STATE
+)
+
+def get_commit()->str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.realpath(__file__))
+        ).stdout.strip()
+    except Exception:
+        return None
+
+def measure(stage, rows: int = None)->tuple:
+    start_time = time.perf_counter()
+    with PeakMemoryMonitor(BENCHMARK_MEMORY_SAMPLE_INTERVAL) as memory:
+        result = stage()
+    elapsed = time.perf_counter() - start_time
+    metrics = {
+        "seconds" : round(elapsed, 4),
+        "peak_rss_mb" : round(memory.peak_mb, 1),
+        "rss_growth_mb" : round(memory.peak_mb - memory.start_mb, 1)
+    }
+    if rows:
+        metrics["rows_per_second"] = round(rows / elapsed, 1)
+    return result, metrics
+
+def measure_cold_start(final_models_dir: str)->dict:
+    try:
+        # A fresh interpreter is the only way to see import cost, this process already has everything loaded
+        start_time = time.perf_counter()
+        completed = subprocess.run(
+            [sys.executable, "-m", "src.benchmark.cold_start", final_models_dir],
+            capture_output=True, text=True, check=True
+        )
+        cold_start = json.loads(completed.stdout.strip().splitlines()[-1])
+        cold_start["process"] = {"seconds" : round(time.perf_counter() - start_time, 4)}
+        return cold_start
+    except Exception as e:
+        raise CustomerChurnException(e,sys)
+
+def latency_summary(latencies: list)->dict:
+    latencies = np.asarray(latencies) * 1000
+    return {
+        "requests" : int(len(latencies)),
+        "mean_ms" : round(float(latencies.mean()), 3),
+        "p50_ms" : round(float(np.percentile(latencies, 50)), 3),
+        "p95_ms" : round(float(np.percentile(latencies, 95)), 3),
+        "p99_ms" : round(float(np.percentile(latencies, 99)), 3)
+    }
+
+class BenchmarkSuite:
+    def __init__(self, benchmark_dir: str = BENCHMARK_DIR, synthetic_data: SyntheticChurnData = None,
+                 model_trainer_max_rows: int = BENCHMARK_MODEL_TRAINER_MAX_ROWS):
+        try:
+            self.benchmark_dir = benchmark_dir
+            self.synthetic_data = synthetic_data if synthetic_data is not None else SyntheticChurnData()
+            self.model_trainer_max_rows = model_trainer_max_rows
+        except Exception as e:
+            raise CustomerChurnException(e,sys)
+
+    def run_training(self, size_name: str, n_rows: int)->tuple:
+        try:
+            # Every run gets fresh artifact and model directories, so no stage or search cache can shorten it
+            run_dir = os.path.join(self.benchmark_dir, BENCHMARK_RUNS_DIR_NAME, f"{size_name}-{datetime.now():%Y%m%d-%H%M%S}")
+            training_pipeline_config = TrainingPipelineConfig(
+                timestamp=datetime.now(),
+                artifact_name=os.path.join(run_dir, "Artifacts"),
+                final_models=os.path.join(run_dir, "final_models")
+            )
+            stages = {}
+
+            data_ingestion_config = DataIngestionConfig(training_pipeline_config=training_pipeline_config)
+            _, stages["synthetic_data"] = measure(
+                lambda: self.synthetic_data.write_feature_store(data_ingestion_config.feature_store_path, n_rows), n_rows
+            )
+
+            # Reading from MongoDB measures the database, ingestion is timed from the feature store onwards
+            data_ingestion = DataIngestion(data_ingestion_config=data_ingestion_config)
+            _, stages["data_ingestion"] = measure(data_ingestion.split_feature_store_as_train_test, n_rows)
+            data_ingestion_artifact = DataIngestionArtifact(
+                trained_file_path=data_ingestion_config.training_file_path,
+                test_file_path=data_ingestion_config.testing_file_path
+            )
+
+            data_validation = DataValidation(
+                data_ingestion_artifact=data_ingestion_artifact,
+                data_validation_config=DataValidationConfig(training_pipeline_config=training_pipeline_config)
+            )
+            data_validation_artifact, stages["data_validation"] = measure(data_validation.initiate_data_validation, n_rows)
+
+            data_transformation = DataTransformation(
+                data_validation_artifact=data_validation_artifact,
+                data_transformation_config=DataTransformationConfig(training_pipeline_config=training_pipeline_config)
+            )
+            data_transformation_artifact, stages["data_transformation"] = measure(
+                data_transformation.initiate_data_transformation, n_rows
+            )
+
+            model_trainer_config = ModelTrainerConfig(training_pipeline_config=training_pipeline_config)
+            if n_rows > self.model_trainer_max_rows:
+                logging.info(f"Benchmark {size_name} : skipping model_trainer above {self.model_trainer_max_rows} rows")
+                return stages, None
+
+            model_trainer = ModelTrainer(
+                data_transformation_artifact=data_transformation_artifact, model_trainer_config=model_trainer_config
+            )
+            _, stages["model_trainer"] = measure(model_trainer.initiate_model_trainer, n_rows)
+            return stages, model_trainer_config
+        except Exception as e:
+            raise CustomerChurnException(e,sys)
+
+    def run_serving(self, api_module, model_trainer_config: ModelTrainerConfig,
+                    single_requests: int = BENCHMARK_SINGLE_REQUESTS, batch_size: int = BENCHMARK_BATCH_SIZE,
+                    batch_requests: int = BENCHMARK_BATCH_REQUESTS, file_rows: int = BENCHMARK_FILE_ROWS)->dict:
+        try:
+            from fastapi.testclient import TestClient
+
+            # The API module serves whatever its registry points at, here the model this run just trained
+            api_module.model_registry = ModelRegistry(model_trainer_config=model_trainer_config)
+            api_module.prediction_cache.clear()
+            # The API was imported along with the suite, so its own clock would report the whole run as the cold start,
+            # the real cold start is measured in a fresh process below
+            api_module.cold_start = ColdStartTracker(None)
+
+            rng = np.random.default_rng(BENCHMARK_RANDOM_STATE)
+            n_records = max(single_requests, batch_size, file_rows)
+            records = next(self.synthetic_data.iter_chunks(n_records, random_state=int(rng.integers(2 ** 31))))
+            records = records[list(UserInput.model_fields)]
+            record_dicts = records.to_dict("records")
+
+            serving = {"cold_start" : measure_cold_start(os.path.dirname(model_trainer_config.model_file_path))}
+            with TestClient(api_module.app) as client:
+                # The model loads in the background, requests are only sent once the replica reports ready
+                while client.get("/ready").status_code != 200:
+                    time.sleep(0.01)
+                client.post("/predict", json=record_dicts[0])
+
+                latencies = []
+                for record in record_dicts[:single_requests]:
+                    start_time = time.perf_counter()
+                    response = client.post("/predict", json=record)
+                    latencies.append(time.perf_counter() - start_time)
+                    response.raise_for_status()
+                serving["predict"] = latency_summary(latencies)
+
+                latencies = []
+                for _ in range(single_requests):
+                    start_time = time.perf_counter()
+                    client.post("/predict", json=record_dicts[0]).raise_for_status()
+                    latencies.append(time.perf_counter() - start_time)
+                serving["predict_cached"] = latency_summary(latencies)
+
+                batch = record_dicts[:batch_size]
+                def post_batches():
+                    for _ in range(batch_requests):
+                        client.post("/predict/batch", json=batch).raise_for_status()
+                _, serving["predict_batch"] = measure(post_batches, batch_size * batch_requests)
+
+                csv_file = records.iloc[:file_rows].to_csv(index=False).encode()
+                def post_file():
+                    client.post(
+                        "/predict/batch/file", files={"file" : ("records.csv", io.BytesIO(csv_file), "text/csv")}
+                    ).raise_for_status()
+                _, serving["predict_batch_file"] = measure(post_file, file_rows)
+            return serving
+        except Exception as e:
+            raise CustomerChurnException(e,sys)
+
+    def run(self, size_names: list, api_module=None)->dict:
+        try:
+            results = {
+                "commit" : get_commit(),
+                "timestamp" : datetime.now().isoformat(timespec="seconds"),
+                "python" : platform.python_version(),
+                "platform" : platform.platform(),
+                "cpu_count" : os.cpu_count(),
+                "sizes" : {}
+            }
+            for size_name in size_names:
+                n_rows = BENCHMARK_SIZES[size_name]
+                logging.info(f"Benchmark {size_name} : {n_rows} rows")
+                stages, model_trainer_config = self.run_training(size_name, n_rows)
+                size_results = {"rows" : n_rows, "stages" : stages}
+                if api_module is not None and model_trainer_config is not None:
+                    size_results["serving"] = self.run_serving(api_module, model_trainer_config)
+                results["sizes"][size_name] = size_results
+            return results
+        except Exception as e:
+            raise CustomerChurnException(e,sys)
+
+    def save_results(self, results: dict)->str:
+        try:
+            file_name = f"{datetime.now():%Y%m%d-%H%M%S}-{results['commit'] or 'unknown'}.json"
+            file_path = os.path.join(self.benchmark_dir, BENCHMARK_RESULTS_DIR_NAME, file_name)
+            write_json_file(file_path, results)
+            return file_path
+        except Exception as e:
+            raise CustomerChurnException(e,sys)
+
+def flatten_metrics(results: dict)->dict:
+    metrics = {}
+    def walk(prefix: str, value):
+        if isinstance(value, dict):
+            for key, child in value.items():
+                walk(f"{prefix}.{key}" if prefix else key, child)
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            metrics[prefix] = value
+    walk("", results.get("sizes", {}))
+    return metrics
+
+def get_metric_kind(metric_name: str)->str:
+    name = metric_name.rsplit(".", 1)[-1]
+    if name.endswith("_ms"):
+        return "ms"
+    return name if name in BENCHMARK_REGRESSION_THRESHOLDS else None
+
+def compare_results(current: dict, baseline: dict, thresholds: dict = None)->dict:
+    try:
+        thresholds = {**BENCHMARK_REGRESSION_THRESHOLDS, **(thresholds or {})}
+        current_metrics, baseline_metrics = flatten_metrics(current), flatten_metrics(baseline)
+        comparisons, regressions = {}, []
+        for metric_name, value in current_metrics.items():
+            kind = get_metric_kind(metric_name)
+            baseline_value = baseline_metrics.get(metric_name)
+            if kind is None or not baseline_value:
+                continue
+            change = (value - baseline_value) / baseline_value
+            # Throughput regresses when it drops, every other metric when it grows
+            worse = -change if kind == "rows_per_second" else change
+            regressed = worse > thresholds[kind]
+            comparisons[metric_name] = {
+                "current" : value, "baseline" : baseline_value, "change" : round(change, 4), "regressed" : regressed
+            }
+            if regressed:
+                regressions.append(metric_name)
+        return {
+            "baseline_commit" : baseline.get("commit"),
+            "current_commit" : current.get("commit"),
+            "thresholds" : thresholds,
+            "regressions" : regressions,
+            "metrics" : comparisons
+        }
+    except Exception as e:
+        raise CustomerChurnException(e,sys)
+
+def load_results(file_path: str)->dict:
+    try:
+        return read_json_file(file_path)
+    except Exception as e:
+        raise CustomerChurnException(e,sys)
@@ -0,0 +1,40 @@
+import sys
+import json
+import time
+import asyncio
+
+# Run by the benchmark suite in a fresh interpreter as python -m src.benchmark.cold_start <final_models_dir>,
+# nothing heavy is imported before the API module so its import is measured cold
+
+async def wait_until_ready(api_module, timeout: float)->bool:
+    async with api_module.lifespan(api_module.app):
+        deadline = time.perf_counter() + timeout
+        while not api_module.model_registry.is_loaded:
+            if time.perf_counter() > deadline:
+                return False
+            await asyncio.sleep(0.001)
+        return True
+
+def measure_cold_start(final_models_dir: str, timeout: float = 60.0)->dict:
+    import churn_api
+    from src.entity.config_entity import TrainingPipelineConfig, ModelTrainerConfig
+    from src.serving.model_registry import ModelRegistry
+
+    churn_api.model_registry = ModelRegistry(
+        model_trainer_config=ModelTrainerConfig(TrainingPipelineConfig(final_models=final_models_dir))
+    )
+    ready = asyncio.run(wait_until_ready(churn_api, timeout))
+    report = churn_api.cold_start.report()
+    return {
+        "ready" : ready,
+        "import" : {"seconds" : report["import_seconds"]},
+        "model_ready" : {"seconds" : report["ready_seconds"]},
+        "budget_seconds" : report["budget_seconds"],
+        "within_budget" : report["within_budget"],
+        "training_modules_loaded" : sorted(
+            module for module in ("sklearn", "xgboost", "pymongo", "src.pipeline.training_pipeline") if module in sys.modules
+        )
+    }
+
+if __name__ == "__main__":
+    print(json.dumps(measure_cold_start(sys.argv[1])))
@@ -0,0 +1,103 @@
+import sys
+import numpy as np
+import pandas as pd
+
+from src.exception.exception import CustomerChurnException
+from src.logging.logger import logging
+from src.utils.main_utils import read_yaml_file
+from src.utils.feature_store import FeatureStoreWriter
+from src.constant.training import SCHEMA_FILE_PATH, TARGET_COLUMN
+from src.constant.benchmark import (
+    BENCHMARK_SOURCE_FILE_PATH, BENCHMARK_CHUNK_SIZE, BENCHMARK_JITTER, BENCHMARK_MISSING_RATE, BENCHMARK_RANDOM_STATE
+)
+
+ROW_NUMBER_COLUMN: str = "RowNumber"
+CUSTOMER_ID_COLUMN: str = "CustomerId"
+# Numeric columns with at most this many distinct values are treated as discrete and never jittered
+DISCRETE_MAX_VALUES: int = 20
+
+class SyntheticChurnData:
+    def __init__(self, source_file_path: str = BENCHMARK_SOURCE_FILE_PATH, schema_file_path: str = SCHEMA_FILE_PATH,
+                 jitter: float = BENCHMARK_JITTER, missing_rate: float = BENCHMARK_MISSING_RATE):
+        try:
+            self.schema = read_yaml_file(schema_file_path)["columns"]
+            self.source = pd.read_csv(source_file_path)[list(self.schema)]
+            self.jitter = jitter
+            self.missing_rate = missing_rate
+
+            # Continuous columns get kernel noise, discrete and identifier columns are copied as they are
+            self.continuous_columns = [
+                column for column, spec in self.schema.items()
+                if spec["type"] in ("int", "float") and column not in (ROW_NUMBER_COLUMN, CUSTOMER_ID_COLUMN, TARGET_COLUMN)
+                and self.source[column].nunique() > DISCRETE_MAX_VALUES
+            ]
+            self.noise_scale = {
+                column: self.jitter * float(self.source[column].std()) for column in self.continuous_columns
+            }
+            self.first_customer_id = int(self.source[CUSTOMER_ID_COLUMN].min())
+        except Exception as e:
+            raise CustomerChurnException(e,sys)
+
+    def _bounded(self, column: str, values: np.ndarray)->np.ndarray:
+        spec = self.schema[column]
+        if "min" in spec or "max" in spec:
+            values = np.clip(values, spec.get("min", -np.inf), spec.get("max", np.inf))
+        if spec["type"] == "int":
+            values = np.rint(values)
+        return values
+
+    def generate_chunk(self, start: int, n_rows: int, rng: np.random.Generator)->pd.DataFrame:
+        try:
+            # A smoothed bootstrap: whole rows are resampled so correlations with churn survive
+            rows = rng.integers(0, len(self.source), size=n_rows)
+            chunk = {}
+            for column, spec in self.schema.items():
+                if column == ROW_NUMBER_COLUMN:
+                    chunk[column] = np.arange(start + 1, start + n_rows + 1, dtype=np.int64)
+                    continue
+                if column == CUSTOMER_ID_COLUMN:
+                    chunk[column] = np.arange(start, start + n_rows, dtype=np.int64) + self.first_customer_id
+                    continue
+
+                values = self.source[column].to_numpy()[rows]
+                if column in self.continuous_columns:
+                    values = values.astype(np.float64)
+                    # Values sitting on the lower bound are left alone so point masses like zero balances keep their weight
+                    lower = self.schema[column].get("min")
+                    noisy = values if lower is None else values != lower
+                    values = np.where(noisy, values + rng.normal(0, self.noise_scale[column], n_rows), values)
+                    values = self._bounded(column, values)
+
+                if self.missing_rate and column != TARGET_COLUMN and self.schema[column].get("nullable", True):
+                    missing = rng.random(n_rows) < self.missing_rate
+                    values = values.astype(object if spec["type"] == "category" else np.float64)
+                    values[missing] = None if spec["type"] == "category" else np.nan
+
+                if spec["type"] == "int":
+                    chunk[column] = pd.array(values, dtype="Int64") if np.issubdtype(values.dtype, np.floating) else values.astype(np.int64)
+                elif spec["type"] == "float":
+                    chunk[column] = values.astype(np.float64)
+                else:
+                    chunk[column] = values.astype(object)
+            return pd.DataFrame(chunk)
+        except Exception as e:
+            raise CustomerChurnException(e,sys)
+
+    def iter_chunks(self, n_rows: int, chunk_size: int = BENCHMARK_CHUNK_SIZE, random_state: int = BENCHMARK_RANDOM_STATE):
+        try:
+            rng = np.random.default_rng(random_state)
+            for start in range(0, n_rows, chunk_size):
+                yield self.generate_chunk(start, min(chunk_size, n_rows - start), rng)
+        except Exception as e:
+            raise CustomerChurnException(e,sys)
+
+    def write_feature_store(self, file_path: str, n_rows: int, chunk_size: int = BENCHMARK_CHUNK_SIZE,
+                            random_state: int = BENCHMARK_RANDOM_STATE)->int:
+        try:
+            logging.info(f"Generating {n_rows} Synthetic Rows into {file_path}")
+            with FeatureStoreWriter(file_path) as feature_store:
+                for chunk in self.iter_chunks(n_rows, chunk_size, random_state):
+                    feature_store.write(chunk)
+                return feature_store.number_of_rows
+        except Exception as e:
+            raise CustomerChurnException(e,sys)
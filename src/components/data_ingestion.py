@@ -2,6 +2,9 @@ from src.entity.config_entity import DataIngestionConfig
 from src.entity.artifact_entity import DataIngestionArtifact
 from src.exception.exception import CustomerChurnException
 from src.logging.logger import logging
+from src.utils.main_utils import read_yaml_file
+from src.utils.feature_store import FeatureStoreWriter, write_feature_store, iter_feature_store
+from src.constant.training import SCHEMA_FILE_PATH
 
 from sklearn.model_selection import train_test_split
 
@@ -15,6 +18,51 @@ load_dotenv()
 
 MONGO_DB_URL = os.getenv("MONGO_DB_URL")
 
+# Numeric schema types fill typed arrays, only string columns need a buffer of Python objects
+COLUMN_BUFFER_DTYPES: dict = {"int" : np.int64, "float" : np.float64}
+
+class ColumnBuffer:
+    def __init__(self, column_type: str, size: int):
+        self.column_type = column_type
+        self.values = np.empty(size, dtype=COLUMN_BUFFER_DTYPES.get(column_type, object))
+        self.null_mask = np.zeros(size, dtype=bool)
+        self.length = 0
+
+    def to_value(self, value):
+        # Returns None for anything the column cannot hold, the same values pd.to_numeric(errors="coerce") dropped
+        if value is None or (isinstance(value, str) and value == "na"):
+            return None
+        if self.column_type not in COLUMN_BUFFER_DTYPES:
+            return value
+        if isinstance(value, (int, np.integer)) and not isinstance(value, bool):
+            return value
+        try:
+            number = float(value)
+        except (TypeError, ValueError):
+            return None
+        if self.column_type == "int":
+            return int(number) if number.is_integer() else None
+        return number
+
+    def append(self, value):
+        value = self.to_value(value)
+        if value is None:
+            self.null_mask[self.length] = True
+        else:
+            self.values[self.length] = value
+        self.length += 1
+
+    def to_series(self, name: str)->pd.Series:
+        # The buffers are reused for the next chunk, so the filled part is copied out and the mask reset
+        values = self.values[:self.length].copy()
+        null_mask = self.null_mask[:self.length].copy()
+        self.null_mask[:self.length] = False
+        self.length = 0
+        if self.column_type == "int":
+            return pd.Series(pd.arrays.IntegerArray(values, null_mask), name=name)
+        values[null_mask] = np.nan
+        return pd.Series(values, name=name, dtype=values.dtype)
+
 class DataIngestion:
     def __init__(self, data_ingestion_config: DataIngestionConfig):
         try:
@@ -38,14 +86,108 @@ class DataIngestion:
         except Exception as e:
             raise CustomerChurnException(e,sys)
         
-    def export_data_into_feature_store(self,datafame: pd.DataFrame)->pd.DataFrame:
+    def get_collection_fingerprint(self)->str:
         try:
-            logging.info("Exporting Data into Feature Store")
-            feature_store_file_path = self.data_ingestion_config.feature_store_path
-            dir_path = os.path.dirname(feature_store_file_path)
+            database_name = self.data_ingestion_config.database_name
+            collection_name = self.data_ingestion_config.collection_name
+            self.mongo_client = pymongo.MongoClient(MONGO_DB_URL)
+            database = self.mongo_client[database_name]
+            try:
+                return database.command("dbHash", collections=[collection_name])["collections"][collection_name]
+            except Exception as e:
+                logging.info(f"dbHash unavailable : {e}")
+            try:
+                # dbHash needs elevated privileges and is not offered on Atlas, summing a per document hash of the
+                # ingested fields runs on the server and still catches in-place updates and delete plus insert
+                return self.aggregate_collection_hash(database[collection_name])
+            except Exception as e:
+                # Anything cheaper would miss edits and reuse stale artifacts, so ingestion runs every time instead
+                logging.info(f"Collection hash unavailable, Data Ingestion will not be skipped : {e}")
+                return None
+        except Exception as e:
+            raise CustomerChurnException(e,sys)
+
+    def aggregate_collection_hash(self, collection)->str:
+        try:
+            schema_columns = read_yaml_file(SCHEMA_FILE_PATH)["columns"]
+            document = {"_id" : "$_id", **{column: f"${column}" for column in schema_columns}}
+            result = next(collection.aggregate([
+                {"$project" : {"_id" : 0, "hash" : {"$toHashedIndexKey" : document}}},
+                # Decimal keeps the sum of 64-bit hashes exact, and a sum does not depend on the scan order
+                {"$group" : {"_id" : None, "count" : {"$sum" : 1}, "hash" : {"$sum" : {"$toDecimal" : "$hash"}}}}
+            ]), None)
+            if result is None:
+                return "0:0"
+            return f"{result['count']}:{result['hash']}"
+        except Exception as e:
+            raise CustomerChurnException(e,sys)
+
+    def stream_collection_into_feature_store(self)->int:
+        try:
+            logging.info("Streaming Data from MongoDB into Feature Store")
+            database_name = self.data_ingestion_config.database_name
+            collection_name = self.data_ingestion_config.collection_name
+            batch_size = self.data_ingestion_config.batch_size
+            self.mongo_client = pymongo.MongoClient(MONGO_DB_URL)
+
+            schema_columns = read_yaml_file(SCHEMA_FILE_PATH)["columns"]
+            buffers = {
+                column: ColumnBuffer(properties["type"], batch_size) for column, properties in schema_columns.items()
+            }
+            projection = {"_id" : 0, **{column: 1 for column in schema_columns}}
+
+            collection = self.mongo_client[database_name][collection_name]
+            cursor = collection.find({}, projection=projection, batch_size=batch_size)
+
+            pending_rows = 0
+            with FeatureStoreWriter(
+                self.data_ingestion_config.feature_store_path, export_csv=self.data_ingestion_config.export_csv
+            ) as feature_store:
+                for document in cursor:
+                    for column, buffer in buffers.items():
+                        buffer.append(document.get(column))
+                    pending_rows += 1
+                    if pending_rows == batch_size:
+                        feature_store.write(self.buffers_to_dataframe(buffers))
+                        pending_rows = 0
+                if pending_rows or feature_store.number_of_rows == 0:
+                    feature_store.write(self.buffers_to_dataframe(buffers))
+                number_of_rows = feature_store.number_of_rows
+
+            logging.info(f"Streamed {number_of_rows} rows into Feature Store")
+            return number_of_rows
+        except Exception as e:
+            raise CustomerChurnException(e,sys)
+
+    def buffers_to_dataframe(self, buffers: dict)->pd.DataFrame:
+        try:
+            return pd.DataFrame({column: buffer.to_series(column) for column, buffer in buffers.items()})
+        except Exception as e:
+            raise CustomerChurnException(e,sys)
+
+    def split_feature_store_as_train_test(self):
+        try:
+            logging.info("Splitting Feature Store as Train and Test Set in Chunks")
+            dir_path = os.path.dirname(self.data_ingestion_config.training_file_path)
             os.makedirs(dir_path,exist_ok=True)
 
-            datafame.to_csv(feature_store_file_path,index=False,header=True)
+            rng = np.random.default_rng(self.data_ingestion_config.random_state)
+            export_csv = self.data_ingestion_config.export_csv
+            with FeatureStoreWriter(self.data_ingestion_config.training_file_path, export_csv=export_csv) as train_store, \
+                    FeatureStoreWriter(self.data_ingestion_config.testing_file_path, export_csv=export_csv) as test_store:
+                for chunk in iter_feature_store(self.data_ingestion_config.feature_store_path, self.data_ingestion_config.batch_size):
+                    is_test = rng.random(len(chunk)) < self.data_ingestion_config.train_test_split_ratio
+                    train_store.write(chunk[~is_test])
+                    test_store.write(chunk[is_test])
+        except Exception as e:
+            raise CustomerChurnException(e,sys)
+
+    def export_data_into_feature_store(self,datafame: pd.DataFrame)->pd.DataFrame:
+        try:
+            logging.info("Exporting Data into Feature Store")
+            write_feature_store(
+                datafame, self.data_ingestion_config.feature_store_path, export_csv=self.data_ingestion_config.export_csv
+            )
             return datafame
         except Exception as e:
             raise CustomerChurnException(e,sys)
@@ -54,19 +196,20 @@ class DataIngestion:
         try:
             logging.info("Splitting Data as Train and Test Set")
             train_set, test_set = train_test_split(
-                dataframe, test_size=self.data_ingestion_config.train_test_split_ratio
+                dataframe, test_size=self.data_ingestion_config.train_test_split_ratio,
+                random_state=self.data_ingestion_config.random_state
             )
 
             dir_path = os.path.dirname(self.data_ingestion_config.training_file_path)
             os.makedirs(dir_path,exist_ok=True)
 
             logging.info("Exporting Train and Test files")
-            train_set.to_csv(
-                self.data_ingestion_config.training_file_path, index=False, header=True
+            write_feature_store(
+                train_set, self.data_ingestion_config.training_file_path, export_csv=self.data_ingestion_config.export_csv
             )
 
-            test_set.to_csv(
-                self.data_ingestion_config.testing_file_path, index=False, header=True
+            write_feature_store(
+                test_set, self.data_ingestion_config.testing_file_path, export_csv=self.data_ingestion_config.export_csv
             )
         except Exception as e:
             raise CustomerChurnException(e,sys)
@@ -74,9 +217,13 @@ class DataIngestion:
     def initiate_data_ingestion(self):
         try:
             logging.info("Initiating Data Ingestion")
-            dataframe = self.export_collection_as_dataframe()
-            dataframe = self.export_data_into_feature_store(datafame=dataframe)
-            self.split_data_as_train_test(dataframe=dataframe)
+            if self.data_ingestion_config.streaming:
+                self.stream_collection_into_feature_store()
+                self.split_feature_store_as_train_test()
+            else:
+                dataframe = self.export_collection_as_dataframe()
+                dataframe = self.export_data_into_feature_store(datafame=dataframe)
+                self.split_data_as_train_test(dataframe=dataframe)
 
             data_ingestion_artifact = DataIngestionArtifact(
                 trained_file_path=self.data_ingestion_config.training_file_path,
@@ -2,16 +2,21 @@ import os
 import sys
 import pandas as pd
 import numpy as np
+import scipy.sparse as sp
 from sklearn.pipeline import Pipeline
-from sklearn.impute import KNNImputer
 from sklearn.preprocessing import OneHotEncoder
 
 from src.exception.exception import CustomerChurnException
 from src.logging.logger import logging
 from src.entity.artifact_entity import DataValidationArtifact, DataTransformationArtifact
 from src.entity.config_entity import DataTransformationConfig
-from src.constant.training import TARGET_COLUMN, DATA_TRANSFORMATION_IMPUTER_PARAMS, COLUMNS_TO_REMOVE
-from src.utils.main_utils import save_object, save_numpy_array_data
+from src.constant.training import TARGET_COLUMN, COLUMNS_TO_REMOVE, SCHEMA_FILE_PATH
+from src.utils.main_utils import save_object, save_numpy_array_data, save_sparse_array_data, read_yaml_file, write_json_file, SparseMatrixWriter
+from src.utils.ml_utils import encode_sparse, impute_sparse, get_feature_names
+from src.utils.reference_profile import build_reference_profile
+from src.utils.feature_store import read_feature_store, iter_feature_store, count_feature_store_rows
+from src.utils.drift_utils import ReservoirSampler
+from src.utils.imputers import get_imputer
 
 class DataTransformation:
     def __init__(self, data_validation_artifact: DataValidationArtifact, data_transformation_config: DataTransformationConfig):
@@ -21,7 +26,7 @@ class DataTransformation:
     @staticmethod
     def read_data(file_path: str)->pd.DataFrame:
         try:
-            return pd.read_csv(file_path)
+            return read_feature_store(file_path)
         except Exception as e:
             raise CustomerChurnException(e,sys)
     
@@ -47,9 +52,156 @@ class DataTransformation:
         except Exception as e:
             raise CustomerChurnException(e,sys)
 
+    def export_reference_profile(self, input_train_data: pd.DataFrame):
+        try:
+            schema = read_yaml_file(SCHEMA_FILE_PATH)
+            categorical_columns = [
+                column for column, spec in schema["columns"].items()
+                if spec["type"] == "category" and column in input_train_data
+            ]
+            profile = build_reference_profile(
+                input_train_data, schema["numerical_columns"], categorical_columns,
+                bins=self.data_transformation_config.profile_bins,
+                quantiles=self.data_transformation_config.profile_quantiles
+            )
+            write_json_file(self.data_transformation_config.reference_profile, profile)
+        except Exception as e:
+            raise CustomerChurnException(e,sys)
+
+    @staticmethod
+    def apply_encoder(input_data: pd.DataFrame, ohe: OneHotEncoder)->pd.DataFrame:
+        try:
+            cat_cols = list(ohe.feature_names_in_)
+            column_encoded = pd.DataFrame(
+                ohe.transform(input_data[cat_cols]).toarray(), columns=ohe.get_feature_names_out(), index=input_data.index
+            )
+            return pd.concat([input_data.drop(cat_cols,axis=1), column_encoded],axis=1)
+        except Exception as e:
+            raise CustomerChurnException(e,sys)
+
+    def fit_out_of_core(self, file_path: str)->tuple:
+        try:
+            config = self.data_transformation_config
+            cat_cols = None
+            categories = {}
+            sampler = ReservoirSampler(config.fit_sample_size, config.random_state)
+
+            # One pass collects every category and a bounded sample of rows to fit the imputer on
+            for chunk in iter_feature_store(file_path, config.chunk_size):
+                input_chunk = chunk.drop(COLUMNS_TO_REMOVE + [TARGET_COLUMN],axis=1)
+                if cat_cols is None:
+                    cat_cols = input_chunk.select_dtypes(include=["object"]).columns.to_list()
+                for column in cat_cols:
+                    categories.setdefault(column, set()).update(input_chunk[column].dropna().unique())
+                sampler.update(input_chunk)
+            sample = sampler.sample
+
+            ohe = OneHotEncoder(handle_unknown='ignore', categories=[sorted(categories[column]) for column in cat_cols])
+            ohe.fit(sample[cat_cols])
+            ohe.feature_names_in_ = cat_cols
+
+            preprocessor_object = self.preprocessor_object().fit(self.apply_encoder(sample, ohe))
+            logging.info(f"Fitted Encoder and Imputer on {len(sample)} of {sampler.seen} rows")
+            return ohe, preprocessor_object, sample
+        except Exception as e:
+            raise CustomerChurnException(e,sys)
+
+    def transform_out_of_core(self, file_path: str, ohe: OneHotEncoder, preprocessor_object, output_file_path: str):
+        try:
+            number_of_rows = count_feature_store_rows(file_path)
+            os.makedirs(os.path.dirname(output_file_path), exist_ok=True)
+            array = None
+            sparse_writer = None
+            start = 0
+            for chunk in iter_feature_store(file_path, self.data_transformation_config.chunk_size):
+                if chunk.empty:
+                    continue
+                target = chunk[TARGET_COLUMN].to_numpy(dtype=np.float64)
+                input_chunk = chunk.drop(COLUMNS_TO_REMOVE + [TARGET_COLUMN],axis=1)
+                if self.data_transformation_config.sparse:
+                    matrix = impute_sparse(
+                        encode_sparse(input_chunk, ohe), preprocessor_object, get_feature_names(input_chunk, ohe)
+                    )
+                    if sparse_writer is None:
+                        # Blocks are appended to disk as they are imputed, only one chunk is ever held in memory
+                        sparse_writer = SparseMatrixWriter(output_file_path)
+                    sparse_writer.write(sp.hstack([matrix, sp.csr_matrix(target.reshape(-1, 1))], format="csr"))
+                    continue
+                transformed = preprocessor_object.transform(self.apply_encoder(input_chunk, ohe))
+                if array is None:
+                    # Rows land straight in a .npy memmap, only one chunk is ever held in memory
+                    array = np.lib.format.open_memmap(
+                        output_file_path, mode="w+", dtype=np.float64, shape=(number_of_rows, transformed.shape[1] + 1)
+                    )
+                array[start:start + len(chunk), :-1] = transformed
+                array[start:start + len(chunk), -1] = target
+                start += len(chunk)
+            if array is not None:
+                array.flush()
+                del array
+            if sparse_writer is not None:
+                sparse_writer.close()
+        except Exception as e:
+            raise CustomerChurnException(e,sys)
+
+    def initiate_out_of_core_transformation(self)->tuple:
+        try:
+            logging.info("Fitting Encoder and Imputer over Train Data Chunks")
+            ohe, preprocessor_object, sample = self.fit_out_of_core(self.data_validation_artifact.valid_train_file_path)
+
+            logging.info("Exporting Reference Profile of the Training Features")
+            self.export_reference_profile(sample)
+
+            logging.info('Exporting Train and Test Numpy Arrays Chunk by Chunk')
+            self.transform_out_of_core(
+                self.data_validation_artifact.valid_train_file_path, ohe, preprocessor_object,
+                self.data_transformation_config.transformed_train_file
+            )
+            self.transform_out_of_core(
+                self.data_validation_artifact.valid_test_file_path, ohe, preprocessor_object,
+                self.data_transformation_config.transformed_test_file
+            )
+            return ohe, preprocessor_object
+        except Exception as e:
+            raise CustomerChurnException(e,sys)
+
+    def transform_sparse(self, input_train_data: pd.DataFrame, input_test_data: pd.DataFrame,
+                         target_train_data: pd.Series, target_test_data: pd.Series)->tuple:
+        try:
+            cat_cols = input_train_data.select_dtypes(include=["object"]).columns.to_list()
+            ohe = OneHotEncoder(handle_unknown='ignore')
+            ohe.fit(input_train_data[cat_cols])
+            ohe.feature_names_in_ = cat_cols
+            feature_names = get_feature_names(input_train_data, ohe)
+
+            train_matrix = encode_sparse(input_train_data, ohe)
+            test_matrix = encode_sparse(input_test_data, ohe)
+
+            # The imputer needs dense rows to fit, a bounded sample keeps that allocation fixed
+            rng = np.random.default_rng(self.data_transformation_config.random_state)
+            sample_size = min(train_matrix.shape[0], self.data_transformation_config.fit_sample_size)
+            sample_rows = np.sort(rng.choice(train_matrix.shape[0], sample_size, replace=False))
+            preprocessor_object = self.preprocessor_object().fit(
+                pd.DataFrame(train_matrix[sample_rows].toarray(), columns=feature_names)
+            )
+
+            logging.info("Imputing Missing Values on the Sparse Feature Matrices")
+            for matrix, target, file_path in (
+                (train_matrix, target_train_data, self.data_transformation_config.transformed_train_file),
+                (test_matrix, target_test_data, self.data_transformation_config.transformed_test_file)
+            ):
+                matrix = impute_sparse(matrix, preprocessor_object, feature_names)
+                target = sp.csr_matrix(np.asarray(target, dtype=np.float64).reshape(-1, 1))
+                save_sparse_array_data(sp.hstack([matrix, target], format="csr"), file_path)
+            return ohe, preprocessor_object
+        except Exception as e:
+            raise CustomerChurnException(e,sys)
+
     def preprocessor_object(self):
         try:
-            imputer: KNNImputer = KNNImputer(**DATA_TRANSFORMATION_IMPUTER_PARAMS)
+            imputer = get_imputer(
+                self.data_transformation_config.imputer_strategy, self.data_transformation_config.imputer_params
+            )
             preprocessor: Pipeline = Pipeline([("imputer", imputer)])
             return preprocessor
         except Exception as e:
@@ -58,6 +210,10 @@ class DataTransformation:
     def initiate_data_transformation(self,):
         try:
             logging.info("Initiating Data Transformation")
+            if self.data_transformation_config.out_of_core:
+                ohe, preprocessor_object = self.initiate_out_of_core_transformation()
+                return self.export_transformation_objects(ohe, preprocessor_object)
+
             logging.info("Reading the Validated Train and Test files")
             train_data = self.read_data(self.data_validation_artifact.valid_train_file_path)
             test_data = self.read_data(self.data_validation_artifact.valid_test_file_path)
@@ -73,6 +229,16 @@ class DataTransformation:
             input_test_data = test_data.drop(TARGET_COLUMN,axis=1)
             target_test_data = test_data[TARGET_COLUMN]
 
+            logging.info("Exporting Reference Profile of the Training Features")
+            self.export_reference_profile(input_train_data)
+
+            if self.data_transformation_config.sparse:
+                logging.info("Encoding Categorical Features into Sparse Feature Matrices")
+                ohe, preprocessor_object = self.transform_sparse(
+                    input_train_data, input_test_data, target_train_data, target_test_data
+                )
+                return self.export_transformation_objects(ohe, preprocessor_object)
+
             logging.info("Encoding Categorical Features using OneHotEncoder")
             input_train_data, input_test_data, ohe = self.encode_columns(input_train_data, input_test_data) 
 
@@ -80,7 +246,7 @@ class DataTransformation:
 
             preprocessor_object = preprocessor.fit(input_train_data)
 
-            logging.info("Imputing Missing Values using KNNImputer")
+            logging.info(f"Imputing Missing Values using {self.data_transformation_config.imputer_strategy} Strategy")
             transformed_input_train_data = preprocessor_object.transform(input_train_data)
             transformed_input_test_data = preprocessor_object.transform(input_test_data)
 
@@ -92,7 +258,13 @@ class DataTransformation:
             save_numpy_array_data(train_data, self.data_transformation_config.transformed_train_file)
             save_numpy_array_data(test_data, self.data_transformation_config.transformed_test_file)
 
-            logging.info('Exporting KNNImputer Object as Pickle File')
+            return self.export_transformation_objects(ohe, preprocessor_object)
+        except Exception as e:
+            raise CustomerChurnException(e,sys)
+
+    def export_transformation_objects(self, ohe: OneHotEncoder, preprocessor_object)->DataTransformationArtifact:
+        try:
+            logging.info('Exporting Imputer Object as Pickle File')
             save_object(preprocessor_object, self.data_transformation_config.preprocessor_object)
 
             logging.info('Exporting OneHotEncoder Object as Pickle File')
@@ -102,7 +274,8 @@ class DataTransformation:
                 transformed_train_file_path=self.data_transformation_config.transformed_train_file,
                 transformed_test_file_path=self.data_transformation_config.transformed_test_file,
                 preprocessor_object_file_path=self.data_transformation_config.preprocessor_object,
-                encoder_object_file_path=self.data_transformation_config.encoder_object
+                encoder_object_file_path=self.data_transformation_config.encoder_object,
+                reference_profile_file_path=self.data_transformation_config.reference_profile
             )
 
             logging.info('Data Transformation Completed')
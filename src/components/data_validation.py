@@ -3,13 +3,15 @@ from src.logging.logger import logging
 
 from src.entity.config_entity import DataValidationConfig
 from src.entity.artifact_entity import DataValidationArtifact, DataIngestionArtifact
-from src.utils.main_utils import read_yaml_file, write_yaml_file
-from src.constant.training import SCHEMA_FILE_PATH
+from src.utils.main_utils import read_yaml_file, write_json_file
+from src.utils.feature_store import read_feature_store, write_feature_store
+from src.utils.drift_utils import detect_drift, sample_dataframe
+from src.utils.schema_validator import SchemaValidator
+from src.constant.training import SCHEMA_FILE_PATH, COLUMNS_TO_REMOVE
 
 import os
 import sys
 import pandas as pd
-from scipy.stats import ks_2samp
 
 class DataValidation:
     def __init__(self, data_ingestion_artifact: DataIngestionArtifact, data_validation_config: DataValidationConfig):
@@ -17,53 +19,73 @@ class DataValidation:
             self.data_ingestion_artifact = data_ingestion_artifact
             self.data_validation_config = data_validation_config
             self.data_schema = read_yaml_file(SCHEMA_FILE_PATH)
+            self.schema_validator = SchemaValidator(self.data_schema)
         except Exception as e:
             raise CustomerChurnException(e,sys)
     
     def read_data(self, file_path)->pd.DataFrame:
         try:
-            return pd.read_csv(file_path)
+            return read_feature_store(file_path)
         except Exception as e:
             raise CustomerChurnException(e,sys)
         
-    def validate_number_of_columns(self, dataframe: pd.DataFrame)->bool:
+    def split_invalid_rows(self, dataframe: pd.DataFrame)->tuple:
         try:
-            number_of_columns = len(self.data_schema["columns"])
-            logging.info(f"Required Number of Columns : {number_of_columns}")
-            logging.info(f"Number of DataFrame Columns : {len(dataframe.columns)}")
-            if len(dataframe.columns) == number_of_columns:
-                return True
-            return False
+            valid_mask, report = self.schema_validator.validate(dataframe)
+            if valid_mask.all():
+                return dataframe, dataframe.iloc[:0], report
+            valid_data = dataframe[valid_mask].reset_index(drop=True)
+            invalid_data = dataframe[~valid_mask].reset_index(drop=True)
+            return valid_data, invalid_data, report
         except Exception as e:
             raise CustomerChurnException(e,sys)
-    
-    def detect_data_drift(self, base_df, current_df, threshold=0.05)->bool:
+
+    def export_invalid_rows(self, invalid_data: pd.DataFrame, file_path: str)->str:
         try:
-            status = True
-            report = {}
-            for column in base_df.columns:
-                d1 = base_df[column]
-                d2 = current_df[column]
-                is_same_dist = ks_2samp(d1,d2)
-                if threshold <= is_same_dist.pvalue:
-                    is_found = False
-                else:
-                    is_found = True
-                    status = False
-                report.update({column : {
-                    "pvalue" :  float(is_same_dist.pvalue),
-                    "drift_status" : is_found
-                }})
-            
-            drift_report_file_path = self.data_validation_config.drift_report_file_path
+            if invalid_data.empty:
+                return None
+            write_feature_store(invalid_data, file_path, export_csv=self.data_validation_config.export_csv)
+            return file_path
+        except Exception as e:
+            raise CustomerChurnException(e,sys)
 
-            # Creating and Saving Data Drift Report
-            dir_path = os.path.dirname(drift_report_file_path)
-            os.makedirs(dir_path,exist_ok=True)
+    def get_drift_columns(self)->tuple:
+        try:
+            # Identifier columns are dropped before training, so their drift carries no signal
+            columns = {
+                column: spec["type"] for column, spec in self.data_schema["columns"].items()
+                if column not in COLUMNS_TO_REMOVE
+            }
+            numerical_columns = [column for column, column_type in columns.items() if column_type in ("int","float")]
+            categorical_columns = [column for column, column_type in columns.items() if column_type == "category"]
+            return numerical_columns, categorical_columns
+        except Exception as e:
+            raise CustomerChurnException(e,sys)
 
-            write_yaml_file(drift_report_file_path, report)
+    def detect_data_drift(self, base_df, current_df, threshold=None)->bool:
+        try:
+            config = self.data_validation_config
+            numerical_columns, categorical_columns = self.get_drift_columns()
+
+            base_df = sample_dataframe(base_df, config.drift_sample_size, config.random_state)
+            current_df = sample_dataframe(current_df, config.drift_sample_size, config.random_state)
 
-            return status
+            report = detect_drift(
+                base_df, current_df, numerical_columns, categorical_columns,
+                numerical_tests=config.numerical_drift_tests,
+                categorical_tests=config.categorical_drift_tests,
+                pvalue_threshold=config.drift_pvalue_threshold if threshold is None else threshold,
+                psi_threshold=config.psi_threshold,
+                psi_bins=config.psi_bins,
+                wasserstein_threshold=config.wasserstein_threshold,
+                max_workers=config.drift_max_workers
+            )
+            logging.info(f"Data Drift checked on {len(report['columns'])} Columns in {report['elapsed_ms']} ms")
+
+            # Creating and Saving Data Drift Report
+            write_json_file(config.drift_report_file_path, report)
+
+            return not report["drift_detected"]
         except Exception as e:
             raise CustomerChurnException(e,sys)
     
@@ -77,16 +99,21 @@ class DataValidation:
             train_data = self.read_data(train_file_path)
             test_data = self.read_data(test_file_path)
 
-            logging.info("Validating Number of Columns")
-            status = self.validate_number_of_columns(train_data)
-            if not status:
-                error_message = f"Train Dataframe does not contain all columns\n"
-                logging.info(error_message)
-            status = self.validate_number_of_columns(test_data)
-            if not status:
-                error_message = f"Test Dataframe does not contain all columns\n"
-                logging.info(error_message)
-            logging.info(f"Column Validation Status : {status}")
+            logging.info("Validating Train and Test Data against the Schema")
+            train_data, invalid_train_data, train_report = self.split_invalid_rows(train_data)
+            test_data, invalid_test_data, test_report = self.split_invalid_rows(test_data)
+            write_json_file(
+                self.data_validation_config.schema_report_file_path, {"train" : train_report, "test" : test_report}
+            )
+            for name, report in (("Train", train_report), ("Test", test_report)):
+                if report["missing_columns"]:
+                    logging.info(f"{name} Dataframe does not contain all columns : {report['missing_columns']}")
+                logging.info(
+                    f"{name} Schema Validation : {report['invalid_rows']} of {report['rows']} rows invalid "
+                    f"in {report['elapsed_ms']} ms"
+                )
+            column_status = not train_report["missing_columns"] and not test_report["missing_columns"]
+            logging.info(f"Column Validation Status : {column_status}")
 
             logging.info("Checking if Numerical Columns Exist")
             train_numerical_columns = train_data.select_dtypes(include=['number'])
@@ -100,25 +127,29 @@ class DataValidation:
                 logging.info(error_message)
 
             logging.info("Checking for Data Drift")
-            status = self.detect_data_drift(base_df=train_data,current_df=test_data)
+            status = self.detect_data_drift(base_df=train_data,current_df=test_data) and column_status
             dir_path = os.path.dirname(self.data_validation_config.valid_train_file_path)
             os.makedirs(dir_path,exist_ok=True)
             logging.info(f"Data Drift Status : {status}")
 
             logging.info("Exporting Valid Train and Test Data")
-            train_data.to_csv(
-                self.data_validation_config.valid_train_file_path, index=False, header=True
+            write_feature_store(
+                train_data, self.data_validation_config.valid_train_file_path, export_csv=self.data_validation_config.export_csv
             )
-            test_data.to_csv(
-                self.data_validation_config.valid_test_file_path, index=False, header=True
+            write_feature_store(
+                test_data, self.data_validation_config.valid_test_file_path, export_csv=self.data_validation_config.export_csv
             )
 
             data_validation_artifact = DataValidationArtifact(
                 validation_status=status,
                 valid_train_file_path=self.data_validation_config.valid_train_file_path,
                 valid_test_file_path=self.data_validation_config.valid_test_file_path,
-                invalid_train_file_path=None,
-                invalid_test_file_path=None,
+                invalid_train_file_path=self.export_invalid_rows(
+                    invalid_train_data, self.data_validation_config.invalid_train_file_path
+                ),
+                invalid_test_file_path=self.export_invalid_rows(
+                    invalid_test_data, self.data_validation_config.invalid_test_file_path
+                ),
                 drift_report_file_path=self.data_validation_config.drift_report_file_path
             )
 
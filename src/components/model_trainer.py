@@ -1,6 +1,6 @@
 import sys
+import scipy.sparse as sp
 
-from imblearn.over_sampling import SMOTE
 from sklearn.linear_model import LogisticRegression
 from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier
 from xgboost import XGBClassifier
@@ -9,8 +9,12 @@ from src.exception.exception import CustomerChurnException
 from src.logging.logger import logging
 from src.entity.artifact_entity import DataTransformationArtifact, ModelTrainerArtifact
 from src.entity.config_entity import ModelTrainerConfig
-from src.utils.main_utils import load_numpy_array_data, evaluate_models, load_object, save_object
+from src.utils.main_utils import load_numpy_array_data, evaluate_models, load_object, save_object, get_files_version, read_json_file, write_json_file, as_model_input, write_artifact_manifest
 from src.utils.ml_utils import get_classification_metrics
+from src.utils.inference_graph import compile_inference_graph
+from src.utils.model_search import SuccessiveHalvingSearch
+from src.utils.resampling import Resampler
+from src.utils.instrumentation import record_worker_usage
 
 class ModelTrainer:
     def __init__(self, data_transformation_artifact: DataTransformationArtifact, model_trainer_config: ModelTrainerConfig):
@@ -20,18 +24,35 @@ class ModelTrainer:
         except Exception as e:
             raise CustomerChurnException(e,sys)
     
+    def get_resampler(self)->Resampler:
+        try:
+            return Resampler(
+                strategy=self.model_trainer_config.resampling_strategy,
+                k_neighbors=self.model_trainer_config.resampling_k_neighbors,
+                algorithm=self.model_trainer_config.resampling_algorithm,
+                max_rows=self.model_trainer_config.resampling_max_rows,
+                random_state=self.model_trainer_config.resampling_random_state,
+                cache_dir=self.model_trainer_config.resampling_cache_dir
+            )
+        except Exception as e:
+            raise CustomerChurnException(e,sys)
+
     def resample_data(self, X_train, y_train):
         try:
-            smote = SMOTE(random_state=42)
-            X_train, y_train = smote.fit_resample(X_train, y_train)
-            return X_train, y_train
+            X_train, y_train, sample_weight, report = self.get_resampler().fit_resample(X_train, y_train)
+            logging.info(
+                f"Resampling ({report['strategy']}) : {report['input_rows']} -> {report['output_rows']} rows, "
+                f"cached {report['cached']}, {report['elapsed_ms']}ms, peak memory {report['peak_memory_mb']}MB"
+            )
+            write_json_file(self.model_trainer_config.resampling_report_file_path, report)
+            return X_train, y_train, sample_weight
         except Exception as e:
             raise CustomerChurnException(e,sys)
     
     def train_test_split(self):
         try:
-            train_data = load_numpy_array_data(self.data_transformation_artifact.transformed_train_file_path)
-            test_data = load_numpy_array_data(self.data_transformation_artifact.transformed_test_file_path)
+            train_data = load_numpy_array_data(self.data_transformation_artifact.transformed_train_file_path, mmap_mode="r")
+            test_data = load_numpy_array_data(self.data_transformation_artifact.transformed_test_file_path, mmap_mode="r")
 
             X_train, y_train = (
                 train_data[:,:-1],
@@ -43,42 +64,76 @@ class ModelTrainer:
                 test_data[:,-1]
             )
 
+            if sp.issparse(train_data):
+                y_train = y_train.toarray().ravel()
+                y_test = y_test.toarray().ravel()
+
             return X_train, X_test, y_train, y_test
         except Exception as e:
             raise CustomerChurnException(e,sys)
 
+    def get_model_searches(self, models: dict)->dict:
+        try:
+            searches = {}
+            for model_name in models:
+                if model_name not in self.model_trainer_config.param_grids:
+                    continue
+                searches[model_name] = SuccessiveHalvingSearch(
+                    param_grid=self.model_trainer_config.param_grids[model_name],
+                    n_candidates=self.model_trainer_config.search_n_candidates,
+                    eta=self.model_trainer_config.search_eta,
+                    min_resource=self.model_trainer_config.search_min_resource,
+                    time_budget=self.model_trainer_config.search_time_budget,
+                    early_stopping_rounds=self.model_trainer_config.early_stopping_rounds,
+                    cache_dir=self.model_trainer_config.search_cache_dir,
+                    resampler=self.get_resampler()
+                )
+            return searches
+        except Exception as e:
+            raise CustomerChurnException(e,sys)
+
     def train_models(self):
         try:
             models = {
                 "Logistic Regression": LogisticRegression(verbose=1, max_iter=10000),
                 "Random Forest Classifier" : RandomForestClassifier(
-                    class_weight="balanced", n_estimators=200, max_depth=8, n_jobs=-1, verbose=1
+                    class_weight="balanced", n_estimators=200, max_depth=8, n_jobs=-1, verbose=1, random_state=42
                 ),
-                "Gradient Boosting Classifier" : GradientBoostingClassifier(verbose=1),
-                "XGBoost Classifier" : XGBClassifier(),
+                "Gradient Boosting Classifier" : GradientBoostingClassifier(verbose=1, random_state=42),
+                "XGBoost Classifier" : XGBClassifier(random_state=42),
             }
 
             logging.info('Train Test Splitting the Train and Test Numpy Arrays')
             X_train, X_test, y_train, y_test = self.train_test_split()
 
-            logging.info('Resampling Data Using SMOTE')
-            X_train_smote, y_train_smote = self.resample_data(X_train, y_train)
+            logging.info('Resampling Training Data')
+            X_train_resampled, y_train_resampled, sample_weight = self.resample_data(X_train, y_train)
 
             logging.info('Training Models using Hyperparameter Tuning')
-            model_report, best_models = evaluate_models(
-                models, X_train_smote, X_test, y_train_smote, y_test
+            model_report, best_models, fit_times, worker_usage = evaluate_models(
+                models, X_train_resampled, X_test, y_train_resampled, y_test,
+                max_workers=self.model_trainer_config.max_workers,
+                cpu_budget=self.model_trainer_config.cpu_budget,
+                start_method=self.model_trainer_config.start_method,
+                searches=self.get_model_searches(models),
+                sample_weight=sample_weight,
+                X_search=X_train, y_search=y_train
             )
-            
+            record_worker_usage(worker_usage["cpu_seconds"], worker_usage["peak_rss_mb"])
+            for model_name, fit_time in fit_times.items():
+                logging.info(f'{model_name} Fit Time : {fit_time:.2f}s, F1 Score : {model_report[model_name]:.4f}')
+
             logging.info('Evaluating Models using Classification Metrics')
             best_model_score = max(sorted(list(model_report.values())))
             best_model_name = list(model_report.keys())[list(model_report.values()).index(best_model_score)]
             best_model = best_models[best_model_name]
             logging.info(f'Best Model : {best_model_name}, Accuracy Score : {best_model_score*100:.2f}%')
 
-            y_train_pred = best_model.predict(X_train_smote)
-            y_test_pred = best_model.predict(X_test)
+            # Train metrics are measured on the real rows, synthetic samples would flatter them
+            y_train_pred = best_model.predict(as_model_input(best_model, X_train))
+            y_test_pred = best_model.predict(as_model_input(best_model, X_test))
 
-            train_metrics = get_classification_metrics(y_train_smote, y_train_pred)
+            train_metrics = get_classification_metrics(y_train, y_train_pred)
             test_metrics = get_classification_metrics(y_test, y_test_pred)
 
             preprocessor = load_object(self.data_transformation_artifact.preprocessor_object_file_path)
@@ -88,11 +143,50 @@ class ModelTrainer:
             save_object(preprocessor, self.model_trainer_config.preprocessor_file_path)
             save_object(ohe, self.model_trainer_config.encoder_file_path)
             save_object(best_model, self.model_trainer_config.model_file_path)
+            write_json_file(
+                self.model_trainer_config.reference_profile_file_path,
+                read_json_file(self.data_transformation_artifact.reference_profile_file_path)
+            )
+
+            inference_graph_exported = self.export_inference_graph(ohe, preprocessor, best_model)
+            self.publish_artifacts(inference_graph_exported)
 
             return train_metrics, test_metrics
         except Exception as e:
             raise CustomerChurnException(e,sys)
         
+    def publish_artifacts(self, inference_graph_exported: bool):
+        try:
+            # The manifest goes last, the serving registry only loads a set of files that all match it
+            artifact_paths = {
+                "encoder" : self.model_trainer_config.encoder_file_path,
+                "preprocessor" : self.model_trainer_config.preprocessor_file_path,
+                "model" : self.model_trainer_config.model_file_path,
+                "reference_profile" : self.model_trainer_config.reference_profile_file_path
+            }
+            if inference_graph_exported:
+                artifact_paths["inference_graph"] = self.model_trainer_config.inference_graph_file_path
+            write_artifact_manifest(self.model_trainer_config.manifest_file_path, artifact_paths)
+            logging.info(f'Published Model Artifacts : {list(artifact_paths)}')
+        except Exception as e:
+            raise CustomerChurnException(e,sys)
+
+    def export_inference_graph(self, ohe, preprocessor, model)->bool:
+        try:
+            logging.info('Compiling Inference Graph')
+            source_version = get_files_version([
+                self.model_trainer_config.encoder_file_path,
+                self.model_trainer_config.preprocessor_file_path,
+                self.model_trainer_config.model_file_path
+            ])
+            inference_graph = compile_inference_graph(ohe, preprocessor, model, source_version)
+            inference_graph.save(self.model_trainer_config.inference_graph_file_path)
+            return True
+        except Exception as e:
+            # The pickled objects remain the source of truth, serving falls back to them
+            logging.info(f'Inference Graph was not exported : {e}')
+            return False
+
     def initiate_model_trainer(self):
         try:
             logging.info('Initiating Model Training')
@@ -0,0 +1,42 @@
+import os
+
+'''
+SYNTHETIC DATA RELATED VARIABLES
+'''
+BENCHMARK_SOURCE_FILE_PATH: str = os.path.join("Customer_Data", "Churn_Modelling.csv")
+BENCHMARK_SIZES: dict = {
+    "10k" : 10000,
+    "1m" : 1000000,
+    "10m" : 10000000
+}
+BENCHMARK_DEFAULT_SIZES: list = ["10k"]
+BENCHMARK_CHUNK_SIZE: int = 500000
+# Kernel noise added to continuous columns, as a fraction of the column's standard deviation
+BENCHMARK_JITTER: float = 0.05
+BENCHMARK_MISSING_RATE: float = 0.0
+BENCHMARK_RANDOM_STATE: int = 42
+
+'''
+BENCHMARK RUN RELATED VARIABLES
+'''
+BENCHMARK_DIR: str = "benchmarks"
+BENCHMARK_RUNS_DIR_NAME: str = "runs"
+BENCHMARK_RESULTS_DIR_NAME: str = "results"
+# Model training grows much faster than the other stages, larger datasets stop after transformation
+BENCHMARK_MODEL_TRAINER_MAX_ROWS: int = 1000000
+BENCHMARK_MEMORY_SAMPLE_INTERVAL: float = 0.01
+BENCHMARK_SINGLE_REQUESTS: int = 200
+BENCHMARK_BATCH_SIZE: int = 1000
+BENCHMARK_BATCH_REQUESTS: int = 20
+BENCHMARK_FILE_ROWS: int = 10000
+
+'''
+REGRESSION CHECK RELATED VARIABLES
+'''
+# Allowed relative change against the baseline before a metric counts as a regression
+BENCHMARK_REGRESSION_THRESHOLDS: dict = {
+    "seconds" : 0.2,
+    "ms" : 0.25,
+    "peak_rss_mb" : 0.15,
+    "rows_per_second" : 0.2
+}
@@ -0,0 +1,19 @@
+import os
+
+'''
+LOGGING RELATED VARIABLES
+'''
+LOG_DIR: str = os.path.join(os.getcwd(), "Logs")
+# Set by the first process to import the logger, worker processes started with spawn or forkserver inherit it
+# and write to the same file instead of opening one of their own
+LOG_FILE_PATH_ENV_VAR: str = "CHURN_LOG_FILE_PATH"
+LOG_FILE_TIMESTAMP_FORMAT: str = "%d-%m-%Y-%H-%M-%S"
+LOG_LEVEL: str = "INFO"
+LOG_MAX_BYTES: int = 10 * 1024 * 1024
+LOG_BACKUP_COUNT: int = 5
+# Records are dropped rather than blocking the caller once this many are waiting for the writer thread
+LOG_QUEUE_SIZE: int = 10000
+# High frequency events keep one record in every N, keyed by the "event" passed in extra
+LOG_SAMPLE_RATES: dict = {
+    "prediction" : 100
+}
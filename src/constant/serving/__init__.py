@@ -0,0 +1,52 @@
+'''
+MODEL REGISTRY RELATED VARIABLES
+'''
+MODEL_REGISTRY_POLL_INTERVAL: float = 5.0
+
+'''
+DRIFT MONITOR RELATED VARIABLES
+'''
+DRIFT_PSI_THRESHOLD: float = 0.2
+DRIFT_MIN_OBSERVATIONS: int = 100
+
+'''
+BATCH PREDICTION RELATED VARIABLES
+'''
+BATCH_PREDICTION_CHUNK_SIZE: int = 10000
+BATCH_PREDICTION_FILE_FORMATS: dict = {
+    ".csv" : "csv",
+    ".jsonl" : "jsonl",
+    ".ndjson" : "jsonl"
+}
+
+'''
+TRAINING JOB RELATED VARIABLES
+'''
+TRAINING_JOB_HISTORY: int = 20
+
+'''
+MICRO BATCHING RELATED VARIABLES
+'''
+MICRO_BATCH_MAX_SIZE: int = 64
+MICRO_BATCH_MAX_WAIT_MS: float = 5.0
+MICRO_BATCH_WORKERS: int = 2
+
+'''
+PREDICTION CACHE RELATED VARIABLES
+'''
+PREDICTION_CACHE_MAX_SIZE: int = 100000
+PREDICTION_CACHE_TTL: float = 3600.0
+
+'''
+SERVING METRICS RELATED VARIABLES
+'''
+SERVING_METRICS_LATENCY_BUCKETS: tuple = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+SERVING_METRICS_STAGES: tuple = ("validation", "preprocessing", "predict_proba")
+
+'''
+COLD START RELATED VARIABLES
+'''
+# Time from importing the API module to having the model resident, a slower start is logged as a warning
+COLD_START_BUDGET_SECONDS: float = 1.5
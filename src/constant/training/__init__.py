@@ -13,18 +13,45 @@ COLUMNS_TO_REMOVE: list = ["RowNumber","CustomerId","Surname"]
 
 TRAIN_FILE_NAME: str = "train.csv"
 TEST_FILE_NAME: str = "test.csv"
+FEATURE_STORE_FILE_NAME: str = "Churn_Modelling.arrow"
+TRAIN_FEATURE_FILE_NAME: str = "train.arrow"
+TEST_FEATURE_FILE_NAME: str = "test.arrow"
+FEATURE_STORE_EXPORT_CSV: bool = False
 PREPROCESSOR_OBJECT_NAME: str = "preprocessor.pkl"
 MODEL_FILE_NAME: str = "churn_model.pkl"
 ENCODER_OBJECT_NAME: str = "onehotencoder.pkl"
 SCALER_OBJECT_NAME: str = "scaler.pkl"
+INFERENCE_GRAPH_FILE_NAME: str = "inference_graph.npz"
+REFERENCE_PROFILE_FILE_NAME: str = "reference_profile.json"
+ARTIFACT_MANIFEST_FILE_NAME: str = "manifest.json"
 
 SCHEMA_FILE_PATH: str = os.path.join('data_schema','schema.yaml')
+STAGE_CACHE_DIR_NAME: str = "stage_cache"
+# Data ingestion is only skipped when MongoDB can fingerprint the collection server side, through dbHash or
+# a $toHashedIndexKey aggregation, otherwise it runs on every pipeline run
+SKIP_UNCHANGED_STAGES: bool = True
+TRAINING_PIPELINE_STAGES: tuple = (
+    "data_ingestion", "data_validation", "data_transformation", "model_trainer", "aws_sync"
+)
+
+# Every stage records wall time, CPU time, peak RSS and row counts, profiling is opt-in (cprofile or sampling)
+STAGE_METRICS_DIR_NAME: str = "stage_metrics"
+STAGE_MEMORY_SAMPLE_INTERVAL: float = 0.01
+PROFILE_STAGES: bool = False
+STAGE_PROFILER: str = "cprofile"
+STAGE_PROFILE_DIR_NAME: str = "profiles"
+STAGE_PROFILER_SAMPLE_INTERVAL: float = 0.005
 
 '''
 MONGO DB VARIABLES
 '''
 DATABASE_NAME: str = "GAURVIT"
 COLLECTION_NAME: str = "ChurnData"
+PUSH_DATA_CHUNK_SIZE: int = 50000
+PUSH_DATA_BATCH_SIZE: int = 5000
+PUSH_DATA_MAX_WORKERS: int = 4
+PUSH_DATA_MAX_RETRIES: int = 3
+PUSH_DATA_RETRY_BACKOFF: float = 0.5
 
 '''
 DATA INGESTION RELATED VARIABLES
@@ -35,6 +62,9 @@ DATA_INGESTION_DIR_NAME: str = "data_ingestion"
 DATA_INGESTION_FEATURE_STORE_DIR: str = "feature_store"
 DATA_INGESTION_INGESTED_DIR: str = "ingested"
 DATA_INGESTION_TRAIN_TEST_SPLIT_RATIO: float = 0.2
+DATA_INGESTION_STREAMING: bool = True
+DATA_INGESTION_BATCH_SIZE: int = 10000
+DATA_INGESTION_RANDOM_STATE: int = 42
 
 '''
 DATA VALIDATION RELATED VARIABLES
@@ -43,7 +73,17 @@ DATA_VALIDATION_DIR_NAME: str = "data_validation"
 DATA_VALIDATION_VALID_DIR: str = "validated"
 DATA_VALIDATION_INVALID_DIR: str = "invalid"
 DATA_VALIDATION_DRIFT_REPORT_DIR: str = "drift_report"
-DATA_VALIDATION_DRIFT_REPORT_FILE_NAME: str = "report.yaml"
+DATA_VALIDATION_DRIFT_REPORT_FILE_NAME: str = "report.json"
+DATA_VALIDATION_SCHEMA_REPORT_FILE_NAME: str = "schema_report.json"
+DATA_VALIDATION_NUMERICAL_DRIFT_TESTS: list = ["ks","psi","wasserstein"]
+DATA_VALIDATION_CATEGORICAL_DRIFT_TESTS: list = ["chi2","psi"]
+DATA_VALIDATION_DRIFT_PVALUE_THRESHOLD: float = 0.05
+DATA_VALIDATION_PSI_THRESHOLD: float = 0.2
+DATA_VALIDATION_PSI_BINS: int = 10
+DATA_VALIDATION_WASSERSTEIN_THRESHOLD: float = 0.1
+DATA_VALIDATION_DRIFT_SAMPLE_SIZE: int = None
+DATA_VALIDATION_DRIFT_MAX_WORKERS: int = None
+DATA_VALIDATION_RANDOM_STATE: int = 42
 
 '''
 DATA TRANSFORMATION RELATED VARIABLES
@@ -51,11 +91,80 @@ DATA TRANSFORMATION RELATED VARIABLES
 DATA_TRANSFORMATION_DIR_NAME: str = "data_transformation"
 DATA_TRANSFORMATION_TRANSFORMED_DIR_NAME: str = "transformed"
 DATA_TRANSFORMATION_TRANSFORMED_OBJECT_DIR_NAME: str = "transformed_object"
+DATA_TRANSFORMATION_PROFILE_BINS: int = 20
+DATA_TRANSFORMATION_PROFILE_QUANTILES: int = 101
+DATA_TRANSFORMATION_OUT_OF_CORE: bool = False
+DATA_TRANSFORMATION_SPARSE: bool = False
+DATA_TRANSFORMATION_CHUNK_SIZE: int = 100000
+DATA_TRANSFORMATION_FIT_SAMPLE_SIZE: int = 200000
+DATA_TRANSFORMATION_RANDOM_STATE: int = 42
 DATA_TRANSFORMATION_IMPUTER_PARAMS: dict = {
     "missing_values" : np.nan,
     "n_neighbors" : 3,
     "weights" : "uniform"
 }
+DATA_TRANSFORMATION_IMPUTER_STRATEGY: str = "knn"
+DATA_TRANSFORMATION_IMPUTER_STRATEGY_PARAMS: dict = {
+    "knn" : DATA_TRANSFORMATION_IMPUTER_PARAMS,
+    "knn_index" : {
+        **DATA_TRANSFORMATION_IMPUTER_PARAMS,
+        "algorithm" : "kd_tree",
+        "max_reference_rows" : 50000
+    },
+    "median" : {"missing_values" : np.nan},
+    "mean" : {"missing_values" : np.nan},
+    "most_frequent" : {"missing_values" : np.nan},
+    "iterative" : {"missing_values" : np.nan, "max_iter" : 10, "random_state" : 42}
+}
+
+'''
+MODEL TRAINER RELATED VARIABLES
+'''
+MODEL_TRAINER_DIR_NAME: str = "model_trainer"
+MODEL_TRAINER_RESAMPLING_REPORT_FILE_NAME: str = "resampling_report.json"
+MODEL_TRAINER_RESAMPLING_CACHE_DIR_NAME: str = "resampling_cache"
+# smote, class_weight, undersample or none
+MODEL_TRAINER_RESAMPLING_STRATEGY: str = "smote"
+MODEL_TRAINER_RESAMPLING_K_NEIGHBORS: int = 5
+MODEL_TRAINER_RESAMPLING_ALGORITHM: str = "auto"
+# Above this many training rows resampling is skipped in favour of class weights
+MODEL_TRAINER_RESAMPLING_MAX_ROWS: int = 1000000
+MODEL_TRAINER_RESAMPLING_RANDOM_STATE: int = 42
+INFERENCE_GRAPH_TOLERANCE: float = 1e-6
+MODEL_TRAINER_MAX_WORKERS: int = None
+MODEL_TRAINER_CPU_BUDGET: dict = {}
+# Training can run inside the API process, forking its threads (batcher, watcher, log writer, BLAS pools) can deadlock a worker
+MODEL_TRAINER_START_METHOD: str = "forkserver"
+MODEL_TRAINER_SEARCH_CACHE_DIR_NAME: str = "model_search_cache"
+MODEL_TRAINER_SEARCH_N_CANDIDATES: int = 16
+MODEL_TRAINER_SEARCH_ETA: int = 3
+MODEL_TRAINER_SEARCH_MIN_RESOURCE: int = 500
+MODEL_TRAINER_SEARCH_TIME_BUDGET: float = 600.0
+MODEL_TRAINER_EARLY_STOPPING_ROUNDS: int = 50
+MODEL_TRAINER_PARAM_GRIDS: dict = {
+    "Logistic Regression" : {
+        "C" : [0.01, 0.1, 1.0, 10.0, 100.0]
+    },
+    "Random Forest Classifier" : {
+        "n_estimators" : [100, 200, 400],
+        "max_depth" : [4, 6, 8, 12, None],
+        "min_samples_leaf" : [1, 2, 5, 10]
+    },
+    "Gradient Boosting Classifier" : {
+        "n_estimators" : [100, 200, 300],
+        "learning_rate" : [0.03, 0.1, 0.3],
+        "max_depth" : [2, 3, 4, 5],
+        "subsample" : [0.8, 1.0]
+    },
+    "XGBoost Classifier" : {
+        "n_estimators" : [1000],
+        "learning_rate" : [0.03, 0.1, 0.3],
+        "max_depth" : [3, 4, 6, 8],
+        "min_child_weight" : [1, 5],
+        "subsample" : [0.8, 1.0],
+        "colsample_bytree" : [0.8, 1.0]
+    }
+}
 
 """
 AMAZON WEB SERVICES RELATED VARIABLES
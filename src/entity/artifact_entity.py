@@ -4,6 +4,7 @@ from dataclasses import dataclass
 class DataIngestionArtifact:
     trained_file_path: str
     test_file_path: str
+    stage_metrics: dict = None
 
 @dataclass
 class DataValidationArtifact:
@@ -13,6 +14,7 @@ class DataValidationArtifact:
     invalid_train_file_path: str
     invalid_test_file_path: str
     drift_report_file_path: str
+    stage_metrics: dict = None
 
 @dataclass
 class DataTransformationArtifact:
@@ -20,6 +22,8 @@ class DataTransformationArtifact:
     transformed_test_file_path: str
     preprocessor_object_file_path: str
     encoder_object_file_path: str
+    reference_profile_file_path: str
+    stage_metrics: dict = None
 
 @dataclass
 class ClassificationMetric:
@@ -31,4 +35,5 @@ class ClassificationMetric:
 class ModelTrainerArtifact:
     trained_model_file_path: str
     train_metrics: ClassificationMetric
-    test_metrics: ClassificationMetric
\ No newline at end of file
+    test_metrics: ClassificationMetric
+    stage_metrics: dict = None
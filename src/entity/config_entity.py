@@ -4,14 +4,23 @@ from datetime import datetime
 from src.constant import training
 
 class TrainingPipelineConfig:
-    def __init__(self,timestamp=datetime.now()):
+    def __init__(self,timestamp=datetime.now(), artifact_name: str = training.ARTIFACT_DIR,
+                 final_models: str = training.FINAL_MODEL_DIR):
         timestamp = timestamp.strftime("%d-%m-%Y-%H-%M-%S")
         self.pipeline_name = training.PIPELINE_NAME
-        self.artifact_name = training.ARTIFACT_DIR
-        self.final_models = training.FINAL_MODEL_DIR
+        self.artifact_name = artifact_name
+        self.final_models = final_models
         self.artifact_dir = os.path.join(self.artifact_name,timestamp)
         self.timestamp: str = timestamp
-        self.model_dir: str = os.path.join('final_models')
+        self.model_dir: str = os.path.join(final_models)
+        self.stage_cache_dir: str = os.path.join(self.artifact_name, training.STAGE_CACHE_DIR_NAME)
+        self.skip_unchanged_stages: bool = training.SKIP_UNCHANGED_STAGES
+        self.stage_metrics_dir: str = os.path.join(self.artifact_dir, training.STAGE_METRICS_DIR_NAME)
+        self.stage_memory_sample_interval: float = training.STAGE_MEMORY_SAMPLE_INTERVAL
+        self.profile_stages: bool = training.PROFILE_STAGES
+        self.stage_profiler: str = training.STAGE_PROFILER
+        self.stage_profile_dir: str = os.path.join(self.artifact_dir, training.STAGE_PROFILE_DIR_NAME)
+        self.stage_profiler_sample_interval: float = training.STAGE_PROFILER_SAMPLE_INTERVAL
 
 class DataIngestionConfig:
     def __init__(self, training_pipeline_config: TrainingPipelineConfig):
@@ -19,18 +28,22 @@ class DataIngestionConfig:
             training_pipeline_config.artifact_dir, training.DATA_INGESTION_DIR_NAME
         )
         self.feature_store_path: str = os.path.join(
-            self.data_ingestion_dir, training.DATA_INGESTION_FEATURE_STORE_DIR, training.FILE_NAME
+            self.data_ingestion_dir, training.DATA_INGESTION_FEATURE_STORE_DIR, training.FEATURE_STORE_FILE_NAME
         )
         self.training_file_path: str = os.path.join(
-            self.data_ingestion_dir, training.DATA_INGESTION_INGESTED_DIR, training.TRAIN_FILE_NAME
+            self.data_ingestion_dir, training.DATA_INGESTION_INGESTED_DIR, training.TRAIN_FEATURE_FILE_NAME
         )
         self.testing_file_path: str = os.path.join(
-            self.data_ingestion_dir, training.DATA_INGESTION_INGESTED_DIR, training.TEST_FILE_NAME
+            self.data_ingestion_dir, training.DATA_INGESTION_INGESTED_DIR, training.TEST_FEATURE_FILE_NAME
         )
+        self.export_csv: bool = training.FEATURE_STORE_EXPORT_CSV
 
         self.train_test_split_ratio: float = training.DATA_INGESTION_TRAIN_TEST_SPLIT_RATIO
         self.database_name: str = training.DATABASE_NAME
         self.collection_name: str = training.COLLECTION_NAME
+        self.streaming: bool = training.DATA_INGESTION_STREAMING
+        self.batch_size: int = training.DATA_INGESTION_BATCH_SIZE
+        self.random_state: int = training.DATA_INGESTION_RANDOM_STATE
 
 class DataValidationConfig:
     def __init__(self, training_pipeline_config: TrainingPipelineConfig):
@@ -44,21 +57,34 @@ class DataValidationConfig:
             self.data_validation_dir, training.DATA_VALIDATION_INVALID_DIR
         )
         self.valid_train_file_path: str = os.path.join(
-            self.valid_data_dir, training.TRAIN_FILE_NAME
+            self.valid_data_dir, training.TRAIN_FEATURE_FILE_NAME
         )
         self.valid_test_file_path: str = os.path.join(
-            self.valid_data_dir, training.TEST_FILE_NAME
+            self.valid_data_dir, training.TEST_FEATURE_FILE_NAME
         )
         self.invalid_train_file_path: str = os.path.join(
-            self.invalid_data_dir, training.TRAIN_FILE_NAME
+            self.invalid_data_dir, training.TRAIN_FEATURE_FILE_NAME
         )
         self.invalid_test_file_path: str = os.path.join(
-            self.invalid_data_dir, training.TEST_FILE_NAME
+            self.invalid_data_dir, training.TEST_FEATURE_FILE_NAME
         )
+        self.export_csv: bool = training.FEATURE_STORE_EXPORT_CSV
         self.drift_report_file_path: str = os.path.join(
             self.data_validation_dir, training.DATA_VALIDATION_DRIFT_REPORT_DIR,
             training.DATA_VALIDATION_DRIFT_REPORT_FILE_NAME
         )
+        self.schema_report_file_path: str = os.path.join(
+            self.data_validation_dir, training.DATA_VALIDATION_SCHEMA_REPORT_FILE_NAME
+        )
+        self.numerical_drift_tests: list = training.DATA_VALIDATION_NUMERICAL_DRIFT_TESTS
+        self.categorical_drift_tests: list = training.DATA_VALIDATION_CATEGORICAL_DRIFT_TESTS
+        self.drift_pvalue_threshold: float = training.DATA_VALIDATION_DRIFT_PVALUE_THRESHOLD
+        self.psi_threshold: float = training.DATA_VALIDATION_PSI_THRESHOLD
+        self.psi_bins: int = training.DATA_VALIDATION_PSI_BINS
+        self.wasserstein_threshold: float = training.DATA_VALIDATION_WASSERSTEIN_THRESHOLD
+        self.drift_sample_size: int = training.DATA_VALIDATION_DRIFT_SAMPLE_SIZE
+        self.drift_max_workers: int = training.DATA_VALIDATION_DRIFT_MAX_WORKERS
+        self.random_state: int = training.DATA_VALIDATION_RANDOM_STATE
 
 class DataTransformationConfig:
     def __init__(self, training_pipeline_config: TrainingPipelineConfig):
@@ -81,6 +107,19 @@ class DataTransformationConfig:
             self.data_transformation_dir, training.DATA_TRANSFORMATION_TRANSFORMED_OBJECT_DIR_NAME,
             training.ENCODER_OBJECT_NAME
         )
+        self.reference_profile: str = os.path.join(
+            self.data_transformation_dir, training.DATA_TRANSFORMATION_TRANSFORMED_OBJECT_DIR_NAME,
+            training.REFERENCE_PROFILE_FILE_NAME
+        )
+        self.profile_bins: int = training.DATA_TRANSFORMATION_PROFILE_BINS
+        self.profile_quantiles: int = training.DATA_TRANSFORMATION_PROFILE_QUANTILES
+        self.imputer_strategy: str = training.DATA_TRANSFORMATION_IMPUTER_STRATEGY
+        self.imputer_params: dict = training.DATA_TRANSFORMATION_IMPUTER_STRATEGY_PARAMS.get(self.imputer_strategy, {})
+        self.out_of_core: bool = training.DATA_TRANSFORMATION_OUT_OF_CORE
+        self.sparse: bool = training.DATA_TRANSFORMATION_SPARSE
+        self.chunk_size: int = training.DATA_TRANSFORMATION_CHUNK_SIZE
+        self.fit_sample_size: int = training.DATA_TRANSFORMATION_FIT_SAMPLE_SIZE
+        self.random_state: int = training.DATA_TRANSFORMATION_RANDOM_STATE
 
 class ModelTrainerConfig:
     def __init__(self, training_pipeline_config: TrainingPipelineConfig):
@@ -95,4 +134,39 @@ class ModelTrainerConfig:
         )
         self.scaler_file_path: str = os.path.join(
             training_pipeline_config.final_models, training.SCALER_OBJECT_NAME
-        )
\ No newline at end of file
+        )
+        self.inference_graph_file_path: str = os.path.join(
+            training_pipeline_config.final_models, training.INFERENCE_GRAPH_FILE_NAME
+        )
+        self.reference_profile_file_path: str = os.path.join(
+            training_pipeline_config.final_models, training.REFERENCE_PROFILE_FILE_NAME
+        )
+        self.manifest_file_path: str = os.path.join(
+            training_pipeline_config.final_models, training.ARTIFACT_MANIFEST_FILE_NAME
+        )
+        self.search_cache_dir: str = os.path.join(
+            training_pipeline_config.artifact_name, training.MODEL_TRAINER_SEARCH_CACHE_DIR_NAME
+        )
+        self.model_trainer_dir: str = os.path.join(
+            training_pipeline_config.artifact_dir, training.MODEL_TRAINER_DIR_NAME
+        )
+        self.resampling_report_file_path: str = os.path.join(
+            self.model_trainer_dir, training.MODEL_TRAINER_RESAMPLING_REPORT_FILE_NAME
+        )
+        self.resampling_cache_dir: str = os.path.join(
+            training_pipeline_config.artifact_name, training.MODEL_TRAINER_RESAMPLING_CACHE_DIR_NAME
+        )
+        self.resampling_strategy: str = training.MODEL_TRAINER_RESAMPLING_STRATEGY
+        self.resampling_k_neighbors: int = training.MODEL_TRAINER_RESAMPLING_K_NEIGHBORS
+        self.resampling_algorithm: str = training.MODEL_TRAINER_RESAMPLING_ALGORITHM
+        self.resampling_max_rows: int = training.MODEL_TRAINER_RESAMPLING_MAX_ROWS
+        self.resampling_random_state: int = training.MODEL_TRAINER_RESAMPLING_RANDOM_STATE
+        self.max_workers: int = training.MODEL_TRAINER_MAX_WORKERS
+        self.cpu_budget: dict = training.MODEL_TRAINER_CPU_BUDGET
+        self.start_method: str = training.MODEL_TRAINER_START_METHOD
+        self.param_grids: dict = training.MODEL_TRAINER_PARAM_GRIDS
+        self.search_n_candidates: int = training.MODEL_TRAINER_SEARCH_N_CANDIDATES
+        self.search_eta: int = training.MODEL_TRAINER_SEARCH_ETA
+        self.search_min_resource: int = training.MODEL_TRAINER_SEARCH_MIN_RESOURCE
+        self.search_time_budget: float = training.MODEL_TRAINER_SEARCH_TIME_BUDGET
+        self.early_stopping_rounds: int = training.MODEL_TRAINER_EARLY_STOPPING_ROUNDS
\ No newline at end of file
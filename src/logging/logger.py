@@ -1,16 +1,126 @@
 import os
-from datetime import datetime
+import sys
+import json
+import queue
+import atexit
 import logging
+import itertools
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+from src.constant.logging import (
+    LOG_DIR, LOG_FILE_PATH_ENV_VAR, LOG_FILE_TIMESTAMP_FORMAT, LOG_LEVEL, LOG_MAX_BYTES, LOG_BACKUP_COUNT, LOG_QUEUE_SIZE, LOG_SAMPLE_RATES
+)
+
+LOG_FILE = f"{datetime.now().strftime(LOG_FILE_TIMESTAMP_FORMAT)}.log"
+
+LOG_FILE_PATH = os.environ.setdefault(LOG_FILE_PATH_ENV_VAR, os.path.join(LOG_DIR,LOG_FILE))
+
+# Attributes every LogRecord carries, anything else on a record came in through extra and is logged as a field
+RESERVED_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord)->str:
+        entry = {
+            "timestamp" : datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level" : record.levelname,
+            "logger" : record.name,
+            "module" : record.module,
+            "line" : record.lineno,
+            "message" : record.getMessage()
+        }
+        for key, value in vars(record).items():
+            if key not in RESERVED_RECORD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+class LazyRotatingFileHandler(RotatingFileHandler):
+    def __init__(self, file_path: str, max_bytes: int, backup_count: int):
+        # delay defers opening the file to the first record, so importing the package touches nothing on disk
+        super().__init__(file_path, maxBytes=max_bytes, backupCount=backup_count, delay=True, encoding="utf-8")
+
+    def _open(self):
+        os.makedirs(os.path.dirname(self.baseFilename), exist_ok=True)
+        return super()._open()
+
+class SamplingFilter(logging.Filter):
+    def __init__(self, sample_rates: dict):
+        super().__init__()
+        self.sample_rates = dict(sample_rates)
+        self._counters = {event: itertools.count() for event in self.sample_rates}
+
+    def filter(self, record: logging.LogRecord)->bool:
+        counter = self._counters.get(getattr(record, "event", None))
+        if counter is None:
+            return True
+        return next(counter) % self.sample_rates[record.event] == 0
+
+class NonBlockingQueueHandler(QueueHandler):
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord)->logging.LogRecord:
+        # Only the message is resolved on the caller's thread, JSON formatting happens on the writer thread
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            # A full queue means the disk is behind, losing a record is better than stalling a request
+            self.dropped += 1
+
+def create_file_handler()->LazyRotatingFileHandler:
+    file_handler = LazyRotatingFileHandler(LOG_FILE_PATH, LOG_MAX_BYTES, LOG_BACKUP_COUNT)
+    file_handler.setFormatter(JsonFormatter())
+    return file_handler
+
+def is_worker_process()->bool:
+    # Checked through sys.modules so the main process does not pay for importing multiprocessing
+    multiprocessing = sys.modules.get("multiprocessing")
+    return multiprocessing is not None and multiprocessing.parent_process() is not None
+
+def stop_listener():
+    # Flushes whatever is still queued before the interpreter exits
+    global listener
+    if listener is not None:
+        listener.stop()
+        listener = None
+
+def write_directly_in_child():
+    # Worker processes exit without running atexit and forked ones inherit the queue but not the writer thread,
+    # so they write straight to the file instead, none of them sit on the request path
+    global listener
+    listener = None
+    root_logger.removeHandler(queue_handler)
+    file_handler = create_file_handler()
+    file_handler.addFilter(sampling_filter)
+    root_logger.addHandler(file_handler)
 
-LOG_FILE = f"{datetime.now().strftime("%d-%M-%Y-%H-%M-%S")}.log"
+sampling_filter = SamplingFilter(LOG_SAMPLE_RATES)
+queue_handler = NonBlockingQueueHandler(queue.Queue(maxsize=LOG_QUEUE_SIZE))
+queue_handler.addFilter(sampling_filter)
 
-log_path = os.path.join(os.getcwd(),'Logs')
-os.makedirs(log_path, exist_ok=True)
+root_logger = logging.getLogger()
+root_logger.setLevel(LOG_LEVEL)
+root_logger.addHandler(queue_handler)
 
-LOG_FILE_PATH = os.path.join(log_path,LOG_FILE)
+listener = None
+if is_worker_process():
+    write_directly_in_child()
+else:
+    listener = QueueListener(queue_handler.queue, create_file_handler(), respect_handler_level=True)
+    listener.start()
 
-logging.basicConfig(
-    filename=LOG_FILE_PATH,
-    format='[%(asctime)s] %(lineno)d - %(name)s - %(levelname)s - %(message)s',
-    level=logging.INFO
-)
\ No newline at end of file
+atexit.register(stop_listener)
+os.register_at_fork(after_in_child=write_directly_in_child)
@@ -0,0 +1,68 @@
+import os
+import sys
+import json
+import hashlib
+from dataclasses import asdict, fields
+
+from src.exception.exception import CustomerChurnException
+from src.logging.logger import logging
+from src.constant import training
+
+def get_stage_parameters(*prefixes: str)->dict:
+    try:
+        return {
+            name: getattr(training, name) for name in sorted(dir(training))
+            if name.isupper() and name.startswith(prefixes)
+        }
+    except Exception as e:
+        raise CustomerChurnException(e,sys)
+
+class StageCache:
+    def __init__(self, cache_dir: str):
+        try:
+            self.cache_dir = cache_dir
+        except Exception as e:
+            raise CustomerChurnException(e,sys)
+
+    @staticmethod
+    def fingerprint(*parts)->str:
+        try:
+            content = json.dumps(parts, sort_keys=True, default=str)
+            return hashlib.sha256(content.encode()).hexdigest()[:16]
+        except Exception as e:
+            raise CustomerChurnException(e,sys)
+
+    def _entry_path(self, stage_name: str, fingerprint: str)->str:
+        return os.path.join(self.cache_dir, stage_name, f"{fingerprint}.json")
+
+    def get(self, stage_name: str, fingerprint: str, artifact_class):
+        try:
+            entry_path = self._entry_path(stage_name, fingerprint)
+            if not os.path.exists(entry_path):
+                return None
+            with open(entry_path, "r") as file:
+                entry = json.load(file)
+            if set(entry) != {field.name for field in fields(artifact_class)}:
+                logging.info(f"Stage Cache entry {stage_name}/{fingerprint} does not match {artifact_class.__name__}")
+                return None
+            artifact = artifact_class(**entry)
+
+            # An entry is only reusable while every file it points to is still on disk
+            for field, value in asdict(artifact).items():
+                if field.endswith("_path") and value is not None and not os.path.exists(value):
+                    logging.info(f"Stage Cache entry {stage_name}/{fingerprint} is stale, missing {value}")
+                    return None
+            return artifact
+        except Exception as e:
+            raise CustomerChurnException(e,sys)
+
+    def put(self, stage_name: str, fingerprint: str, artifact):
+        try:
+            entry_path = self._entry_path(stage_name, fingerprint)
+            os.makedirs(os.path.dirname(entry_path), exist_ok=True)
+            temp_entry_path = f"{entry_path}.tmp"
+            with open(temp_entry_path, "w") as file:
+                json.dump(asdict(artifact), file)
+            os.replace(temp_entry_path, entry_path)
+        except Exception as e:
+            raise CustomerChurnException(e,sys)
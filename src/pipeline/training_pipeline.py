@@ -1,6 +1,9 @@
+import os
 import sys
+from dataclasses import is_dataclass
 
 from src.exception.exception import CustomerChurnException
+from src.logging.logger import logging
 from src.components.data_ingestion import DataIngestion
 from src.components.data_validation import DataValidation
 from src.components.data_transformation import DataTransformation
@@ -12,14 +15,85 @@ from src.entity.config_entity import (
     DataTransformationConfig,
     ModelTrainerConfig
 )
-from src.constant.training import AWS_BUCKET_NAME
+from src.entity.artifact_entity import DataIngestionArtifact, DataValidationArtifact, DataTransformationArtifact
+from src.constant.training import AWS_BUCKET_NAME, SCHEMA_FILE_PATH
 from src.cloud.aws_sync import AWSSync
+from src.pipeline.stage_cache import StageCache, get_stage_parameters
+from src.utils.main_utils import get_files_version
+from src.utils.instrumentation import StageInstrumentation, get_artifact_data_files, count_rows, export_stage_metrics
 
 class TrainingPipeline:
-    def __init__(self):
+    def __init__(self, training_pipeline_config: TrainingPipelineConfig = None, progress_callback=None):
         try:
-            self.training_pipeline_config = TrainingPipelineConfig()
+            if training_pipeline_config is None:
+                training_pipeline_config = TrainingPipelineConfig()
+            self.training_pipeline_config = training_pipeline_config
+            self.progress_callback = progress_callback
             self.aws_sync = AWSSync()
+            self.stage_cache = StageCache(self.training_pipeline_config.stage_cache_dir)
+            self.schema_version = get_files_version([SCHEMA_FILE_PATH])
+        except Exception as e:
+            raise CustomerChurnException(e,sys)
+
+    def report_progress(self, stage_name: str, status: str, elapsed: float = None):
+        if self.progress_callback is None:
+            return
+        try:
+            self.progress_callback(stage_name, status, elapsed)
+        except Exception as e:
+            # Progress reporting must never fail a training run
+            logging.info(f"Progress callback failed for {stage_name} : {e}")
+
+    def track_stage(self, stage_name: str, initiate_stage, input_file_paths: list = ()):
+        try:
+            config = self.training_pipeline_config
+            self.report_progress(stage_name, "running")
+            instrumentation = StageInstrumentation(
+                stage_name,
+                profiler=config.stage_profiler if config.profile_stages else None,
+                profile_dir=config.stage_profile_dir,
+                memory_sample_interval=config.stage_memory_sample_interval,
+                profiler_sample_interval=config.stage_profiler_sample_interval
+            )
+            try:
+                with instrumentation:
+                    artifact = initiate_stage()
+            except Exception:
+                self.report_progress(stage_name, "failed", instrumentation.wall_seconds)
+                raise
+
+            output_file_paths = list(get_artifact_data_files(artifact).values()) if is_dataclass(artifact) else []
+            stage_metrics = instrumentation.metrics(count_rows(input_file_paths), count_rows(output_file_paths))
+            export_stage_metrics(os.path.join(config.stage_metrics_dir, f"{stage_name}.json"), stage_metrics)
+            if is_dataclass(artifact):
+                artifact.stage_metrics = stage_metrics
+            logging.info(f"{stage_name} completed : {stage_metrics}")
+            self.report_progress(stage_name, "completed", instrumentation.wall_seconds)
+            return artifact
+        except Exception as e:
+            raise CustomerChurnException(e,sys)
+
+    def run_stage(self, stage_name: str, get_fingerprint_parts, artifact_class, initiate_stage,
+                  input_file_paths: list = ()):
+        try:
+            # Fingerprints can cost a pass over the inputs, so they are only computed when skipping is enabled
+            fingerprint = None
+            if self.training_pipeline_config.skip_unchanged_stages:
+                fingerprint_parts = get_fingerprint_parts()
+                if None in fingerprint_parts:
+                    logging.info(f"No fingerprint available for {stage_name}, running it without the Stage Cache")
+                else:
+                    fingerprint = StageCache.fingerprint(stage_name, self.schema_version, *fingerprint_parts)
+                    artifact = self.stage_cache.get(stage_name, fingerprint, artifact_class)
+                    if artifact is not None:
+                        logging.info(f"Skipping {stage_name}, reusing artifact with fingerprint {fingerprint}")
+                        self.report_progress(stage_name, "skipped", 0.0)
+                        return artifact
+
+            artifact = self.track_stage(stage_name, initiate_stage, input_file_paths)
+            if fingerprint is not None:
+                self.stage_cache.put(stage_name, fingerprint, artifact)
+            return artifact
         except Exception as e:
             raise CustomerChurnException(e,sys)
 
@@ -27,7 +101,11 @@ class TrainingPipeline:
         try:
             data_ingestion_config = DataIngestionConfig(training_pipeline_config=self.training_pipeline_config)
             data_ingestion = DataIngestion(data_ingestion_config=data_ingestion_config)
-            data_ingestion_artifact = data_ingestion.initiate_data_ingestion()
+            data_ingestion_artifact = self.run_stage(
+                "data_ingestion",
+                lambda: [data_ingestion.get_collection_fingerprint(), get_stage_parameters("DATA_INGESTION_", "FEATURE_STORE_")],
+                DataIngestionArtifact, data_ingestion.initiate_data_ingestion
+            )
             return data_ingestion_artifact
         except Exception as e:
             raise CustomerChurnException(e,sys)
@@ -39,7 +117,15 @@ class TrainingPipeline:
             data_validation = DataValidation(
                 data_ingestion_artifact=data_ingestion_artifact,data_validation_config=data_validation_config
             )
-            data_validation_artifact = data_validation.initiate_data_validation()
+            data_validation_artifact = self.run_stage(
+                "data_validation",
+                lambda: [
+                    get_files_version([data_ingestion_artifact.trained_file_path, data_ingestion_artifact.test_file_path]),
+                    get_stage_parameters("DATA_VALIDATION_", "FEATURE_STORE_")
+                ],
+                DataValidationArtifact, data_validation.initiate_data_validation,
+                [data_ingestion_artifact.trained_file_path, data_ingestion_artifact.test_file_path]
+            )
             return data_validation_artifact
         except Exception as e:
             raise CustomerChurnException(e,sys)
@@ -51,7 +137,17 @@ class TrainingPipeline:
             data_transformation = DataTransformation(
                 data_validation_artifact=data_validation_artifact,data_transformation_config=data_transformation_config
             )
-            data_transformation_artifact = data_transformation.initiate_data_transformation()
+            data_transformation_artifact = self.run_stage(
+                "data_transformation",
+                lambda: [
+                    get_files_version([
+                        data_validation_artifact.valid_train_file_path, data_validation_artifact.valid_test_file_path
+                    ]),
+                    get_stage_parameters("DATA_TRANSFORMATION_", "TARGET_COLUMN", "COLUMNS_TO_REMOVE")
+                ],
+                DataTransformationArtifact, data_transformation.initiate_data_transformation,
+                [data_validation_artifact.valid_train_file_path, data_validation_artifact.valid_test_file_path]
+            )
             return data_transformation_artifact
         except Exception as e:
             raise CustomerChurnException(e,sys)
@@ -63,7 +159,13 @@ class TrainingPipeline:
             model_trainer = ModelTrainer(
                 data_transformation_artifact=data_transformation_artifact,model_trainer_config=model_trainer_config
             )
-            model_trainer_artifact = model_trainer.initiate_model_trainer()
+            model_trainer_artifact = self.track_stage(
+                "model_trainer", model_trainer.initiate_model_trainer,
+                [
+                    data_transformation_artifact.transformed_train_file_path,
+                    data_transformation_artifact.transformed_test_file_path
+                ]
+            )
             return model_trainer_artifact
         except Exception as e:
             raise CustomerChurnException(e,sys)
@@ -82,12 +184,18 @@ class TrainingPipeline:
         except Exception as e:
             raise CustomerChurnException(e,sys)
 
+    def sync_to_aws_s3(self):
+        try:
+            self.sync_artifact_to_aws_s3()
+            self.sync_model_dir_to_aws_s3()
+        except Exception as e:
+            raise CustomerChurnException(e,sys)
+
     def initiate_training_pipeline(self):
         try:
             model_trainer_artifact = self.start_model_trainer()
 
-            self.sync_artifact_to_aws_s3()
-            self.sync_model_dir_to_aws_s3()
+            self.track_stage("aws_sync", self.sync_to_aws_s3)
 
             return model_trainer_artifact
         except Exception as e:
@@ -1,5 +1,7 @@
+import numpy as np
+import pandas as pd
 from pydantic import BaseModel, Field
-from typing import Literal, Annotated
+from typing import Literal, Annotated, get_args, get_origin
 
 class UserInput(BaseModel):
     CreditScore: Annotated[int, Field(..., description="Credit Score", ge=0, le=900)]
@@ -11,4 +13,35 @@ class UserInput(BaseModel):
     NumOfProducts: Annotated[int, Field(..., description="Number of Products", ge=0, le=10)]
     HasCrCard: Annotated[int, Field(..., description="Credit Card", ge=0, le=1)]
     IsActiveMember: Annotated[int, Field(..., description="Active Member", ge=0, le=1)]
-    EstimatedSalary: Annotated[float, Field(..., description="Estimated Salary", ge=0)]
\ No newline at end of file
+    EstimatedSalary: Annotated[float, Field(..., description="Estimated Salary", ge=0)]
+
+def validate_input_frame(dataframe: pd.DataFrame):
+    # Applies the UserInput field constraints as whole-column masks instead of validating row by row
+    missing_columns = [column for column in UserInput.model_fields if column not in dataframe.columns]
+    if missing_columns:
+        return None, {"missing_columns" : missing_columns}
+
+    dataframe = dataframe[list(UserInput.model_fields)].copy()
+    errors = {}
+    for column, field in UserInput.model_fields.items():
+        if get_origin(field.annotation) is Literal:
+            invalid = ~dataframe[column].isin(get_args(field.annotation)).to_numpy()
+        else:
+            values = pd.to_numeric(dataframe[column], errors="coerce").to_numpy(dtype=float)
+            invalid = np.isnan(values)
+            if field.annotation is int:
+                invalid |= ~invalid & (values != np.floor(values))
+            for constraint in field.metadata:
+                if hasattr(constraint, "ge"):
+                    invalid |= values < constraint.ge
+                if hasattr(constraint, "le"):
+                    invalid |= values > constraint.le
+            if not invalid.any():
+                dataframe[column] = values.astype(field.annotation)
+
+        if invalid.any():
+            errors[column] = np.flatnonzero(invalid)[:10].tolist()
+
+    if errors:
+        return None, {"invalid_rows" : errors}
+    return dataframe, None
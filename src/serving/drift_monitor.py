@@ -0,0 +1,87 @@
+import sys
+import time
+import threading
+import pandas as pd
+
+from src.exception.exception import CustomerChurnException
+from src.constant.serving import DRIFT_PSI_THRESHOLD, DRIFT_MIN_OBSERVATIONS
+from src.utils.reference_profile import create_sketches, compare_to_profile
+
+class DriftMonitor:
+    def __init__(self, psi_threshold: float = DRIFT_PSI_THRESHOLD, min_observations: int = DRIFT_MIN_OBSERVATIONS):
+        try:
+            self.psi_threshold = psi_threshold
+            self.min_observations = min_observations
+            self.version: str = None
+            self._profile: dict = None
+            self._sketches: dict = {}
+            self._lock = threading.Lock()
+        except Exception as e:
+            raise CustomerChurnException(e,sys)
+
+    def _sync(self, version: str, profile: dict):
+        # A new model version brings a new reference, live sketches restart against it
+        if version != self.version:
+            self.version = version
+            self._profile = profile
+            self._sketches = create_sketches(profile) if profile is not None else {}
+
+    def sync(self, version: str, profile: dict):
+        try:
+            with self._lock:
+                self._sync(version, profile)
+        except Exception as e:
+            raise CustomerChurnException(e,sys)
+
+    def observe_record(self, version: str, profile: dict, record: dict):
+        try:
+            with self._lock:
+                self._sync(version, profile)
+                for column, sketch in self._sketches.items():
+                    sketch.update(record.get(column))
+        except Exception as e:
+            raise CustomerChurnException(e,sys)
+
+    def observe_records(self, version: str, profile: dict, records: list):
+        try:
+            with self._lock:
+                self._sync(version, profile)
+                for column, sketch in self._sketches.items():
+                    for record in records:
+                        sketch.update(record.get(column))
+        except Exception as e:
+            raise CustomerChurnException(e,sys)
+
+    def observe_frame(self, version: str, profile: dict, dataframe: pd.DataFrame):
+        try:
+            with self._lock:
+                self._sync(version, profile)
+                for column, sketch in self._sketches.items():
+                    if column in dataframe:
+                        sketch.update_array(dataframe[column])
+        except Exception as e:
+            raise CustomerChurnException(e,sys)
+
+    def reset(self):
+        try:
+            with self._lock:
+                if self._profile is not None:
+                    self._sketches = create_sketches(self._profile)
+        except Exception as e:
+            raise CustomerChurnException(e,sys)
+
+    def report(self)->dict:
+        try:
+            start_time = time.perf_counter()
+            with self._lock:
+                if self._profile is None:
+                    return {"available" : False, "version" : self.version}
+                report = compare_to_profile(self._profile, self._sketches, self.psi_threshold, self.min_observations)
+            report.update({
+                "available" : True,
+                "version" : self.version,
+                "elapsed_ms" : round((time.perf_counter() - start_time) * 1000, 3)
+            })
+            return report
+        except Exception as e:
+            raise CustomerChurnException(e,sys)
@@ -0,0 +1,138 @@
+import sys
+import time
+import threading
+from bisect import bisect_left
+
+from src.exception.exception import CustomerChurnException
+from src.constant.serving import SERVING_METRICS_LATENCY_BUCKETS, SERVING_METRICS_STAGES
+
+def escape_label_value(value)->str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def format_labels(labels: dict)->str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{escape_label_value(value)}"' for name, value in labels.items()) + "}"
+
+def format_metric(name: str, metric_type: str, help_text: str, samples: list)->list:
+    # Samples are (suffix, labels, value) tuples rendered in the Prometheus text exposition format
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} {metric_type}"]
+    for suffix, labels, value in samples:
+        lines.append(f"{name}{suffix}{format_labels(labels)} {value}")
+    return lines
+
+class Histogram:
+    def __init__(self, buckets: tuple = SERVING_METRICS_LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        # Only the bucket the value falls in is counted, the cumulative "le" counts are built at scrape time
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    def samples(self, labels: dict)->list:
+        with self._lock:
+            counts, total = list(self.counts), self.sum
+        samples, cumulative = [], 0
+        for bound, count in zip(self.buckets + (float("inf"),), counts):
+            cumulative += count
+            samples.append(("_bucket", {**labels, "le" : "+Inf" if bound == float("inf") else repr(bound)}, cumulative))
+        samples.append(("_sum", labels, repr(total)))
+        samples.append(("_count", labels, cumulative))
+        return samples
+
+class ServingMetrics:
+    def __init__(self, buckets: tuple = SERVING_METRICS_LATENCY_BUCKETS, stages: tuple = SERVING_METRICS_STAGES):
+        try:
+            self.buckets = tuple(buckets)
+            self.request_latency: dict = {}
+            self.stage_latency = {stage: Histogram(self.buckets) for stage in stages}
+            self.in_flight = 0
+            self.errors: dict = {}
+            self._lock = threading.Lock()
+        except Exception as e:
+            raise CustomerChurnException(e,sys)
+
+    def request_started(self):
+        with self._lock:
+            self.in_flight += 1
+
+    def request_finished(self, endpoint: str, seconds: float):
+        histogram = self.request_latency.get(endpoint)
+        if histogram is None:
+            with self._lock:
+                histogram = self.request_latency.setdefault(endpoint, Histogram(self.buckets))
+        histogram.observe(seconds)
+        with self._lock:
+            self.in_flight -= 1
+
+    def observe_stage(self, stage: str, seconds: float):
+        self.stage_latency[stage].observe(seconds)
+
+    def record_error(self, error: CustomerChurnException):
+        # Wrapped exceptions are unwound to the innermost handler, which is where the failure actually happened
+        while isinstance(error.error_message, CustomerChurnException):
+            error = error.error_message
+        key = (error.file_name, error.line_no)
+        with self._lock:
+            self.errors[key] = self.errors.get(key, 0) + 1
+
+    def render(self, gauges: list = ())->str:
+        try:
+            with self._lock:
+                in_flight = self.in_flight
+                request_latency = dict(self.request_latency)
+                errors = dict(self.errors)
+
+            lines = format_metric(
+                "churn_request_duration_seconds", "histogram", "End to end request latency by endpoint.",
+                [sample for endpoint, histogram in sorted(request_latency.items()) for sample in histogram.samples({"endpoint" : endpoint})]
+            )
+            lines += format_metric(
+                "churn_stage_duration_seconds", "histogram",
+                "Time spent in validation per request, and in preprocessing and predict_proba per scored batch.",
+                [sample for stage, histogram in self.stage_latency.items() for sample in histogram.samples({"stage" : stage})]
+            )
+            lines += format_metric(
+                "churn_requests_in_flight", "gauge", "HTTP requests currently being served.", [("", {}, in_flight)]
+            )
+            lines += format_metric(
+                "churn_errors_total", "counter", "CustomerChurnException count by the source file and line that raised it.",
+                [("", {"file" : file_name, "line" : line_no}, count) for (file_name, line_no), count in sorted(errors.items())]
+            )
+            for name, metric_type, help_text, samples in gauges:
+                lines += format_metric(name, metric_type, help_text, samples)
+            return "\n".join(lines) + "\n"
+        except Exception as e:
+            raise CustomerChurnException(e,sys)
+
+class MetricsMiddleware:
+    def __init__(self, app, serving_metrics: ServingMetrics):
+        self.app = app
+        self.serving_metrics = serving_metrics
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        # Handlers read the start time back to measure how long body parsing and validation took
+        start_time = time.perf_counter()
+        scope.setdefault("state", {})["request_start_time"] = start_time
+        self.serving_metrics.request_started()
+        try:
+            await self.app(scope, receive, send)
+        except CustomerChurnException as e:
+            self.serving_metrics.record_error(e)
+            raise
+        finally:
+            # The router stores the matched route in the scope, its template keeps label cardinality bounded
+            route = scope.get("route")
+            self.serving_metrics.request_finished(
+                getattr(route, "path", "unmatched"), time.perf_counter() - start_time
+            )
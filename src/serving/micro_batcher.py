@@ -0,0 +1,190 @@
+import sys
+import time
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from src.exception.exception import CustomerChurnException
+from src.logging.logger import logging
+from src.constant.serving import MICRO_BATCH_MAX_SIZE, MICRO_BATCH_MAX_WAIT_MS, MICRO_BATCH_WORKERS
+
+class MicroBatcher:
+    def __init__(self, score_batch, max_batch_size: int = MICRO_BATCH_MAX_SIZE,
+                 max_wait_ms: float = MICRO_BATCH_MAX_WAIT_MS, workers: int = MICRO_BATCH_WORKERS):
+        try:
+            # score_batch takes a list of records and returns one prediction per record, in order
+            self.score_batch = score_batch
+            self.max_batch_size = max_batch_size
+            self.max_wait_ms = max_wait_ms
+            self.workers = workers
+
+            self._queue: asyncio.Queue = None
+            self._collector: asyncio.Task = None
+            self._slots: asyncio.Semaphore = None
+            self._executor: ThreadPoolExecutor = None
+            self._pending: set = set()
+            self._unscheduled: list = []
+            self._metrics = {
+                "requests" : 0,
+                "batched_requests" : 0,
+                "batches" : 0,
+                "failed_batches" : 0,
+                "flushed_on_size" : 0,
+                "flushed_on_time" : 0,
+                "flushed_on_idle" : 0,
+                "max_queue_depth" : 0,
+                "total_batch_ms" : 0.0
+            }
+        except Exception as e:
+            raise CustomerChurnException(e,sys)
+
+    @property
+    def is_running(self)->bool:
+        return self._collector is not None and not self._collector.done()
+
+    async def start(self):
+        try:
+            if self.is_running:
+                return
+            self._queue = asyncio.Queue()
+            self._slots = asyncio.Semaphore(self.workers)
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="micro-batch")
+            self._collector = asyncio.create_task(self._collect())
+        except Exception as e:
+            raise CustomerChurnException(e,sys)
+
+    async def stop(self):
+        try:
+            if not self.is_running:
+                return
+            self._collector.cancel()
+            try:
+                await self._collector
+            except asyncio.CancelledError:
+                pass
+            # The batch the collector was filling and the requests still queued are scored before the executor goes away
+            batches = [self._unscheduled] if self._unscheduled else []
+            self._unscheduled = []
+            while not self._queue.empty():
+                batches.append(self._drain(self.max_batch_size))
+            try:
+                for batch in batches:
+                    await self._dispatch(batch)
+                if self._pending:
+                    await asyncio.gather(*self._pending, return_exceptions=True)
+            finally:
+                # Nothing is left waiting on a batcher that will never answer
+                self._fail_unresolved([item for batch in batches for item in batch], RuntimeError("Micro Batcher was stopped"))
+            self._executor.shutdown(wait=True)
+            self._collector = None
+        except Exception as e:
+            raise CustomerChurnException(e,sys)
+
+    def _fail_unresolved(self, batch: list, error: Exception):
+        for _, future in batch:
+            if not future.done():
+                future.set_exception(error)
+
+    async def submit(self, record: dict):
+        if not self.is_running:
+            raise RuntimeError("Micro Batcher has not been started")
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((record, future))
+        self._metrics["requests"] += 1
+        self._metrics["max_queue_depth"] = max(self._metrics["max_queue_depth"], self._queue.qsize())
+        return await future
+
+    def _drain(self, limit: int)->list:
+        batch = []
+        while len(batch) < limit and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        return batch
+
+    async def _collect(self):
+        loop = asyncio.get_running_loop()
+        batch = []
+        try:
+            while True:
+                batch = [await self._queue.get()]
+                # One yield lets requests that arrived in the same tick join before deciding whether to wait
+                await asyncio.sleep(0)
+                batch.extend(self._drain(self.max_batch_size - 1))
+                if self._queue.empty() and not self._pending:
+                    # A lone request on an idle batcher has nothing to wait for, it is scored straight away
+                    self._metrics["flushed_on_idle"] += 1
+                    await self._dispatch(batch)
+                    batch = []
+                    continue
+                deadline = loop.time() + self.max_wait_ms / 1000
+                # Under load the window stays open, the batch closes on size or when the window runs out
+                while len(batch) < self.max_batch_size:
+                    batch.extend(self._drain(self.max_batch_size - len(batch)))
+                    if len(batch) >= self.max_batch_size:
+                        break
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self._queue.get(), timeout=remaining))
+                    except asyncio.TimeoutError:
+                        break
+                flush_reason = "flushed_on_size" if len(batch) >= self.max_batch_size else "flushed_on_time"
+                self._metrics[flush_reason] += 1
+                await self._dispatch(batch)
+                batch = []
+        except asyncio.CancelledError:
+            # Requests already taken off the queue are handed back so stop() can still answer them
+            self._unscheduled = batch
+            raise
+
+    async def _dispatch(self, batch: list):
+        # Waiting for a free slot lets the next batch keep filling while earlier ones are scored
+        await self._slots.acquire()
+        task = asyncio.create_task(self._score(batch))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    async def _score(self, batch: list):
+        try:
+            start_time = time.perf_counter()
+            records = [record for record, _ in batch]
+            try:
+                predictions = await asyncio.get_running_loop().run_in_executor(
+                    self._executor, self.score_batch, records
+                )
+            except Exception as e:
+                self._metrics["failed_batches"] += 1
+                logging.info(f"Micro Batch of {len(batch)} records failed : {e}")
+                self._fail_unresolved(batch, e)
+                return
+
+            self._metrics["batches"] += 1
+            self._metrics["batched_requests"] += len(batch)
+            self._metrics["total_batch_ms"] += (time.perf_counter() - start_time) * 1000
+            for (_, future), prediction in zip(batch, predictions):
+                # Callers that disconnected leave a cancelled future behind
+                if not future.done():
+                    future.set_result(prediction)
+        finally:
+            self._slots.release()
+
+    def metrics(self)->dict:
+        try:
+            batches = self._metrics["batches"]
+            return {
+                "running" : self.is_running,
+                "max_batch_size" : self.max_batch_size,
+                "max_wait_ms" : self.max_wait_ms,
+                "queue_depth" : 0 if self._queue is None else self._queue.qsize(),
+                "in_flight_batches" : len(self._pending),
+                "requests" : self._metrics["requests"],
+                "batches" : batches,
+                "failed_batches" : self._metrics["failed_batches"],
+                "flushed_on_size" : self._metrics["flushed_on_size"],
+                "flushed_on_time" : self._metrics["flushed_on_time"],
+                "flushed_on_idle" : self._metrics["flushed_on_idle"],
+                "max_queue_depth" : self._metrics["max_queue_depth"],
+                "mean_batch_size" : round(self._metrics["batched_requests"] / batches, 3) if batches else 0.0,
+                "mean_batch_ms" : round(self._metrics["total_batch_ms"] / batches, 3) if batches else 0.0
+            }
+        except Exception as e:
+            raise CustomerChurnException(e,sys)
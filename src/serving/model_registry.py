@@ -0,0 +1,247 @@
+import io
+import os
+import sys
+import json
+import time
+import pickle
+import threading
+from dataclasses import dataclass
+from functools import cached_property
+from datetime import datetime
+
+from src.exception.exception import CustomerChurnException
+from src.logging.logger import logging
+from src.entity.config_entity import TrainingPipelineConfig, ModelTrainerConfig
+from src.constant.serving import MODEL_REGISTRY_POLL_INTERVAL
+from src.utils.main_utils import get_content_version, read_published_artifacts
+from src.utils.inference_graph import InferenceGraph, compile_inference_graph
+
+class PickledArtifacts:
+    # Estimators are only unpickled on first use, a compiled inference graph serves without them
+    # and skipping them keeps sklearn and xgboost out of a cold start
+    def __init__(self, contents: dict):
+        self.contents = contents
+
+    @cached_property
+    def encoder(self):
+        return pickle.loads(self.contents["encoder"])
+
+    @cached_property
+    def preprocessor(self):
+        return pickle.loads(self.contents["preprocessor"])
+
+    @cached_property
+    def model(self):
+        return pickle.loads(self.contents["model"])
+
+@dataclass(frozen=True)
+class ModelBundle:
+    artifacts: PickledArtifacts
+    inference_graph: InferenceGraph
+    reference_profile: dict
+    version: str
+    loaded_at: datetime
+    load_time: float
+
+    @property
+    def encoder(self):
+        return self.artifacts.encoder
+
+    @property
+    def preprocessor(self):
+        return self.artifacts.preprocessor
+
+    @property
+    def model(self):
+        return self.artifacts.model
+
+    @property
+    def model_name(self)->str:
+        if self.inference_graph is not None and self.inference_graph.estimator_name is not None:
+            return self.inference_graph.estimator_name
+        return type(self.model).__name__
+
+class ModelRegistry:
+    def __init__(self, model_trainer_config: ModelTrainerConfig = None, poll_interval: float = MODEL_REGISTRY_POLL_INTERVAL):
+        try:
+            if model_trainer_config is None:
+                model_trainer_config = ModelTrainerConfig(TrainingPipelineConfig())
+            self.model_trainer_config = model_trainer_config
+            self.poll_interval = poll_interval
+            self.reload_count = 0
+
+            self._bundle: ModelBundle = None
+            self._file_stats = None
+            self._load_lock = threading.Lock()
+            self._stop_event = threading.Event()
+            self._watcher: threading.Thread = None
+        except Exception as e:
+            raise CustomerChurnException(e,sys)
+
+    def load_reference_profile(self, reference_profile_content: bytes)->dict:
+        try:
+            if reference_profile_content is None:
+                return None
+            return json.loads(reference_profile_content)
+        except Exception as e:
+            logging.info(f"Serving without Reference Profile : {e}")
+            return None
+
+    @property
+    def is_loaded(self)->bool:
+        return self._bundle is not None
+
+    @property
+    def bundle(self)->ModelBundle:
+        # Readers take a reference to the current bundle, so a swap never affects in-flight requests
+        bundle = self._bundle
+        if bundle is None:
+            raise RuntimeError("Model Registry has not been loaded yet")
+        return bundle
+
+    @property
+    def legacy_artifact_paths(self)->dict:
+        return {
+            "encoder" : self.model_trainer_config.encoder_file_path,
+            "preprocessor" : self.model_trainer_config.preprocessor_file_path,
+            "model" : self.model_trainer_config.model_file_path
+        }
+
+    def _stat_artifacts(self)->tuple:
+        # The trainer writes the manifest after every other artifact, so it alone marks a finished publish
+        manifest_file_path = self.model_trainer_config.manifest_file_path
+        if not os.path.exists(manifest_file_path):
+            return None
+        stat = os.stat(manifest_file_path)
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def read_artifacts(self)->dict:
+        try:
+            manifest_file_path = self.model_trainer_config.manifest_file_path
+            if os.path.exists(manifest_file_path):
+                return read_published_artifacts(manifest_file_path)
+
+            # Directories published before the manifest existed are loaded as they stand, their pickles are
+            # not watched since a publish can only be told apart from a finished one once a manifest appears
+            logging.info("No artifact manifest found, loading the legacy model artifacts")
+            contents = {}
+            for name, file_path in self.legacy_artifact_paths.items():
+                with open(file_path, "rb") as file:
+                    contents[name] = file.read()
+            if os.path.exists(self.model_trainer_config.reference_profile_file_path):
+                with open(self.model_trainer_config.reference_profile_file_path, "rb") as file:
+                    contents["reference_profile"] = file.read()
+            return contents
+        except Exception as e:
+            raise CustomerChurnException(e,sys)
+
+    def load(self)->ModelBundle:
+        try:
+            with self._load_lock:
+                start_time = time.perf_counter()
+                file_stats = self._stat_artifacts()
+
+                contents = self.read_artifacts()
+                model_version = get_content_version([contents["encoder"], contents["preprocessor"], contents["model"]])
+                # The bundle version covers every published file, so a new reference profile or graph alone still swaps it
+                version = get_content_version([contents[name] for name in sorted(contents)])
+
+                if self._bundle is not None and self._bundle.version == version:
+                    self._file_stats = file_stats
+                    return self._bundle
+
+                artifacts = PickledArtifacts(contents)
+                inference_graph = self.load_inference_graph(artifacts, contents.get("inference_graph"), model_version)
+                if inference_graph is None:
+                    # Without a graph every request needs the estimators, so they are made resident now
+                    artifacts.encoder, artifacts.preprocessor, artifacts.model
+
+                bundle = ModelBundle(
+                    artifacts=artifacts,
+                    inference_graph=inference_graph,
+                    reference_profile=self.load_reference_profile(contents.get("reference_profile")),
+                    version=version,
+                    loaded_at=datetime.now(),
+                    load_time=time.perf_counter() - start_time
+                )
+
+                self._bundle = bundle
+                self._file_stats = file_stats
+                self.reload_count += 1
+                logging.info(f"Loaded Model Version : {version} in {bundle.load_time*1000:.2f} ms")
+                return bundle
+        except Exception as e:
+            raise CustomerChurnException(e,sys)
+
+    def load_inference_graph(self, artifacts: PickledArtifacts, inference_graph_content: bytes, model_version: str)->InferenceGraph:
+        try:
+            if inference_graph_content is not None:
+                inference_graph = InferenceGraph.load(io.BytesIO(inference_graph_content))
+                if inference_graph.source_version == model_version:
+                    return inference_graph
+
+            # Compiled in memory only, the trainer is the one writer of the published graph
+            logging.info("Compiling Inference Graph for the loaded Model")
+            return compile_inference_graph(
+                artifacts.encoder, artifacts.preprocessor, artifacts.model, model_version
+            )
+        except Exception as e:
+            logging.info(f"Serving without Inference Graph : {e}")
+            return None
+
+    def reload_if_changed(self)->bool:
+        try:
+            # Until a first load succeeds every poll retries it
+            if self._bundle is not None and self._stat_artifacts() == self._file_stats:
+                return False
+            logging.info("Model Artifacts changed, Reloading Model Registry")
+            self.load()
+            return True
+        except Exception as e:
+            raise CustomerChurnException(e,sys)
+
+    def _watch(self):
+        while not self._stop_event.wait(self.poll_interval):
+            try:
+                self.reload_if_changed()
+            except Exception as e:
+                # Keep serving the resident model if the new artifacts are not readable yet
+                logging.info(f"Model Registry Reload Failed : {e}")
+
+    def start_watcher(self):
+        try:
+            if self._watcher is not None and self._watcher.is_alive():
+                return
+            self._stop_event.clear()
+            self._watcher = threading.Thread(target=self._watch, name="model-registry-watcher", daemon=True)
+            self._watcher.start()
+        except Exception as e:
+            raise CustomerChurnException(e,sys)
+
+    def stop_watcher(self):
+        try:
+            self._stop_event.set()
+            if self._watcher is not None:
+                self._watcher.join(timeout=self.poll_interval)
+            self._watcher = None
+        except Exception as e:
+            raise CustomerChurnException(e,sys)
+
+    def status(self)->dict:
+        try:
+            bundle = self._bundle
+            if bundle is None:
+                return {"loaded" : False}
+            return {
+                "loaded" : True,
+                "version" : bundle.version,
+                "model" : bundle.model_name,
+                "inference_graph" : bundle.inference_graph is not None,
+                "reference_profile" : bundle.reference_profile is not None,
+                "loaded_at" : bundle.loaded_at.isoformat(),
+                "load_time_ms" : round(bundle.load_time*1000, 3),
+                "reload_count" : self.reload_count,
+                "poll_interval" : self.poll_interval
+            }
+        except Exception as e:
+            raise CustomerChurnException(e,sys)
@@ -0,0 +1,89 @@
+import sys
+import time
+import threading
+from collections import OrderedDict
+
+from src.exception.exception import CustomerChurnException
+from src.constant.serving import PREDICTION_CACHE_MAX_SIZE, PREDICTION_CACHE_TTL
+
+class PredictionCache:
+    def __init__(self, fields: tuple, max_size: int = PREDICTION_CACHE_MAX_SIZE, ttl: float = PREDICTION_CACHE_TTL):
+        try:
+            self.fields = tuple(fields)
+            self.max_size = max_size
+            self.ttl = ttl
+            self.version: str = None
+            self._entries: OrderedDict = OrderedDict()
+            self._lock = threading.Lock()
+            self._stats = {"hits" : 0, "misses" : 0, "evictions" : 0, "expirations" : 0, "invalidations" : 0}
+        except Exception as e:
+            raise CustomerChurnException(e,sys)
+
+    def canonical_key(self, record: dict)->tuple:
+        # Validated inputs have fixed field types, so the ordered values identify a payload regardless of key order
+        return tuple(record[field] for field in self.fields)
+
+    def _sync(self, version: str):
+        # Predictions belong to one model version, a new version starts from an empty cache
+        if version != self.version:
+            if self.version is not None:
+                self._stats["invalidations"] += 1
+            self.version = version
+            self._entries.clear()
+
+    def get(self, version: str, record: dict):
+        try:
+            key = self.canonical_key(record)
+            with self._lock:
+                self._sync(version)
+                entry = self._entries.get(key)
+                if entry is not None and self.ttl is not None and time.monotonic() - entry[1] > self.ttl:
+                    del self._entries[key]
+                    self._stats["expirations"] += 1
+                    entry = None
+                if entry is None:
+                    self._stats["misses"] += 1
+                    return None
+                self._entries.move_to_end(key)
+                self._stats["hits"] += 1
+                return entry[0]
+        except Exception as e:
+            raise CustomerChurnException(e,sys)
+
+    def put(self, version: str, record: dict, prediction: float):
+        try:
+            key = self.canonical_key(record)
+            with self._lock:
+                # A result scored by a model that has since been replaced is not worth keeping
+                if version != self.version:
+                    return
+                self._entries[key] = (prediction, time.monotonic())
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+                    self._stats["evictions"] += 1
+        except Exception as e:
+            raise CustomerChurnException(e,sys)
+
+    def clear(self):
+        try:
+            with self._lock:
+                self._entries.clear()
+        except Exception as e:
+            raise CustomerChurnException(e,sys)
+
+    def stats(self)->dict:
+        try:
+            with self._lock:
+                lookups = self._stats["hits"] + self._stats["misses"]
+                return {
+                    "version" : self.version,
+                    "size" : len(self._entries),
+                    "max_size" : self.max_size,
+                    "ttl" : self.ttl,
+                    **self._stats,
+                    "hit_rate" : round(self._stats["hits"] / lookups, 4) if lookups else 0.0,
+                    "miss_rate" : round(self._stats["misses"] / lookups, 4) if lookups else 0.0
+                }
+        except Exception as e:
+            raise CustomerChurnException(e,sys)
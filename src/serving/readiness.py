@@ -0,0 +1,44 @@
+import sys
+import time
+
+from src.exception.exception import CustomerChurnException
+from src.logging.logger import logging
+from src.constant.serving import COLD_START_BUDGET_SECONDS
+
+class ColdStartTracker:
+    def __init__(self, start_time: float, budget: float = COLD_START_BUDGET_SECONDS):
+        try:
+            # start_time is a perf_counter reading taken before the entry point imports anything heavy,
+            # None leaves the tracker switched off for processes where the API was not the entry point
+            self.start_time = start_time
+            self.budget = budget
+            self.import_seconds: float = None
+            self.ready_seconds: float = None
+        except Exception as e:
+            raise CustomerChurnException(e,sys)
+
+    def mark_imported(self):
+        if self.start_time is None:
+            return
+        self.import_seconds = time.perf_counter() - self.start_time
+
+    def mark_ready(self):
+        # Only the first time the model becomes resident counts, later reloads are not a cold start
+        if self.start_time is None or self.ready_seconds is not None:
+            return
+        self.ready_seconds = time.perf_counter() - self.start_time
+        if self.ready_seconds > self.budget:
+            logging.warning(f"Cold start took {self.ready_seconds:.3f}s, over the {self.budget:.3f}s budget")
+        else:
+            logging.info(f"Cold start took {self.ready_seconds:.3f}s, within the {self.budget:.3f}s budget")
+
+    def report(self)->dict:
+        try:
+            return {
+                "import_seconds" : None if self.import_seconds is None else round(self.import_seconds, 4),
+                "ready_seconds" : None if self.ready_seconds is None else round(self.ready_seconds, 4),
+                "budget_seconds" : self.budget,
+                "within_budget" : None if self.ready_seconds is None else self.ready_seconds <= self.budget
+            }
+        except Exception as e:
+            raise CustomerChurnException(e,sys)
@@ -0,0 +1,127 @@
+import sys
+import uuid
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field, asdict
+from datetime import datetime
+
+from src.exception.exception import CustomerChurnException
+from src.logging.logger import logging
+from src.constant.training import TRAINING_PIPELINE_STAGES
+from src.constant.serving import TRAINING_JOB_HISTORY
+
+@dataclass
+class TrainingJob:
+    job_id: str
+    status: str
+    submitted_at: str
+    started_at: str = None
+    finished_at: str = None
+    current_stage: str = None
+    stages: dict = field(default_factory=dict)
+    result: dict = None
+    error: str = None
+
+    @property
+    def progress(self)->float:
+        finished = sum(stage["status"] in ("completed", "skipped") for stage in self.stages.values())
+        return round(finished / len(TRAINING_PIPELINE_STAGES), 3)
+
+    def to_dict(self)->dict:
+        job = asdict(self)
+        job["progress"] = self.progress
+        return job
+
+class TrainingJobManager:
+    def __init__(self, run_training, history: int = TRAINING_JOB_HISTORY):
+        try:
+            # run_training receives a progress callback and returns a JSON serializable result
+            self.run_training = run_training
+            self.history = history
+            self._jobs: OrderedDict = OrderedDict()
+            self._active_job_id: str = None
+            self._lock = threading.Lock()
+            # A single worker keeps one training run at a time writing to final_models
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="training-job")
+        except Exception as e:
+            raise CustomerChurnException(e,sys)
+
+    @staticmethod
+    def _now()->str:
+        return datetime.now().isoformat(timespec="seconds")
+
+    def submit(self)->tuple:
+        try:
+            with self._lock:
+                if self._active_job_id is not None:
+                    return self._jobs[self._active_job_id].to_dict(), False
+
+                job = TrainingJob(job_id=uuid.uuid4().hex, status="queued", submitted_at=self._now())
+                self._jobs[job.job_id] = job
+                self._active_job_id = job.job_id
+                while len(self._jobs) > self.history:
+                    self._jobs.popitem(last=False)
+                snapshot = job.to_dict()
+
+            self._executor.submit(self._run, job.job_id)
+            logging.info(f"Training Job {job.job_id} submitted")
+            return snapshot, True
+        except Exception as e:
+            raise CustomerChurnException(e,sys)
+
+    def _on_progress(self, job_id: str, stage_name: str, status: str, elapsed: float = None):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            stage = job.stages.setdefault(stage_name, {"status" : status, "started_at" : self._now(), "elapsed" : None})
+            stage["status"] = status
+            if elapsed is not None:
+                stage["elapsed"] = round(elapsed, 3)
+            job.current_stage = stage_name if status == "running" else job.current_stage
+
+    def _run(self, job_id: str):
+        with self._lock:
+            job = self._jobs[job_id]
+            job.status = "running"
+            job.started_at = self._now()
+        try:
+            result = self.run_training(
+                lambda stage_name, status, elapsed=None: self._on_progress(job_id, stage_name, status, elapsed)
+            )
+            with self._lock:
+                job.status = "succeeded"
+                job.result = result
+            logging.info(f"Training Job {job_id} succeeded")
+        except Exception as e:
+            with self._lock:
+                job.status = "failed"
+                job.error = str(e)
+            logging.info(f"Training Job {job_id} failed : {e}")
+        finally:
+            with self._lock:
+                job.current_stage = None
+                job.finished_at = self._now()
+                self._active_job_id = None
+
+    def get(self, job_id: str)->dict:
+        try:
+            with self._lock:
+                job = self._jobs.get(job_id)
+                return None if job is None else job.to_dict()
+        except Exception as e:
+            raise CustomerChurnException(e,sys)
+
+    def list(self)->list:
+        try:
+            with self._lock:
+                return [job.to_dict() for job in reversed(self._jobs.values())]
+        except Exception as e:
+            raise CustomerChurnException(e,sys)
+
+    def shutdown(self):
+        try:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+        except Exception as e:
+            raise CustomerChurnException(e,sys)
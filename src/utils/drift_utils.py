@@ -0,0 +1,189 @@
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+
+from src.exception.exception import CustomerChurnException
+
+PSI_EPSILON: float = 1e-4
+
+class ReservoirSampler:
+    def __init__(self, size: int, random_state: int = None):
+        try:
+            self.size = size
+            self.seen = 0
+            self.sample: pd.DataFrame = None
+            self._rng = np.random.default_rng(random_state)
+        except Exception as e:
+            raise CustomerChurnException(e,sys)
+
+    def update(self, dataframe: pd.DataFrame):
+        try:
+            dataframe = dataframe.reset_index(drop=True)
+            filled = 0 if self.sample is None else len(self.sample)
+            fill = min(self.size - filled, len(dataframe))
+            if fill > 0:
+                head = dataframe.iloc[:fill]
+                self.sample = head if self.sample is None else pd.concat([self.sample, head], ignore_index=True)
+
+            rest = dataframe.iloc[fill:]
+            if len(rest):
+                # Algorithm R for a whole chunk at once, row i replaces slot j when j = U(0, i) falls inside the reservoir
+                positions = self.seen + fill + np.arange(len(rest))
+                slots = self._rng.integers(0, positions + 1)
+                accepted = np.flatnonzero(slots < self.size)
+                if len(accepted):
+                    # A later row wins a slot drawn more than once, exactly as in the one-row-at-a-time algorithm
+                    reversed_slots = slots[accepted][::-1]
+                    _, last = np.unique(reversed_slots, return_index=True)
+                    winners = accepted[::-1][last]
+                    replaced = np.zeros(self.size, dtype=bool)
+                    replaced[slots[winners]] = True
+                    # Slots are exchangeable, so replaced rows are dropped and winners appended
+                    self.sample = pd.concat(
+                        [self.sample.iloc[~replaced], rest.iloc[winners]], ignore_index=True
+                    )
+            self.seen += len(dataframe)
+            return self
+        except Exception as e:
+            raise CustomerChurnException(e,sys)
+
+def sample_dataframe(dataframe: pd.DataFrame, sample_size: int = None, random_state: int = None)->pd.DataFrame:
+    try:
+        if sample_size is None or len(dataframe) <= sample_size:
+            return dataframe
+        return ReservoirSampler(sample_size, random_state).update(dataframe).sample
+    except Exception as e:
+        raise CustomerChurnException(e,sys)
+
+def population_stability_index(base_counts: np.ndarray, current_counts: np.ndarray)->float:
+    base_share = np.clip(base_counts / max(base_counts.sum(), 1), PSI_EPSILON, None)
+    current_share = np.clip(current_counts / max(current_counts.sum(), 1), PSI_EPSILON, None)
+    return float(np.sum((current_share - base_share) * np.log(current_share / base_share)))
+
+def numerical_drift(base: np.ndarray, current: np.ndarray, tests: list, pvalue_threshold: float = 0.05,
+                    psi_threshold: float = 0.2, psi_bins: int = 10, wasserstein_threshold: float = 0.1)->dict:
+    try:
+        # scipy.stats is slow to import and the serving path only needs the PSI helpers of this module
+        from scipy.stats import kstwo
+
+        base = np.asarray(base, dtype=np.float64)
+        current = np.asarray(current, dtype=np.float64)
+        base = base[~np.isnan(base)]
+        current = current[~np.isnan(current)]
+        n, m = len(base), len(current)
+        if n == 0 or m == 0:
+            return {}
+
+        # One sort of the pooled values drives every statistic, the running sum of +1/n and -1/m is F_base - F_current
+        values = np.concatenate([base, current])
+        order = np.argsort(values, kind="mergesort")
+        sorted_values = values[order]
+        from_base = order < n
+        cdf_gap = np.cumsum(np.where(from_base, 1.0 / n, -1.0 / m))
+
+        results = {}
+        if "ks" in tests:
+            # Tied values only form one step of the empirical CDFs, so the gap is read at the last of each run
+            last_of_tie = np.append(sorted_values[1:] != sorted_values[:-1], True)
+            statistic = float(np.abs(cdf_gap[last_of_tie]).max())
+            pvalue = float(kstwo.sf(statistic, int(round(n * m / (n + m)))))
+            results["ks"] = {"statistic" : statistic, "pvalue" : pvalue, "drift" : pvalue < pvalue_threshold}
+
+        if "wasserstein" in tests:
+            distance = float(np.sum(np.abs(cdf_gap[:-1]) * np.diff(sorted_values)))
+            scale = float(np.std(base))
+            normalized = distance / scale if scale > 0 else distance
+            results["wasserstein"] = {
+                "statistic" : distance, "normalized" : normalized, "drift" : normalized > wasserstein_threshold
+            }
+
+        if "psi" in tests:
+            sorted_base = sorted_values[from_base]
+            sorted_current = sorted_values[~from_base]
+            edges = np.unique(np.quantile(sorted_base, np.linspace(0, 1, psi_bins + 1)[1:-1]))
+            base_counts = np.diff(np.concatenate([[0], np.searchsorted(sorted_base, edges, side="right"), [n]]))
+            current_counts = np.diff(np.concatenate([[0], np.searchsorted(sorted_current, edges, side="right"), [m]]))
+            statistic = population_stability_index(base_counts, current_counts)
+            results["psi"] = {"statistic" : statistic, "drift" : statistic > psi_threshold}
+        return results
+    except Exception as e:
+        raise CustomerChurnException(e,sys)
+
+def categorical_drift(base: pd.Series, current: pd.Series, tests: list, pvalue_threshold: float = 0.05,
+                      psi_threshold: float = 0.2)->dict:
+    try:
+        from scipy.stats import chi2
+
+        base_counts = base.value_counts(dropna=True)
+        current_counts = current.value_counts(dropna=True)
+        if base_counts.sum() == 0 or current_counts.sum() == 0:
+            return {}
+        categories = base_counts.index.union(current_counts.index)
+        observed = np.vstack([
+            base_counts.reindex(categories, fill_value=0).to_numpy(dtype=np.float64),
+            current_counts.reindex(categories, fill_value=0).to_numpy(dtype=np.float64)
+        ])
+
+        results = {}
+        if "chi2" in tests:
+            if observed.shape[1] < 2:
+                statistic, pvalue = 0.0, 1.0
+            else:
+                expected = observed.sum(axis=1, keepdims=True) * observed.sum(axis=0, keepdims=True) / observed.sum()
+                statistic = float(np.sum((observed - expected) ** 2 / expected))
+                pvalue = float(chi2.sf(statistic, observed.shape[1] - 1))
+            results["chi2"] = {"statistic" : statistic, "pvalue" : pvalue, "drift" : pvalue < pvalue_threshold}
+
+        if "psi" in tests:
+            statistic = population_stability_index(observed[0], observed[1])
+            results["psi"] = {"statistic" : statistic, "drift" : statistic > psi_threshold}
+        return results
+    except Exception as e:
+        raise CustomerChurnException(e,sys)
+
+def detect_drift(base_df: pd.DataFrame, current_df: pd.DataFrame, numerical_columns: list, categorical_columns: list,
+                 numerical_tests: list = ("ks","psi","wasserstein"), categorical_tests: list = ("chi2","psi"),
+                 pvalue_threshold: float = 0.05, psi_threshold: float = 0.2, psi_bins: int = 10,
+                 wasserstein_threshold: float = 0.1, max_workers: int = None)->dict:
+    try:
+        start_time = time.perf_counter()
+
+        def run(column: str, column_type: str)->tuple:
+            column_start_time = time.perf_counter()
+            if column_type == "numerical":
+                tests = numerical_drift(
+                    pd.to_numeric(base_df[column], errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan),
+                    pd.to_numeric(current_df[column], errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan),
+                    numerical_tests, pvalue_threshold, psi_threshold, psi_bins, wasserstein_threshold
+                )
+            else:
+                tests = categorical_drift(
+                    base_df[column], current_df[column], categorical_tests, pvalue_threshold, psi_threshold
+                )
+            return column, {
+                "type" : column_type,
+                "tests" : tests,
+                "drift_status" : any(test["drift"] for test in tests.values()),
+                "elapsed_ms" : round((time.perf_counter() - column_start_time) * 1000, 3)
+            }
+
+        jobs = [(column, "numerical") for column in numerical_columns if column in base_df and column in current_df]
+        jobs += [(column, "categorical") for column in categorical_columns if column in base_df and column in current_df]
+
+        # Sorting and hashing release the GIL, so columns are checked side by side on threads
+        max_workers = max_workers or min(len(jobs), os.cpu_count() or 1) or 1
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            columns = dict(executor.map(lambda job: run(*job), jobs))
+
+        return {
+            "drift_detected" : any(column["drift_status"] for column in columns.values()),
+            "base_rows" : len(base_df),
+            "current_rows" : len(current_df),
+            "elapsed_ms" : round((time.perf_counter() - start_time) * 1000, 3),
+            "columns" : columns
+        }
+    except Exception as e:
+        raise CustomerChurnException(e,sys)
@@ -0,0 +1,135 @@
+import os
+import sys
+import pandas as pd
+import pyarrow as pa
+
+from src.exception.exception import CustomerChurnException
+from src.utils.main_utils import read_yaml_file
+from src.constant.training import SCHEMA_FILE_PATH
+
+SCHEMA_ARROW_TYPES: dict = {
+    "int" : pa.int64(),
+    "float" : pa.float64(),
+    "category" : pa.string()
+}
+
+def get_csv_export_path(file_path: str)->str:
+    return f"{os.path.splitext(file_path)[0]}.csv"
+
+def get_arrow_schema(columns: list, schema_file_path: str = SCHEMA_FILE_PATH)->pa.Schema:
+    try:
+        schema_columns = read_yaml_file(schema_file_path)["columns"]
+        return pa.schema([
+            (column, SCHEMA_ARROW_TYPES[schema_columns[column]["type"]]) for column in columns if column in schema_columns
+        ])
+    except Exception as e:
+        raise CustomerChurnException(e,sys)
+
+def dataframe_to_table(dataframe: pd.DataFrame)->pa.Table:
+    try:
+        # Pandas metadata is dropped so reads come back as plain NumPy dtypes, with NaN for missing integers
+        table = pa.Table.from_pandas(dataframe, preserve_index=False).replace_schema_metadata(None)
+        schema = get_arrow_schema(table.column_names)
+        for field in schema:
+            index = table.schema.get_field_index(field.name)
+            if table.schema.field(index).type == field.type:
+                continue
+            try:
+                table = table.set_column(index, field, table.column(index).cast(field.type))
+            except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+                # Columns that do not fit their schema type are kept as-is and left to data validation
+                pass
+        return table
+    except Exception as e:
+        raise CustomerChurnException(e,sys)
+
+def write_feature_store(dataframe: pd.DataFrame, file_path: str, export_csv: bool = False):
+    try:
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        table = dataframe_to_table(dataframe)
+        with pa.OSFile(file_path, "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        if export_csv:
+            dataframe.to_csv(get_csv_export_path(file_path), index=False, header=True)
+    except Exception as e:
+        raise CustomerChurnException(e,sys)
+
+def read_feature_store_table(file_path: str)->pa.Table:
+    try:
+        # Record batches reference the memory map directly, nothing is parsed or copied at read time
+        return pa.ipc.open_file(pa.memory_map(file_path, "r")).read_all()
+    except Exception as e:
+        raise CustomerChurnException(e,sys)
+
+def read_feature_store(file_path: str)->pd.DataFrame:
+    try:
+        return read_feature_store_table(file_path).to_pandas(split_blocks=True)
+    except Exception as e:
+        raise CustomerChurnException(e,sys)
+
+def iter_feature_store(file_path: str, batch_size: int = None):
+    try:
+        reader = pa.ipc.open_file(pa.memory_map(file_path, "r"))
+        for index in range(reader.num_record_batches):
+            batch = reader.get_batch(index)
+            step = batch_size or max(batch.num_rows, 1)
+            for start in range(0, max(batch.num_rows, 1), step):
+                yield batch.slice(start, step).to_pandas(split_blocks=True)
+    except Exception as e:
+        raise CustomerChurnException(e,sys)
+
+def count_feature_store_rows(file_path: str)->int:
+    try:
+        reader = pa.ipc.open_file(pa.memory_map(file_path, "r"))
+        return sum(reader.get_batch(index).num_rows for index in range(reader.num_record_batches))
+    except Exception as e:
+        raise CustomerChurnException(e,sys)
+
+class FeatureStoreWriter:
+    def __init__(self, file_path: str, export_csv: bool = False):
+        try:
+            self.file_path = file_path
+            self.export_csv = export_csv
+            self.number_of_rows = 0
+            self._sink = None
+            self._writer = None
+            self._schema = None
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        except Exception as e:
+            raise CustomerChurnException(e,sys)
+
+    def write(self, dataframe: pd.DataFrame):
+        try:
+            table = dataframe_to_table(dataframe)
+            if self._writer is None:
+                self._schema = table.schema
+                self._sink = pa.OSFile(self.file_path, "wb")
+                self._writer = pa.ipc.new_file(self._sink, self._schema)
+            else:
+                table = table.cast(self._schema)
+            self._writer.write_table(table)
+
+            if self.export_csv:
+                first_chunk = self.number_of_rows == 0
+                dataframe.to_csv(
+                    get_csv_export_path(self.file_path), mode="w" if first_chunk else "a", index=False, header=first_chunk
+                )
+            self.number_of_rows += len(dataframe)
+        except Exception as e:
+            raise CustomerChurnException(e,sys)
+
+    def close(self):
+        try:
+            if self._writer is not None:
+                self._writer.close()
+                self._sink.close()
+                self._writer = None
+        except Exception as e:
+            raise CustomerChurnException(e,sys)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
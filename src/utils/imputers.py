@@ -0,0 +1,121 @@
+import sys
+import warnings
+import numpy as np
+from sklearn.base import BaseEstimator, TransformerMixin
+from sklearn.impute import KNNImputer, SimpleImputer
+from sklearn.neighbors import KDTree, BallTree
+
+from src.exception.exception import CustomerChurnException
+from src.utils.inference_graph import nan_euclidean_distances
+
+NEIGHBOR_INDEXES: dict = {
+    "kd_tree" : KDTree,
+    "ball_tree" : BallTree
+}
+
+class NeighborIndexImputer(BaseEstimator, TransformerMixin):
+    def __init__(self, missing_values=np.nan, n_neighbors: int = 3, weights: str = "uniform",
+                 algorithm: str = "kd_tree", leaf_size: int = 40, max_reference_rows: int = 50000,
+                 random_state: int = 42):
+        self.missing_values = missing_values
+        self.n_neighbors = n_neighbors
+        self.weights = weights
+        self.algorithm = algorithm
+        self.leaf_size = leaf_size
+        self.max_reference_rows = max_reference_rows
+        self.random_state = random_state
+
+    def fit(self, X, y=None):
+        if hasattr(X, "columns"):
+            self.feature_names_in_ = np.asarray(X.columns, dtype=object)
+        X = np.asarray(X, dtype=np.float64)
+        self.n_features_in_ = X.shape[1]
+        missing = np.isnan(X)
+        self._valid_mask = ~missing.all(axis=0)
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)
+            self.statistics_ = np.nanmean(X, axis=0)
+
+        # Only complete rows are donors, so every query is an exact search on the receiver's present columns
+        complete = np.flatnonzero(~missing[:, self._valid_mask].any(axis=1))
+        if len(complete) > self.max_reference_rows:
+            rng = np.random.default_rng(self.random_state)
+            complete = np.sort(rng.choice(complete, self.max_reference_rows, replace=False))
+        self.reference_ = X[complete]
+        self._indexes = {}
+        return self
+
+    def __getstate__(self):
+        # Indexes are rebuilt on demand, the pickle only carries the bounded reference rows
+        state = super().__getstate__()
+        state["_indexes"] = {}
+        return state
+
+    def _get_index(self, present: np.ndarray):
+        key = present.tobytes()
+        if key not in self._indexes:
+            self._indexes[key] = NEIGHBOR_INDEXES[self.algorithm](
+                self.reference_[:, present], leaf_size=self.leaf_size
+            )
+        return self._indexes[key]
+
+    def _impute_rows(self, receivers: np.ndarray)->np.ndarray:
+        imputed = receivers.copy()
+        k = min(self.n_neighbors, len(self.reference_))
+        patterns, inverse = np.unique(np.isnan(receivers), axis=0, return_inverse=True)
+        for pattern_index, pattern in enumerate(patterns):
+            rows = np.flatnonzero(inverse.ravel() == pattern_index)
+            present = ~pattern & self._valid_mask
+            targets = np.flatnonzero(pattern & self._valid_mask)
+            if len(targets) == 0:
+                continue
+            if k == 0 or not present.any():
+                imputed[np.ix_(rows, targets)] = self.statistics_[targets]
+                continue
+
+            index = self._get_index(present)
+            distances, _ = index.query(receivers[rows][:, present], k=k)
+            # Everything within the k-th distance is a candidate, so ties are settled by donor index below
+            radius = distances[:, -1] * (1 + 1e-9) + 1e-12
+            candidates = index.query_radius(receivers[rows][:, present], r=radius)
+            for row, donors in zip(rows, candidates):
+                donors = np.sort(donors)
+                donor_distances = nan_euclidean_distances(
+                    receivers[row:row + 1], self.reference_[donors], receivers.shape[1]
+                )[0]
+                order = np.argsort(donor_distances, kind="stable")[:k]
+                neighbor_distances = donor_distances[order]
+                if self.weights == "distance":
+                    with np.errstate(divide="ignore"):
+                        weights = 1.0 / neighbor_distances
+                    if np.isinf(weights).any():
+                        weights = np.isinf(weights).astype(np.float64)
+                else:
+                    weights = np.ones(len(order))
+                donor_values = self.reference_[donors[order]][:, targets]
+                imputed[row, targets] = weights @ donor_values / weights.sum()
+        return imputed
+
+    def transform(self, X):
+        X = np.asarray(X, dtype=np.float64)
+        missing_rows = np.flatnonzero(np.isnan(X[:, self._valid_mask]).any(axis=1))
+        if len(missing_rows):
+            X = X.copy()
+            X[missing_rows] = self._impute_rows(X[missing_rows])
+        return X[:, self._valid_mask]
+
+def get_imputer(strategy: str, params: dict):
+    try:
+        if strategy == "knn":
+            return KNNImputer(**params)
+        if strategy == "knn_index":
+            return NeighborIndexImputer(**params)
+        if strategy in ("mean", "median", "most_frequent"):
+            return SimpleImputer(strategy=strategy, **params)
+        if strategy == "iterative":
+            from sklearn.experimental import enable_iterative_imputer  # noqa: F401
+            from sklearn.impute import IterativeImputer
+            return IterativeImputer(**params)
+        raise ValueError(f"Unknown imputation strategy : {strategy}")
+    except Exception as e:
+        raise CustomerChurnException(e,sys)
@@ -0,0 +1,526 @@
+import os
+import sys
+import json
+import numpy as np
+import pandas as pd
+
+from src.exception.exception import CustomerChurnException
+from src.constant.training import INFERENCE_GRAPH_TOLERANCE
+
+MISSING_CATEGORY_KEY: str = "__missing__"
+
+def _category_key(value)->str:
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return MISSING_CATEGORY_KEY
+    return str(value)
+
+def _sigmoid(values: np.ndarray)->np.ndarray:
+    return 1.0 / (1.0 + np.exp(-values))
+
+def nan_euclidean_distances(receivers: np.ndarray, donors: np.ndarray, n_features: int)->np.ndarray:
+    # nan_euclidean distances, rescaled by the fraction of coordinates present in both rows. The arithmetic
+    # follows sklearn's expanded form step by step, so tied donors get bit-identical distances and the
+    # same neighbours win the partition
+    missing_receivers = np.isnan(receivers)
+    missing_donors = np.isnan(donors)
+    receivers = np.where(missing_receivers, 0.0, receivers)
+    donors = np.where(missing_donors, 0.0, donors)
+
+    receivers_squared = receivers * receivers
+    donors_squared = donors * donors
+    distances = -2 * np.dot(receivers, donors.T)
+    distances += np.einsum("ij,ij->i", receivers, receivers)[:, None]
+    distances += np.einsum("ij,ij->i", donors, donors)[None, :]
+    np.maximum(distances, 0, out=distances)
+    distances -= np.dot(receivers_squared, missing_donors.T)
+    distances -= np.dot(missing_receivers, donors_squared.T)
+    np.clip(distances, 0, None, out=distances)
+
+    present_count = np.dot(1 - missing_receivers, (~missing_donors).T)
+    distances[present_count == 0] = np.nan
+    np.maximum(1, present_count, out=present_count)
+    distances /= present_count
+    distances *= n_features
+    return np.sqrt(distances)
+
+def _flatten_trees(trees: list)->dict:
+    # Every tree is appended into one node table; leaves point at themselves so that
+    # all rows and all trees can be walked together for a fixed number of steps
+    feature, threshold, left, right, default_left, value, roots, depths = [], [], [], [], [], [], [], []
+    offset = 0
+    for tree in trees:
+        tree_left = np.asarray(tree["left"], dtype=np.int64)
+        tree_right = np.asarray(tree["right"], dtype=np.int64)
+        node_ids = np.arange(len(tree_left), dtype=np.int64)
+        is_leaf = tree_left < 0
+
+        feature.append(np.where(is_leaf, 0, tree["feature"]).astype(np.int64))
+        threshold.append(np.where(is_leaf, np.inf, tree["threshold"]).astype(np.float64))
+        left.append(np.where(is_leaf, node_ids, tree_left) + offset)
+        right.append(np.where(is_leaf, node_ids, tree_right) + offset)
+        default_left.append(np.asarray(tree["default_left"], dtype=bool))
+        value.append(np.where(is_leaf, tree["value"], 0.0).astype(np.float64))
+        roots.append(offset)
+
+        node_depth = np.zeros(len(tree_left), dtype=np.int64)
+        for node in range(len(tree_left)):
+            if not is_leaf[node]:
+                node_depth[tree_left[node]] = node_depth[node] + 1
+                node_depth[tree_right[node]] = node_depth[node] + 1
+        depths.append(int(node_depth.max()))
+        offset += len(tree_left)
+
+    return {
+        "tree_feature" : np.concatenate(feature),
+        "tree_threshold" : np.concatenate(threshold),
+        "tree_left" : np.concatenate(left),
+        "tree_right" : np.concatenate(right),
+        "tree_default_left" : np.concatenate(default_left),
+        "tree_value" : np.concatenate(value),
+        "tree_roots" : np.asarray(roots, dtype=np.int64),
+        "tree_depth" : np.asarray([max(depths)], dtype=np.int64)
+    }
+
+def _sklearn_trees(estimators: list, leaf_value)->list:
+    trees = []
+    for estimator in estimators:
+        tree = estimator.tree_
+        missing_go_to_left = getattr(tree, "missing_go_to_left", np.zeros(tree.node_count, dtype=bool))
+        trees.append({
+            "left" : tree.children_left,
+            "right" : tree.children_right,
+            "feature" : tree.feature,
+            "threshold" : tree.threshold,
+            "default_left" : missing_go_to_left,
+            "value" : leaf_value(tree.value)
+        })
+    return trees
+
+def _parse_base_score(base_score: str)->float:
+    return float(str(base_score).strip("[]"))
+
+def compile_encoder(ohe, feature_names: list)->tuple:
+    try:
+        if getattr(ohe, "drop_idx_", None) is not None or getattr(ohe, "_infrequent_enabled", False):
+            raise NotImplementedError("OneHotEncoder with drop or infrequent categories cannot be compiled")
+
+        encoded_names = list(ohe.get_feature_names_out())
+        categorical_columns = {}
+        position = 0
+        for column, categories in zip(ohe.feature_names_in_, ohe.categories_):
+            lookup = {}
+            for category in categories:
+                lookup[_category_key(category)] = feature_names.index(encoded_names[position])
+                position += 1
+            categorical_columns[str(column)] = lookup
+
+        numerical_columns = [name for name in feature_names if name not in encoded_names]
+        metadata = {
+            "feature_names" : list(feature_names),
+            "numerical_columns" : numerical_columns,
+            "categorical_columns" : categorical_columns
+        }
+        arrays = {
+            "numerical_positions" : np.asarray([feature_names.index(name) for name in numerical_columns], dtype=np.int64)
+        }
+        return metadata, arrays
+    except Exception as e:
+        raise CustomerChurnException(e,sys)
+
+def compile_imputer(preprocessor, n_features: int)->tuple:
+    try:
+        from sklearn.pipeline import Pipeline
+        from sklearn.impute import KNNImputer, SimpleImputer
+        from src.utils.imputers import NeighborIndexImputer
+
+        imputer = preprocessor
+        if isinstance(imputer, Pipeline):
+            if len(imputer.steps) != 1:
+                raise NotImplementedError("Only single step preprocessing pipelines can be compiled")
+            imputer = imputer.steps[0][1]
+
+        missing_values = getattr(imputer, "missing_values", None)
+        if getattr(imputer, "add_indicator", False) or not (isinstance(missing_values, float) and np.isnan(missing_values)):
+            raise NotImplementedError("Only NaN imputers without missing indicators can be compiled")
+
+        keep_empty_features = bool(getattr(imputer, "keep_empty_features", False))
+        if isinstance(imputer, KNNImputer):
+            if imputer.metric != "nan_euclidean" or imputer.weights not in ("uniform", "distance"):
+                raise NotImplementedError("KNNImputer must use nan_euclidean distances with uniform or distance weights")
+            fit_X = np.asarray(imputer._fit_X, dtype=np.float64)
+            valid_mask = np.asarray(imputer._valid_mask, dtype=bool)
+            column_means = np.ma.array(fit_X, mask=np.isnan(fit_X)).mean(axis=0).filled(np.nan)
+            metadata = {"imputer" : "knn", "n_neighbors" : int(imputer.n_neighbors), "weights" : imputer.weights}
+            arrays = {"imputer_fit_X" : fit_X, "imputer_column_means" : np.asarray(column_means, dtype=np.float64)}
+        elif isinstance(imputer, NeighborIndexImputer):
+            valid_mask = np.asarray(imputer._valid_mask, dtype=bool)
+            metadata = {
+                "imputer" : "knn", "n_neighbors" : int(imputer.n_neighbors), "weights" : imputer.weights,
+                "tie_break" : "index"
+            }
+            arrays = {
+                "imputer_fit_X" : np.asarray(imputer.reference_, dtype=np.float64),
+                "imputer_column_means" : np.asarray(imputer.statistics_, dtype=np.float64)
+            }
+        elif isinstance(imputer, SimpleImputer):
+            statistics = np.asarray(imputer.statistics_, dtype=np.float64)
+            valid_mask = ~np.isnan(statistics)
+            metadata = {"imputer" : "fill"}
+            arrays = {"imputer_fill_values" : np.where(valid_mask, statistics, 0.0)}
+        else:
+            raise NotImplementedError(f"{type(imputer).__name__} cannot be compiled")
+
+        if len(valid_mask) != n_features:
+            raise ValueError("Imputer was fitted on a different number of features than the encoder produces")
+        metadata["keep_empty_features"] = keep_empty_features
+        arrays["imputer_valid_mask"] = valid_mask
+        return metadata, arrays
+    except Exception as e:
+        raise CustomerChurnException(e,sys)
+
+def compile_model(model)->tuple:
+    try:
+        from sklearn.linear_model import LogisticRegression
+        from sklearn.ensemble import RandomForestClassifier, ExtraTreesClassifier, GradientBoostingClassifier
+        from sklearn.dummy import DummyClassifier
+
+        if len(getattr(model, "classes_", [])) != 2:
+            raise NotImplementedError("Only binary classifiers can be compiled")
+
+        if isinstance(model, LogisticRegression):
+            metadata = {"model" : "linear", "aggregation" : "sum", "link" : "logistic"}
+            arrays = {
+                "linear_coef" : np.asarray(model.coef_[0], dtype=np.float64),
+                "linear_intercept" : np.asarray(model.intercept_, dtype=np.float64)
+            }
+            return metadata, arrays
+
+        if isinstance(model, (RandomForestClassifier, ExtraTreesClassifier)):
+            def leaf_value(value):
+                value = value[:, 0, :]
+                normalizer = value.sum(axis=1)
+                normalizer[normalizer == 0.0] = 1.0
+                return value[:, 1] / normalizer
+
+            arrays = _flatten_trees(_sklearn_trees(model.estimators_, leaf_value))
+            arrays["base_value"] = np.zeros(1)
+            metadata = {"model" : "trees", "aggregation" : "mean", "link" : "identity", "strict_split" : False}
+            return metadata, arrays
+
+        if isinstance(model, GradientBoostingClassifier):
+            if model.loss != "log_loss" or not (model.init_ == "zero" or isinstance(model.init_, DummyClassifier)):
+                raise NotImplementedError("Only log loss GradientBoosting with the default init estimator can be compiled")
+            learning_rate = model.learning_rate
+            arrays = _flatten_trees(_sklearn_trees(model.estimators_[:, 0], lambda value: learning_rate * value[:, 0, 0]))
+            arrays["base_value"] = np.asarray(model._raw_predict_init(np.zeros((1, model.n_features_in_)))[0], dtype=np.float64)
+            metadata = {"model" : "trees", "aggregation" : "sum", "link" : "logistic", "strict_split" : False}
+            return metadata, arrays
+
+        if type(model).__name__ == "XGBClassifier":
+            booster = model.get_booster()
+            raw_model = json.loads(bytes(booster.save_raw("json")))["learner"]
+            if raw_model["objective"]["name"] != "binary:logistic" or raw_model["gradient_booster"]["name"] != "gbtree":
+                raise NotImplementedError("Only binary:logistic gbtree XGBoost models can be compiled")
+
+            gbtree = raw_model["gradient_booster"]["model"]
+            trees = gbtree["trees"]
+            try:
+                num_parallel_tree = int(gbtree["gbtree_model_param"]["num_parallel_tree"])
+                trees = trees[:(model.best_iteration + 1) * num_parallel_tree]
+            except AttributeError:
+                pass
+
+            xgb_trees = []
+            for tree in trees:
+                if any(tree.get("split_type", [])):
+                    raise NotImplementedError("XGBoost categorical splits cannot be compiled")
+                xgb_trees.append({
+                    "left" : tree["left_children"],
+                    "right" : tree["right_children"],
+                    "feature" : tree["split_indices"],
+                    "threshold" : np.asarray(tree["split_conditions"], dtype=np.float32),
+                    "default_left" : np.asarray(tree["default_left"], dtype=bool),
+                    "value" : np.asarray(tree["split_conditions"], dtype=np.float32)
+                })
+
+            base_score = _parse_base_score(raw_model["learner_model_param"]["base_score"])
+            arrays = _flatten_trees(xgb_trees)
+            arrays["base_value"] = np.asarray([np.log(base_score / (1.0 - base_score))], dtype=np.float64)
+            metadata = {"model" : "trees", "aggregation" : "sum", "link" : "logistic", "strict_split" : True}
+            return metadata, arrays
+
+        raise NotImplementedError(f"{type(model).__name__} cannot be compiled")
+    except Exception as e:
+        raise CustomerChurnException(e,sys)
+
+class InferenceGraph:
+    def __init__(self, metadata: dict, arrays: dict):
+        try:
+            self.metadata = metadata
+            self.arrays = arrays
+            self.source_version: str = metadata.get("source_version")
+            self.estimator_name: str = metadata.get("estimator")
+
+            self.feature_names: list = metadata["feature_names"]
+            self.n_features: int = len(self.feature_names)
+            self.numerical_columns: list = metadata["numerical_columns"]
+            self.categorical_columns: dict = metadata["categorical_columns"]
+            self.numerical_positions: np.ndarray = arrays["numerical_positions"]
+            self.numerical_slots = list(zip(self.numerical_columns, self.numerical_positions.tolist()))
+
+            self.valid_mask: np.ndarray = arrays["imputer_valid_mask"]
+            self.drop_columns: bool = not (self.valid_mask.all() or metadata["keep_empty_features"])
+        except Exception as e:
+            raise CustomerChurnException(e,sys)
+
+    @classmethod
+    def compile(cls, ohe, preprocessor, model, source_version: str = None)->"InferenceGraph":
+        try:
+            feature_names = [str(name) for name in preprocessor.feature_names_in_]
+            encoder_metadata, encoder_arrays = compile_encoder(ohe, feature_names)
+            imputer_metadata, imputer_arrays = compile_imputer(preprocessor, len(feature_names))
+            model_metadata, model_arrays = compile_model(model)
+
+            metadata = {
+                **encoder_metadata, **imputer_metadata, **model_metadata,
+                "source_version" : source_version, "estimator" : type(model).__name__
+            }
+            return cls(metadata, {**encoder_arrays, **imputer_arrays, **model_arrays})
+        except Exception as e:
+            raise CustomerChurnException(e,sys)
+
+    def save(self, file_path: str):
+        try:
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+            temp_file_path = f"{file_path}.tmp"
+            with open(temp_file_path, "wb") as file:
+                np.savez(file, metadata=np.asarray(json.dumps(self.metadata)), **self.arrays)
+            os.replace(temp_file_path, file_path)
+        except Exception as e:
+            raise CustomerChurnException(e,sys)
+
+    @classmethod
+    def load(cls, file_path: str)->"InferenceGraph":
+        try:
+            with np.load(file_path, allow_pickle=False) as content:
+                arrays = {name: content[name] for name in content.files if name != "metadata"}
+                metadata = json.loads(str(content["metadata"]))
+            return cls(metadata, arrays)
+        except Exception as e:
+            raise CustomerChurnException(e,sys)
+
+    def encode_record(self, record: dict)->np.ndarray:
+        try:
+            features = np.zeros((1, self.n_features), dtype=np.float64)
+            row = features[0]
+            for column, position in self.numerical_slots:
+                value = record[column]
+                row[position] = np.nan if value is None else value
+            for column, lookup in self.categorical_columns.items():
+                position = lookup.get(_category_key(record[column]))
+                if position is not None:
+                    row[position] = 1.0
+            return features
+        except Exception as e:
+            raise CustomerChurnException(e,sys)
+
+    def encode_records(self, records: list)->np.ndarray:
+        try:
+            # Small batches of dicts are cheaper to encode column by column than to wrap in a DataFrame
+            features = np.zeros((len(records), self.n_features), dtype=np.float64)
+            for column, position in self.numerical_slots:
+                features[:, position] = [
+                    np.nan if record[column] is None else record[column] for record in records
+                ]
+            for column, lookup in self.categorical_columns.items():
+                positions = np.fromiter(
+                    (lookup.get(_category_key(record[column]), -1) for record in records), dtype=np.int64, count=len(records)
+                )
+                rows = np.flatnonzero(positions >= 0)
+                features[rows, positions[rows]] = 1.0
+            return features
+        except Exception as e:
+            raise CustomerChurnException(e,sys)
+
+    def encode_frame(self, data: pd.DataFrame)->np.ndarray:
+        try:
+            features = np.zeros((len(data), self.n_features), dtype=np.float64)
+            features[:, self.numerical_positions] = data[self.numerical_columns].to_numpy(dtype=np.float64, na_value=np.nan)
+            for column, lookup in self.categorical_columns.items():
+                values = data[column]
+                keys = values.astype(object).where(values.notna(), MISSING_CATEGORY_KEY).astype(str)
+                positions = keys.map(lookup).to_numpy(dtype=np.float64)
+                rows = np.flatnonzero(~np.isnan(positions))
+                features[rows, positions[rows].astype(np.int64)] = 1.0
+            return features
+        except Exception as e:
+            raise CustomerChurnException(e,sys)
+
+    def _knn_impute(self, features: np.ndarray, rows: np.ndarray):
+        fit_X = self.arrays["imputer_fit_X"]
+        fit_missing = np.isnan(fit_X)
+        column_means = self.arrays["imputer_column_means"]
+        n_neighbors = self.metadata["n_neighbors"]
+        chunk_size = max(1, 2**24 // max(1, fit_X.size))
+
+        for start in range(0, len(rows), chunk_size):
+            chunk_rows = rows[start:start + chunk_size]
+            receivers = features[chunk_rows]
+
+            distances = nan_euclidean_distances(receivers, fit_X, self.n_features)
+
+            receiver_missing = np.isnan(receivers)
+            imputed = receivers.copy()
+            for column in np.flatnonzero(receiver_missing.any(axis=0) & self.valid_mask):
+                receiver_idx = np.flatnonzero(receiver_missing[:, column])
+                donor_idx = np.flatnonzero(~fit_missing[:, column])
+                donor_distances = distances[receiver_idx][:, donor_idx]
+
+                all_nan = np.isnan(donor_distances).all(axis=1)
+                imputed[receiver_idx[all_nan], column] = column_means[column]
+                receiver_idx, donor_distances = receiver_idx[~all_nan], donor_distances[~all_nan]
+                if len(receiver_idx) == 0:
+                    continue
+
+                k = min(n_neighbors, len(donor_idx))
+                if self.metadata.get("tie_break") == "index":
+                    # Equal distances go to the lowest donor index, matching NeighborIndexImputer
+                    neighbors = np.argsort(donor_distances, axis=1, kind="stable")[:, :k]
+                else:
+                    neighbors = np.argpartition(donor_distances, k - 1, axis=1)[:, :k]
+                neighbor_distances = np.take_along_axis(donor_distances, neighbors, axis=1)
+                if self.metadata["weights"] == "distance":
+                    with np.errstate(divide="ignore"):
+                        weights = 1.0 / neighbor_distances
+                    inf_weights = np.isinf(weights)
+                    inf_rows = inf_weights.any(axis=1)
+                    weights[inf_rows] = inf_weights[inf_rows]
+                    weights[np.isnan(weights)] = 0.0
+                else:
+                    weights = (~np.isnan(neighbor_distances)).astype(np.float64)
+
+                donor_values = fit_X[donor_idx, column][neighbors]
+                imputed[receiver_idx, column] = (weights * donor_values).sum(axis=1) / weights.sum(axis=1)
+            features[chunk_rows] = imputed
+
+    def impute(self, features: np.ndarray)->np.ndarray:
+        try:
+            missing_rows = np.flatnonzero(np.isnan(features).any(axis=1))
+            if len(missing_rows):
+                if self.metadata["imputer"] == "knn":
+                    self._knn_impute(features, missing_rows)
+                else:
+                    fill_values = self.arrays["imputer_fill_values"]
+                    subset = features[missing_rows]
+                    features[missing_rows] = np.where(np.isnan(subset), fill_values, subset)
+
+            if self.drop_columns:
+                return features[:, self.valid_mask]
+            if not self.valid_mask.all():
+                features[:, ~self.valid_mask] = 0.0
+            return features
+        except Exception as e:
+            raise CustomerChurnException(e,sys)
+
+    def _tree_scores(self, features: np.ndarray)->np.ndarray:
+        arrays = self.arrays
+        feature, threshold = arrays["tree_feature"], arrays["tree_threshold"]
+        left, right = arrays["tree_left"], arrays["tree_right"]
+
+        # Trees were fitted on float32 inputs, casting keeps split decisions identical
+        features = features.astype(np.float32).astype(np.float64)
+        has_missing = np.isnan(features).any()
+        row_index = np.arange(len(features))[:, None]
+        nodes = np.broadcast_to(arrays["tree_roots"], (len(features), len(arrays["tree_roots"])))
+        for _ in range(int(arrays["tree_depth"][0])):
+            values = features[row_index, feature[nodes]]
+            if self.metadata["strict_split"]:
+                go_left = values < threshold[nodes]
+            else:
+                go_left = values <= threshold[nodes]
+            if has_missing:
+                go_left = np.where(np.isnan(values), arrays["tree_default_left"][nodes], go_left)
+            nodes = np.where(go_left, left[nodes], right[nodes])
+
+        leaf_values = arrays["tree_value"][nodes]
+        if self.metadata["aggregation"] == "mean":
+            return leaf_values.mean(axis=1)
+        return arrays["base_value"][0] + leaf_values.sum(axis=1)
+
+    def predict_transformed(self, features: np.ndarray)->np.ndarray:
+        try:
+            if self.metadata["model"] == "linear":
+                scores = features @ self.arrays["linear_coef"] + self.arrays["linear_intercept"][0]
+            else:
+                scores = self._tree_scores(features)
+
+            if self.metadata["link"] == "logistic":
+                return _sigmoid(scores)
+            return scores
+        except Exception as e:
+            raise CustomerChurnException(e,sys)
+
+    def predict_proba_record(self, record: dict)->float:
+        try:
+            return float(self.predict_transformed(self.impute(self.encode_record(record)))[0])
+        except Exception as e:
+            raise CustomerChurnException(e,sys)
+
+    def predict_proba_records(self, records: list)->np.ndarray:
+        try:
+            return self.predict_transformed(self.impute(self.encode_records(records)))
+        except Exception as e:
+            raise CustomerChurnException(e,sys)
+
+    def predict_proba_frame(self, data: pd.DataFrame)->np.ndarray:
+        try:
+            return self.predict_transformed(self.impute(self.encode_frame(data)))
+        except Exception as e:
+            raise CustomerChurnException(e,sys)
+
+    def verification_frame(self, n_rows: int = 512, random_state: int = 42)->pd.DataFrame:
+        try:
+            # Numeric values are drawn around the split thresholds so both sides of every split get exercised
+            rng = np.random.default_rng(random_state)
+            data = {}
+            for column, position in self.numerical_slots:
+                thresholds = np.empty(0)
+                if "tree_feature" in self.arrays:
+                    split_nodes = (self.arrays["tree_feature"] == position) & np.isfinite(self.arrays["tree_threshold"])
+                    thresholds = self.arrays["tree_threshold"][split_nodes]
+                if len(thresholds):
+                    values = rng.choice(thresholds, n_rows) + rng.normal(0, 1, n_rows) * np.maximum(np.abs(thresholds).mean() * 0.01, 1e-3)
+                else:
+                    values = rng.normal(0, 100, n_rows)
+                values[rng.random(n_rows) < 0.05] = np.nan
+                data[column] = values
+            for column, lookup in self.categorical_columns.items():
+                categories = [key for key in lookup if key != MISSING_CATEGORY_KEY]
+                data[column] = rng.choice(categories, n_rows)
+            return pd.DataFrame(data)
+        except Exception as e:
+            raise CustomerChurnException(e,sys)
+
+    def max_deviation(self, ohe, preprocessor, model, data: pd.DataFrame = None)->float:
+        try:
+            from src.utils.ml_utils import transform_input
+
+            if data is None:
+                data = self.verification_frame()
+            columns = list(ohe.feature_names_in_) + self.numerical_columns
+            data = data[[column for column in data.columns if column in columns]]
+            expected = model.predict_proba(transform_input(data, ohe, preprocessor))[:, 1]
+            actual = self.predict_proba_frame(data)
+            return float(np.max(np.abs(expected - actual)))
+        except Exception as e:
+            raise CustomerChurnException(e,sys)
+
+def compile_inference_graph(ohe, preprocessor, model, source_version: str = None, tolerance: float = INFERENCE_GRAPH_TOLERANCE)->InferenceGraph:
+    try:
+        inference_graph = InferenceGraph.compile(ohe, preprocessor, model, source_version)
+        deviation = inference_graph.max_deviation(ohe, preprocessor, model)
+        if deviation > tolerance:
+            raise ValueError(f"Compiled Inference Graph deviates from the model by {deviation}")
+        return inference_graph
+    except Exception as e:
+        raise CustomerChurnException(e,sys)
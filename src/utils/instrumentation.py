@@ -0,0 +1,224 @@
+import os
+import sys
+import time
+import pstats
+import cProfile
+import threading
+import numpy as np
+from collections import Counter
+from dataclasses import fields
+
+from src.exception.exception import CustomerChurnException
+from src.utils.main_utils import write_json_file, get_process_usage
+from src.utils.feature_store import count_feature_store_rows
+
+DATA_FILE_EXTENSIONS: tuple = (".arrow", ".npy", ".csv")
+
+def get_rss_mb()->float:
+    try:
+        with open("/proc/self/statm", "r") as file:
+            return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except (OSError, ValueError):
+        # Without procfs only the lifetime peak is available
+        return get_process_usage()[1]
+
+def get_cpu_seconds()->float:
+    # Only this process, worker pools started with forkserver or spawn are not its children and report
+    # their usage through record_worker_usage instead
+    times = os.times()
+    return times.user + times.system
+
+_active_stage = threading.local()
+
+def record_worker_usage(cpu_seconds: float, peak_rss_mb: float):
+    # Adds work done in other processes to the stage running on the calling thread, if there is one
+    instrumentation = getattr(_active_stage, "instrumentation", None)
+    if instrumentation is not None:
+        instrumentation.worker_cpu_seconds += cpu_seconds
+        instrumentation.worker_peak_rss_mb = max(instrumentation.worker_peak_rss_mb, peak_rss_mb)
+
+class PeakMemoryMonitor:
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.start_mb = 0.0
+        self.peak_mb = 0.0
+        self._stop_event = threading.Event()
+        self._thread: threading.Thread = None
+
+    def _sample(self):
+        while not self._stop_event.wait(self.interval):
+            self.peak_mb = max(self.peak_mb, get_rss_mb())
+
+    def __enter__(self):
+        # Sampling catches allocations made by NumPy, Arrow and native libraries alike, unlike tracemalloc
+        self.start_mb = self.peak_mb = get_rss_mb()
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._stop_event.set()
+        self._thread.join()
+        self.peak_mb = max(self.peak_mb, get_rss_mb())
+
+class SamplingProfiler:
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.samples = Counter()
+        self._thread_id: int = None
+        self._stop_event = threading.Event()
+        self._thread: threading.Thread = None
+
+    def _sample(self):
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self._thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            if stack:
+                self.samples[";".join(reversed(stack))] += 1
+
+    def __enter__(self):
+        # Only the thread running the stage is sampled, so the overhead does not grow with the work it does
+        self._thread_id = threading.get_ident()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._stop_event.set()
+        self._thread.join()
+
+    def dump(self, file_path: str):
+        # Collapsed stacks, one "frame;frame;frame count" line each, the input format of flame graph tools
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        with open(file_path, "w") as file:
+            for stack, count in self.samples.most_common():
+                file.write(f"{stack} {count}\n")
+
+def count_file_rows(file_path: str)->int:
+    try:
+        if file_path is None or not os.path.exists(file_path):
+            return None
+        # Transformed arrays keep the .csv name of the split they came from, so the format is read from the file itself
+        with open(file_path, "rb") as file:
+            magic = file.read(6)
+        if magic == b"ARROW1":
+            return count_feature_store_rows(file_path)
+        if magic == b"\x93NUMPY" or magic[:2] == b"PK":
+            # Dense arrays are memory-mapped and sparse archives only read their shape member, neither loads the data
+            array = np.load(file_path, mmap_mode="r")
+            if hasattr(array, "files"):
+                with array:
+                    return int(array["shape"][0])
+            return int(array.shape[0])
+        if file_path.endswith(".csv"):
+            with open(file_path, "rb") as file:
+                return max(sum(1 for _ in file) - 1, 0)
+        return None
+    except Exception as e:
+        raise CustomerChurnException(e,sys)
+
+def get_artifact_data_files(artifact)->dict:
+    try:
+        return {
+            field.name: getattr(artifact, field.name) for field in fields(artifact)
+            if field.name.endswith("_path") and isinstance(getattr(artifact, field.name), str)
+            and getattr(artifact, field.name).endswith(DATA_FILE_EXTENSIONS)
+        }
+    except Exception as e:
+        raise CustomerChurnException(e,sys)
+
+def count_rows(file_paths: list)->int:
+    try:
+        counts = [count_file_rows(file_path) for file_path in file_paths]
+        counts = [count for count in counts if count is not None]
+        return sum(counts) if counts else None
+    except Exception as e:
+        raise CustomerChurnException(e,sys)
+
+class StageInstrumentation:
+    def __init__(self, stage_name: str, profiler: str = None, profile_dir: str = None,
+                 memory_sample_interval: float = 0.01, profiler_sample_interval: float = 0.005):
+        try:
+            self.stage_name = stage_name
+            self.profiler = profiler
+            self.profile_dir = profile_dir
+            self.memory_monitor = PeakMemoryMonitor(memory_sample_interval)
+            self.profiler_sample_interval = profiler_sample_interval
+            self.profile_file_path: str = None
+            self.wall_seconds = 0.0
+            self.cpu_seconds = 0.0
+            self.worker_cpu_seconds = 0.0
+            self.worker_peak_rss_mb = 0.0
+            self._profile = None
+            self._outer_stage = None
+        except Exception as e:
+            raise CustomerChurnException(e,sys)
+
+    def __enter__(self):
+        self._outer_stage = getattr(_active_stage, "instrumentation", None)
+        _active_stage.instrumentation = self
+        self.memory_monitor.__enter__()
+        if self.profiler == "cprofile":
+            self._profile = cProfile.Profile()
+        elif self.profiler == "sampling":
+            self._profile = SamplingProfiler(self.profiler_sample_interval)
+        elif self.profiler is not None:
+            raise ValueError(f"Unknown profiler : {self.profiler}, expected cprofile or sampling")
+        self._start_wall = time.perf_counter()
+        self._start_cpu = get_cpu_seconds()
+        if self._profile is not None:
+            self._profile.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self._profile is not None:
+            self._profile.__exit__(exc_type, exc_value, traceback)
+        self.wall_seconds = time.perf_counter() - self._start_wall
+        self.cpu_seconds = get_cpu_seconds() - self._start_cpu
+        self.memory_monitor.__exit__(exc_type, exc_value, traceback)
+        _active_stage.instrumentation = self._outer_stage
+        if self._profile is not None and self.profile_dir is not None:
+            self.export_profile()
+
+    def export_profile(self):
+        try:
+            os.makedirs(self.profile_dir, exist_ok=True)
+            if isinstance(self._profile, cProfile.Profile):
+                self.profile_file_path = os.path.join(self.profile_dir, f"{self.stage_name}.prof")
+                self._profile.dump_stats(self.profile_file_path)
+                # A readable summary next to the binary dump, which snakeviz or pstats can open
+                with open(os.path.join(self.profile_dir, f"{self.stage_name}.txt"), "w") as file:
+                    pstats.Stats(self._profile, stream=file).sort_stats("cumulative").print_stats(50)
+            else:
+                self.profile_file_path = os.path.join(self.profile_dir, f"{self.stage_name}.collapsed")
+                self._profile.dump(self.profile_file_path)
+        except Exception as e:
+            raise CustomerChurnException(e,sys)
+
+    def metrics(self, input_rows: int = None, output_rows: int = None)->dict:
+        try:
+            return {
+                "stage" : self.stage_name,
+                "wall_seconds" : round(self.wall_seconds, 4),
+                "cpu_seconds" : round(self.cpu_seconds + self.worker_cpu_seconds, 4),
+                "worker_cpu_seconds" : round(self.worker_cpu_seconds, 4),
+                "peak_rss_mb" : round(self.memory_monitor.peak_mb, 1),
+                "worker_peak_rss_mb" : round(self.worker_peak_rss_mb, 1),
+                "rss_growth_mb" : round(self.memory_monitor.peak_mb - self.memory_monitor.start_mb, 1),
+                "input_rows" : input_rows,
+                "output_rows" : output_rows,
+                "profile_file_path" : self.profile_file_path
+            }
+        except Exception as e:
+            raise CustomerChurnException(e,sys)
+
+def export_stage_metrics(file_path: str, metrics: dict):
+    try:
+        write_json_file(file_path, metrics)
+    except Exception as e:
+        raise CustomerChurnException(e,sys)
@@ -1,13 +1,25 @@
 import os
 import sys
+import mmap
 import numpy as np
+import scipy.sparse as sp
 import yaml
+import json
+import time
 import pickle
-
-from sklearn.metrics import f1_score
+import shutil
+import hashlib
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
 
 from src.exception.exception import CustomerChurnException
 
+# Largest contiguous copy made while fingerprinting a strided array
+FINGERPRINT_BLOCK_BYTES: int = 16 * 2 ** 20
+
+# XGBoost reads the implicit zeros of a sparse matrix as missing values, so it must see dense input
+DENSE_INPUT_MODELS: tuple = ("XGBClassifier",)
+
 def read_yaml_file(file_path: str):
     try:
         with open(file_path,"rb") as file:
@@ -26,12 +38,32 @@ def write_yaml_file(file_path: str, content: object, replace: bool = False):
     except Exception as e:
         raise CustomerChurnException(e,sys)
 
+def read_json_file(file_path: str):
+    try:
+        with open(file_path,"r") as file:
+            return json.load(file)
+    except Exception as e:
+        raise CustomerChurnException(e,sys)
+
+def write_json_file(file_path: str, content: object):
+    try:
+        os.makedirs(os.path.dirname(file_path),exist_ok=True)
+        temp_file_path = f"{file_path}.tmp"
+        with open(temp_file_path,"w") as file:
+            json.dump(content, file, indent=2)
+        os.replace(temp_file_path, file_path)
+    except Exception as e:
+        raise CustomerChurnException(e,sys)
+
 def save_object(object, file_path: str):
     try:
         dir_path = os.path.dirname(file_path)
         os.makedirs(dir_path, exist_ok=True)
-        with open(file_path,"wb") as file:
+        # Write to a temporary file and rename it so readers never see a partially written object
+        temp_file_path = f"{file_path}.tmp"
+        with open(temp_file_path,"wb") as file:
             pickle.dump(object, file)
+        os.replace(temp_file_path, file_path)
     except Exception as e:
         raise CustomerChurnException(e,sys)
 
@@ -46,35 +78,342 @@ def save_numpy_array_data(array: np.array, file_path: str):
     try:
         dir_path = os.path.dirname(file_path)
         os.makedirs(dir_path, exist_ok=True)
-        with open(file_path,"wb") as file:
+        # Concurrent workers share the cache files, each writes its own temporary file and renames it into place
+        temp_file_path = f"{file_path}.{os.getpid()}.tmp"
+        with open(temp_file_path,"wb") as file:
             np.save(file, array)
+        os.replace(temp_file_path, file_path)
+    except Exception as e:
+        raise CustomerChurnException(e,sys)
+
+def save_sparse_array_data(matrix: sp.spmatrix, file_path: str):
+    try:
+        dir_path = os.path.dirname(file_path)
+        os.makedirs(dir_path, exist_ok=True)
+        # Passing a file object keeps save_npz from appending .npz to the configured path
+        temp_file_path = f"{file_path}.{os.getpid()}.tmp"
+        with open(temp_file_path,"wb") as file:
+            sp.save_npz(file, sp.csr_matrix(matrix))
+        os.replace(temp_file_path, file_path)
     except Exception as e:
         raise CustomerChurnException(e,sys)
 
-def load_numpy_array_data(file_path: str)->np.array:
+class SparseMatrixWriter:
+    # Appends CSR row blocks to flat part files and assembles the archive save_npz would write on close,
+    # so a matrix larger than memory is written holding one block at a time
+    PARTS: tuple = (("data", np.float64), ("indices", np.int64), ("indptr", np.int64))
+
+    def __init__(self, file_path: str):
+        try:
+            self.file_path = file_path
+            self.number_of_rows = 0
+            self.number_of_columns = None
+            self.nnz = 0
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+            self._part_files = {name: open(f"{file_path}.{name}.tmp", "wb") for name, _ in self.PARTS}
+            self._part_files["indptr"].write(np.zeros(1, dtype=np.int64).tobytes())
+        except Exception as e:
+            raise CustomerChurnException(e,sys)
+
+    def write(self, matrix: sp.spmatrix):
+        try:
+            matrix = sp.csr_matrix(matrix)
+            if self.number_of_columns is None:
+                self.number_of_columns = matrix.shape[1]
+            elif matrix.shape[1] != self.number_of_columns:
+                raise ValueError(f"Block has {matrix.shape[1]} columns, expected {self.number_of_columns}")
+            self._part_files["data"].write(np.ascontiguousarray(matrix.data, dtype=np.float64).tobytes())
+            self._part_files["indices"].write(np.ascontiguousarray(matrix.indices, dtype=np.int64).tobytes())
+            self._part_files["indptr"].write((matrix.indptr[1:].astype(np.int64) + self.nnz).tobytes())
+            self.number_of_rows += matrix.shape[0]
+            self.nnz += matrix.nnz
+        except Exception as e:
+            raise CustomerChurnException(e,sys)
+
+    def close(self):
+        try:
+            for part_file in self._part_files.values():
+                part_file.close()
+            lengths = {"data" : self.nnz, "indices" : self.nnz, "indptr" : self.number_of_rows + 1}
+            temp_file_path = f"{self.file_path}.tmp"
+            with zipfile.ZipFile(temp_file_path, mode="w", compression=zipfile.ZIP_STORED, allowZip64=True) as archive:
+                for name, array in (("format", np.array(b"csr")), ("shape", np.array([self.number_of_rows, self.number_of_columns or 0]))):
+                    with archive.open(f"{name}.npy", "w") as member:
+                        np.lib.format.write_array(member, array)
+                for name, dtype in self.PARTS:
+                    with archive.open(f"{name}.npy", "w", force_zip64=True) as member:
+                        np.lib.format.write_array_header_1_0(member, {
+                            "descr" : np.lib.format.dtype_to_descr(np.dtype(dtype)), "fortran_order" : False, "shape" : (lengths[name],)
+                        })
+                        with open(f"{self.file_path}.{name}.tmp", "rb") as part_file:
+                            shutil.copyfileobj(part_file, member, 1 << 20)
+            os.replace(temp_file_path, self.file_path)
+        except Exception as e:
+            raise CustomerChurnException(e,sys)
+        finally:
+            for name, _ in self.PARTS:
+                if os.path.exists(f"{self.file_path}.{name}.tmp"):
+                    os.remove(f"{self.file_path}.{name}.tmp")
+
+def load_numpy_array_data(file_path: str, mmap_mode: str = None)->np.array:
     try:
+        with open(file_path, "rb") as file:
+            is_sparse = file.read(2) == b"PK"
+        if is_sparse:
+            return sp.load_npz(file_path).tocsr()
+        if mmap_mode is not None:
+            # Memory-mapped arrays are paged in on access instead of being read up front
+            return np.load(file_path, mmap_mode=mmap_mode)
         with open(file_path, "rb") as file:
             return np.load(file)
     except Exception as e:
         raise CustomerChurnException(e,sys)
     
-def evaluate_models(models, X_train, X_test, y_train, y_test):
+def get_content_version(contents: list)->str:
     try:
+        digest = hashlib.sha256()
+        for content in contents:
+            digest.update(content)
+        return digest.hexdigest()[:12]
+    except Exception as e:
+        raise CustomerChurnException(e,sys)
+
+def get_files_version(file_paths: list)->str:
+    try:
+        digest = hashlib.sha256()
+        for file_path in file_paths:
+            with open(file_path, "rb") as file:
+                for block in iter(lambda: file.read(1 << 20), b""):
+                    digest.update(block)
+        return digest.hexdigest()[:12]
+    except Exception as e:
+        raise CustomerChurnException(e,sys)
+
+def write_artifact_manifest(manifest_file_path: str, artifact_paths: dict):
+    try:
+        # Written after every artifact is in place, so a reader that finds it knows the whole set is published
+        files = {}
+        for name, file_path in artifact_paths.items():
+            with open(file_path, "rb") as file:
+                files[name] = {"file_name" : os.path.basename(file_path), "sha256" : hashlib.sha256(file.read()).hexdigest()}
+        write_json_file(manifest_file_path, {"files" : files})
+    except Exception as e:
+        raise CustomerChurnException(e,sys)
+
+def read_published_artifacts(manifest_file_path: str)->dict:
+    try:
+        manifest = read_json_file(manifest_file_path)
+        contents = {}
+        for name, entry in manifest["files"].items():
+            with open(os.path.join(os.path.dirname(manifest_file_path), entry["file_name"]), "rb") as file:
+                content = file.read()
+            # A file that no longer matches belongs to a publish still in progress, so the set is refused as a whole
+            if hashlib.sha256(content).hexdigest() != entry["sha256"]:
+                raise ValueError(f"{entry['file_name']} does not match the artifact manifest")
+            contents[name] = content
+        return contents
+    except Exception as e:
+        raise CustomerChurnException(e,sys)
+
+def set_estimator_threads(model, n_threads: int):
+    try:
+        if "n_jobs" in model.get_params(deep=False):
+            model.set_params(n_jobs=n_threads)
+        return model
+    except Exception as e:
+        raise CustomerChurnException(e,sys)
+
+def requires_dense_input(model)->bool:
+    return type(model).__name__ in DENSE_INPUT_MODELS
+
+def as_model_input(model, X):
+    try:
+        if sp.issparse(X) and requires_dense_input(model):
+            return X.toarray()
+        return X
+    except Exception as e:
+        raise CustomerChurnException(e,sys)
+
+def get_fit_params(model, sample_weight)->dict:
+    # Estimators that already balance classes themselves would apply the weights twice
+    if sample_weight is None or getattr(model, "class_weight", None) is not None:
+        return {}
+    return {"sample_weight" : sample_weight}
+
+def get_array_fingerprint(*arrays)->str:
+    try:
+        digest = hashlib.sha256()
+        for array in arrays:
+            if array is None:
+                continue
+            if sp.issparse(array):
+                array = sp.csr_matrix(array)
+                digest.update(f"csr{array.shape}".encode())
+                for part in (array.data, array.indices, array.indptr):
+                    digest.update(np.ascontiguousarray(part).data)
+                continue
+            array = np.asarray(array)
+            digest.update(f"{array.shape}{array.dtype}".encode())
+            if array.ndim == 0:
+                digest.update(np.ascontiguousarray(array).data)
+                continue
+            # Hashing row blocks keeps the contiguous copy of a strided memmap view bounded, the digest is unchanged
+            rows_per_block = max(1, FINGERPRINT_BLOCK_BYTES // max(1, array[:1].nbytes))
+            for start in range(0, array.shape[0], rows_per_block):
+                digest.update(np.ascontiguousarray(array[start:start + rows_per_block]).data)
+        return digest.hexdigest()[:16]
+    except Exception as e:
+        raise CustomerChurnException(e,sys)
+
+class MemmapView:
+    # Stands in for a view of a read-only memory-mapped .npy file when data is sent to pool workers,
+    # each worker maps the file itself instead of unpickling its own full copy of the array
+    def __init__(self, array: np.memmap, root: np.memmap):
+        self.file_path = root.filename
+        self.root_dtype = root.dtype
+        self.root_shape = root.shape
+        self.root_offset = root.offset
+        self.root_order = "F" if root.flags.f_contiguous and not root.flags.c_contiguous else "C"
+        self.offset = array.ctypes.data - root.ctypes.data
+        self.dtype = array.dtype
+        self.shape = array.shape
+        self.strides = array.strides
+
+    def load(self)->np.ndarray:
+        root = np.memmap(
+            self.file_path, dtype=self.root_dtype, mode="r", offset=self.root_offset, shape=self.root_shape, order=self.root_order
+        )
+        return np.ndarray(self.shape, dtype=self.dtype, buffer=root, offset=self.offset, strides=self.strides)
+
+def as_worker_argument(array):
+    if not isinstance(array, np.memmap):
+        return array
+    root = array
+    while isinstance(root.base, np.memmap):
+        root = root.base
+    # Only maps opened read-only are shared, writes to any other mode may not have reached the file yet
+    if not isinstance(root.base, mmap.mmap) or root.mode != "r" or root.filename is None:
+        return array
+    return MemmapView(array, root)
+
+def from_worker_argument(array):
+    return array.load() if isinstance(array, MemmapView) else array
+
+def get_process_usage()->tuple:
+    # CPU seconds and peak RSS in MB of the calling process, ru_maxrss is KiB on Linux and bytes on macOS
+    import resource
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    peak_rss_mb = usage.ru_maxrss / 2 ** 20 if sys.platform == "darwin" else usage.ru_maxrss / 2 ** 10
+    return usage.ru_utime + usage.ru_stime, peak_rss_mb
+
+# Training data of the current evaluation, set once per pool worker or for the duration of an in-process run
+_evaluation_data: tuple = None
+
+def _init_evaluation_worker(X_train, X_test, y_train, y_test, data_fingerprint, sample_weight=None, X_search=None, y_search=None,
+                            search_fingerprint=None):
+    global _evaluation_data
+    _evaluation_data = (
+        from_worker_argument(X_train), from_worker_argument(X_test), from_worker_argument(y_train), from_worker_argument(y_test),
+        data_fingerprint, from_worker_argument(sample_weight), from_worker_argument(X_search), from_worker_argument(y_search),
+        search_fingerprint
+    )
+
+def _fit_candidate(model_name, model, n_threads, search=None):
+    # Imported here so the serving path, which only needs the file helpers, does not load sklearn
+    from sklearn.metrics import f1_score
+    from threadpoolctl import threadpool_limits
+
+    X_train, X_test, y_train, y_test, data_fingerprint, sample_weight, X_search, y_search, search_fingerprint = _evaluation_data
+
+    start_cpu_seconds, _ = get_process_usage()
+    # Limits the BLAS/OpenMP pools as well as n_jobs so concurrent candidates do not oversubscribe the machine
+    with threadpool_limits(limits=n_threads):
+        set_estimator_threads(model, n_threads)
+        if search is not None and search.resampler is not None:
+            search.resampler.n_jobs = n_threads
+        start_time = time.perf_counter()
+        if search is not None:
+            if X_search is None:
+                search_result = search.search(model_name, model, X_train, y_train, data_fingerprint, sample_weight)
+            else:
+                search_result = search.search(model_name, model, X_search, y_search, search_fingerprint)
+            model.set_params(**search_result["best_params"])
+        model.fit(as_model_input(model, X_train), y_train, **get_fit_params(model, sample_weight))
+        fit_time = time.perf_counter() - start_time
+
+        test_y_pred = model.predict(as_model_input(model, X_test))
+
+    test_f1 = f1_score(y_test, test_y_pred)
+    cpu_seconds, peak_rss_mb = get_process_usage()
+    usage = {"pid" : os.getpid(), "cpu_seconds" : cpu_seconds - start_cpu_seconds, "peak_rss_mb" : peak_rss_mb}
+    return model_name, model, test_f1, fit_time, usage
+
+def evaluate_models(models, X_train, X_test, y_train, y_test, max_workers: int = None, cpu_budget: dict = None, searches: dict = None,
+                    sample_weight: np.ndarray = None, X_search=None, y_search=None, start_method: str = None):
+    global _evaluation_data
+    try:
+        # X_search/y_search are the real rows before resampling, searches split their validation fold from them
+        # and resample only the fit fold, while the final fit uses X_train/y_train
+        cpu_count = os.cpu_count() or 1
+        if max_workers is None:
+            max_workers = min(len(models), cpu_count)
+        cpu_budget = cpu_budget or {}
+        searches = searches or {}
+        data_fingerprint = get_array_fingerprint(X_train, y_train, sample_weight)
+        search_fingerprint = None if X_search is None else get_array_fingerprint(X_search, y_search)
+        default_threads = max(1, cpu_count // max(1, max_workers))
+
         report = {}
         best_models = {}
-        for i in range(len(models)):
-            model_name = list(models.keys())[i]
-            model = list(models.values())[i]
-
-            model.fit(X_train, y_train)
-        
-            test_y_pred = model.predict(X_test)
-            
-            test_f1 = f1_score(y_test, test_y_pred)
+        fit_times = {}
+        # Pool workers are not children of this process under forkserver or spawn, so their usage is reported back
+        # with each result, the in-process path is already covered by the caller's own counters
+        worker_usage = {"cpu_seconds" : 0.0, "peak_rss_mb" : 0.0}
+        worker_peak_rss_mb = {}
+        if max_workers <= 1:
+            _init_evaluation_worker(
+                X_train, X_test, y_train, y_test, data_fingerprint, sample_weight, X_search, y_search, search_fingerprint
+            )
+            try:
+                results = [
+                    _fit_candidate(model_name, model, cpu_budget.get(model_name, default_threads), searches.get(model_name))
+                    for model_name, model in models.items()
+                ]
+            finally:
+                # The global would otherwise keep the training arrays alive in the calling process
+                _evaluation_data = None
+        else:
+            import multiprocessing
+            if start_method is not None and start_method not in multiprocessing.get_all_start_methods():
+                start_method = "spawn"
+            with ProcessPoolExecutor(
+                max_workers=max_workers, initializer=_init_evaluation_worker,
+                mp_context=None if start_method is None else multiprocessing.get_context(start_method),
+                initargs=(
+                    as_worker_argument(X_train), as_worker_argument(X_test), as_worker_argument(y_train), as_worker_argument(y_test),
+                    data_fingerprint, as_worker_argument(sample_weight), as_worker_argument(X_search), as_worker_argument(y_search),
+                    search_fingerprint
+                )
+            ) as executor:
+                futures = [
+                    executor.submit(
+                        _fit_candidate, model_name, model, cpu_budget.get(model_name, default_threads), searches.get(model_name)
+                    )
+                    for model_name, model in models.items()
+                ]
+                # Results are gathered in submission order so model selection does not depend on finishing order
+                results = [future.result() for future in futures]
+            for *_, usage in results:
+                worker_usage["cpu_seconds"] += usage["cpu_seconds"]
+                worker_peak_rss_mb[usage["pid"]] = max(worker_peak_rss_mb.get(usage["pid"], 0.0), usage["peak_rss_mb"])
+            # Workers run side by side, so their peaks add up
+            worker_usage["peak_rss_mb"] = sum(worker_peak_rss_mb.values())
 
+        for model_name, model, test_f1, fit_time, _ in results:
             report[model_name] = test_f1
             best_models[model_name] = model
+            fit_times[model_name] = fit_time
 
-        return report, best_models
+        return report, best_models, fit_times, worker_usage
     except Exception as e:
         raise CustomerChurnException(e,sys)
\ No newline at end of file
@@ -1,15 +1,20 @@
 import sys
+import time
+import numpy as np
 import pandas as pd
+import scipy.sparse as sp
 
 from src.exception.exception import CustomerChurnException
 from src.entity.artifact_entity import ClassificationMetric
-from sklearn.metrics import f1_score, precision_score, recall_score
 
-from src.utils.main_utils import load_object
+from src.utils.main_utils import load_object, as_model_input
 from src.entity.config_entity import ModelTrainerConfig, TrainingPipelineConfig
 
 def get_classification_metrics(y_true, y_pred)->ClassificationMetric:
     try:
+        # sklearn is imported where it is used, the serving path imports this module without needing it
+        from sklearn.metrics import f1_score, precision_score, recall_score
+
         f1 = f1_score(y_true, y_pred)
         precision = precision_score(y_true, y_pred)
         recall = recall_score(y_true, y_pred)
@@ -24,14 +29,91 @@ def get_classification_metrics(y_true, y_pred)->ClassificationMetric:
     except Exception as e:
         raise CustomerChurnException(e,sys)
 
-def preprocess(data: pd.DataFrame)->float:
+def get_imputer_output_mask(preprocessor):
     try:
-        training_pipeline_config = TrainingPipelineConfig()
-        model_trainer_config = ModelTrainerConfig(training_pipeline_config)
+        from sklearn.pipeline import Pipeline
 
-        ohe = load_object(model_trainer_config.encoder_file_path)
-        knn = load_object(model_trainer_config.preprocessor_file_path)
-        model = load_object(model_trainer_config.model_file_path)
+        imputer = preprocessor
+        if isinstance(imputer, Pipeline):
+            if len(imputer.steps) != 1:
+                return None
+            imputer = imputer.steps[0][1]
+
+        missing_values = getattr(imputer, "missing_values", None)
+        if getattr(imputer, "add_indicator", False) or not (isinstance(missing_values, float) and np.isnan(missing_values)):
+            return None
+
+        # KNNImputer keeps _valid_mask, SimpleImputer marks dropped columns with NaN statistics
+        if hasattr(imputer, "_valid_mask"):
+            return np.asarray(imputer._valid_mask)
+        if hasattr(imputer, "statistics_"):
+            if getattr(imputer, "keep_empty_features", False):
+                return np.ones(len(imputer.statistics_), dtype=bool)
+            return ~np.isnan(imputer.statistics_)
+        return None
+    except Exception as e:
+        raise CustomerChurnException(e,sys)
+
+def impute_missing_values(data: pd.DataFrame, preprocessor)->np.ndarray:
+    try:
+        output_mask = get_imputer_output_mask(preprocessor)
+        if output_mask is None:
+            return preprocessor.transform(data)
+
+        values = data.to_numpy(dtype=float)
+        missing_rows = np.isnan(values).any(axis=1)
+
+        # Complete rows pass straight through, only rows with missing values reach the imputer
+        output = values[:, output_mask] if not output_mask.all() else values
+        if missing_rows.any():
+            output[missing_rows] = preprocessor.transform(data.loc[missing_rows])
+        return output
+    except Exception as e:
+        raise CustomerChurnException(e,sys)
+
+def get_feature_names(data: pd.DataFrame, ohe)->list:
+    cat_cols = list(ohe.feature_names_in_)
+    return [column for column in data.columns if column not in cat_cols] + list(ohe.get_feature_names_out())
+
+def encode_sparse(data: pd.DataFrame, ohe)->sp.csr_matrix:
+    try:
+        cat_cols = list(ohe.feature_names_in_)
+        numeric = data.drop(cat_cols, axis=1).to_numpy(dtype=float)
+        # Missing numeric values stay as explicit NaN entries so the imputer can still find them
+        return sp.hstack([sp.csr_matrix(numeric), ohe.transform(data[cat_cols])], format="csr")
+    except Exception as e:
+        raise CustomerChurnException(e,sys)
+
+def impute_sparse(matrix: sp.csr_matrix, preprocessor, feature_names: list)->sp.csr_matrix:
+    try:
+        output_mask = get_imputer_output_mask(preprocessor)
+        if output_mask is None:
+            output_mask = np.ones(matrix.shape[1], dtype=bool)
+
+        matrix = sp.csr_matrix(matrix)
+        missing_rows = np.unique(np.repeat(np.arange(matrix.shape[0]), np.diff(matrix.indptr))[np.isnan(matrix.data)])
+        output = matrix if output_mask.all() else matrix[:, np.flatnonzero(output_mask)].tocsr()
+        if len(missing_rows) == 0:
+            return output
+
+        # Only rows holding a NaN are densified and imputed, the rest of the matrix is never expanded
+        imputed = sp.coo_matrix(preprocessor.transform(
+            pd.DataFrame(matrix[missing_rows].toarray(), columns=feature_names)
+        ))
+        entry_rows = np.repeat(np.arange(output.shape[0]), np.diff(output.indptr))
+        kept = ~np.isin(entry_rows, missing_rows)
+        return sp.csr_matrix((
+            np.concatenate([output.data[kept], imputed.data]),
+            (np.concatenate([entry_rows[kept], missing_rows[imputed.row]]),
+             np.concatenate([output.indices[kept], imputed.col]))
+        ), shape=output.shape)
+    except Exception as e:
+        raise CustomerChurnException(e,sys)
+
+def transform_input(data: pd.DataFrame, ohe, preprocessor, sparse_output: bool = False):
+    try:
+        if sparse_output:
+            return impute_sparse(encode_sparse(data, ohe), preprocessor, get_feature_names(data, ohe))
 
         cat_cols = list(ohe.feature_names_in_)
 
@@ -39,12 +121,48 @@ def preprocess(data: pd.DataFrame)->float:
 
         column_encoded = pd.DataFrame(column_encoded, columns=ohe.get_feature_names_out(), index=data.index)
 
-        data.drop(cat_cols, axis=1, inplace=True)
+        data = data.drop(cat_cols, axis=1)
 
         data = pd.concat([data,column_encoded],axis=1)
-        
-        data = knn.transform(data)
+
+        return impute_missing_values(data, preprocessor)
+    except Exception as e:
+        raise CustomerChurnException(e,sys)
+
+def preprocess(data: pd.DataFrame)->float:
+    try:
+        training_pipeline_config = TrainingPipelineConfig()
+        model_trainer_config = ModelTrainerConfig(training_pipeline_config)
+
+        ohe = load_object(model_trainer_config.encoder_file_path)
+        knn = load_object(model_trainer_config.preprocessor_file_path)
+        model = load_object(model_trainer_config.model_file_path)
+
+        data = transform_input(data, ohe, knn)
 
         return data, model
     except Exception as e:
-        raise CustomerChurnException(e,sys)
\ No newline at end of file
+        raise CustomerChurnException(e,sys)
+
+def predict_proba_batch(data: pd.DataFrame, ohe, preprocessor, model, chunk_size: int, inference_graph=None,
+                        serving_metrics=None)->np.ndarray:
+    try:
+        predictions = np.empty(len(data), dtype=float)
+        for start in range(0, len(data), chunk_size):
+            chunk = data.iloc[start:start + chunk_size]
+            start_time = time.perf_counter()
+            if inference_graph is not None:
+                features = inference_graph.impute(inference_graph.encode_frame(chunk))
+            else:
+                features = as_model_input(model, transform_input(chunk, ohe, preprocessor))
+            preprocessed_time = time.perf_counter()
+            if inference_graph is not None:
+                predictions[start:start + len(chunk)] = inference_graph.predict_transformed(features)
+            else:
+                predictions[start:start + len(chunk)] = model.predict_proba(features)[:, 1]
+            if serving_metrics is not None:
+                serving_metrics.observe_stage("preprocessing", preprocessed_time - start_time)
+                serving_metrics.observe_stage("predict_proba", time.perf_counter() - preprocessed_time)
+        return predictions
+    except Exception as e:
+        raise CustomerChurnException(e,sys)
@@ -0,0 +1,150 @@
+import os
+import sys
+import json
+import math
+import hashlib
+import time
+import numpy as np
+
+from sklearn.base import clone
+from sklearn.metrics import f1_score
+from sklearn.model_selection import ParameterSampler, train_test_split
+
+from src.exception.exception import CustomerChurnException
+from src.logging.logger import logging
+from src.utils.main_utils import as_model_input, get_fit_params
+
+def _is_xgboost(model)->bool:
+    return type(model).__name__ == "XGBClassifier"
+
+class SuccessiveHalvingSearch:
+    def __init__(self, param_grid: dict, n_candidates: int = 16, eta: int = 3, min_resource: int = 500,
+                 time_budget: float = None, early_stopping_rounds: int = None, validation_size: float = 0.2,
+                 random_state: int = 42, cache_dir: str = None, resampler=None):
+        try:
+            self.param_grid = param_grid
+            self.n_candidates = n_candidates
+            self.eta = eta
+            self.min_resource = min_resource
+            self.time_budget = time_budget
+            self.early_stopping_rounds = early_stopping_rounds
+            self.validation_size = validation_size
+            self.random_state = random_state
+            self.cache_dir = cache_dir
+            self.resampler = resampler
+        except Exception as e:
+            raise CustomerChurnException(e,sys)
+
+    def _cache_file_path(self, model_name: str, data_fingerprint: str)->str:
+        file_name = "".join(char if char.isalnum() else "_" for char in model_name.lower()) + ".json"
+        return os.path.join(self.cache_dir, data_fingerprint, file_name)
+
+    def _load_cache(self, file_path: str)->dict:
+        if file_path is None or not os.path.exists(file_path):
+            return {}
+        with open(file_path, "r") as file:
+            return json.load(file)
+
+    def _save_cache(self, file_path: str, cache: dict):
+        if file_path is None:
+            return
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        temp_file_path = f"{file_path}.tmp"
+        with open(temp_file_path, "w") as file:
+            json.dump(cache, file)
+        os.replace(temp_file_path, file_path)
+
+    def _score(self, model, params: dict, X_fit, y_fit, X_val, y_val, w_fit=None)->tuple:
+        candidate = clone(model).set_params(**params)
+        X_fit, X_val = as_model_input(candidate, X_fit), as_model_input(candidate, X_val)
+        fit_params = get_fit_params(candidate, w_fit)
+        if _is_xgboost(candidate) and self.early_stopping_rounds:
+            candidate.set_params(early_stopping_rounds=self.early_stopping_rounds)
+            candidate.fit(X_fit, y_fit, eval_set=[(X_val, y_val)], verbose=False, **fit_params)
+            best_n_estimators = int(candidate.best_iteration) + 1
+        else:
+            candidate.fit(X_fit, y_fit, **fit_params)
+            best_n_estimators = None
+        return float(f1_score(y_val, candidate.predict(X_val))), best_n_estimators
+
+    def search(self, model_name: str, model, X, y, data_fingerprint: str, sample_weight=None)->dict:
+        try:
+            start_time = time.perf_counter()
+            deadline = None if self.time_budget is None else start_time + self.time_budget
+
+            w_fit = None
+            if sample_weight is None:
+                X_fit, X_val, y_fit, y_val = train_test_split(
+                    X, y, test_size=self.validation_size, stratify=y, random_state=self.random_state
+                )
+            else:
+                X_fit, X_val, y_fit, y_val, w_fit, _ = train_test_split(
+                    X, y, sample_weight, test_size=self.validation_size, stratify=y, random_state=self.random_state
+                )
+            if self.resampler is not None:
+                # Only the fit fold is resampled, synthetic rows built from it must never reach the validation fold
+                # that scores the halving rounds and drives early stopping
+                X_fit, y_fit, w_fit, _ = self.resampler.fit_resample(X_fit, y_fit)
+                resampler_settings = json.dumps(self.resampler.settings, sort_keys=True, default=str)
+                data_fingerprint = f"{data_fingerprint}_{hashlib.sha256(resampler_settings.encode()).hexdigest()[:8]}"
+            # A fixed shuffle makes every budget level a prefix of the next one
+            order = np.random.default_rng(self.random_state).permutation(X_fit.shape[0])
+
+            cache_file_path = None if self.cache_dir is None else self._cache_file_path(model_name, data_fingerprint)
+            cache = self._load_cache(cache_file_path)
+
+            candidates = list(ParameterSampler(self.param_grid, n_iter=self.n_candidates, random_state=self.random_state))
+            n_rounds = int(math.floor(math.log(max(len(candidates), 1), self.eta))) + 1
+            resource = max(self.min_resource, int(X_fit.shape[0] / self.eta ** (n_rounds - 1)))
+
+            best = None
+            evaluated, cached, budget_exhausted = 0, 0, False
+            for round_number in range(n_rounds):
+                resource = min(resource, X_fit.shape[0])
+                rows = order[:resource]
+                scores = []
+                for params in candidates:
+                    key = json.dumps({"params" : params, "resource" : resource}, sort_keys=True, default=str)
+                    if key in cache:
+                        cached += 1
+                    else:
+                        if deadline is not None and time.perf_counter() > deadline:
+                            budget_exhausted = True
+                            break
+                        score, best_n_estimators = self._score(
+                            model, params, X_fit[rows], y_fit[rows], X_val, y_val, None if w_fit is None else w_fit[rows]
+                        )
+                        cache[key] = {"score" : score, "best_n_estimators" : best_n_estimators}
+                        self._save_cache(cache_file_path, cache)
+                        evaluated += 1
+                    scores.append((cache[key]["score"], params, cache[key]["best_n_estimators"]))
+
+                if scores:
+                    # Stable sort keeps the sampling order on ties so the winner is deterministic
+                    scores.sort(key=lambda item: -item[0])
+                    best = scores[0]
+                if budget_exhausted or len(scores) <= 1 or resource >= X_fit.shape[0]:
+                    break
+                candidates = [params for _, params, _ in scores[:max(1, len(scores) // self.eta)]]
+                resource *= self.eta
+
+            best_score, best_params, best_n_estimators = best if best else (None, {}, None)
+            best_params = dict(best_params)
+            if best_n_estimators is not None:
+                best_params["n_estimators"] = best_n_estimators
+
+            elapsed = time.perf_counter() - start_time
+            logging.info(
+                f"{model_name} Search : best F1 {best_score}, params {best_params}, "
+                f"{evaluated} fitted, {cached} cached, {elapsed:.2f}s, budget exhausted {budget_exhausted}"
+            )
+            return {
+                "best_params" : best_params,
+                "best_score" : best_score,
+                "evaluated" : evaluated,
+                "cached" : cached,
+                "elapsed" : elapsed,
+                "budget_exhausted" : budget_exhausted
+            }
+        except Exception as e:
+            raise CustomerChurnException(e,sys)
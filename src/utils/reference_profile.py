@@ -0,0 +1,173 @@
+import sys
+import bisect
+import numpy as np
+import pandas as pd
+
+from src.exception.exception import CustomerChurnException
+from src.utils.drift_utils import population_stability_index
+
+OTHER_CATEGORY: str = "__other__"
+
+def build_reference_profile(dataframe: pd.DataFrame, numerical_columns: list, categorical_columns: list,
+                            bins: int = 20, quantiles: int = 101)->dict:
+    try:
+        profile = {"rows" : len(dataframe), "numerical" : {}, "categorical" : {}}
+        for column in numerical_columns:
+            values = pd.to_numeric(dataframe[column], errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+            present = np.sort(values[~np.isnan(values)])
+            if len(present) == 0:
+                continue
+            # Quantile edges give every training bin about the same mass, which keeps PSI stable in the tails
+            edges = np.unique(np.quantile(present, np.linspace(0, 1, bins + 1)[1:-1]))
+            counts = np.diff(np.concatenate([[0], np.searchsorted(present, edges, side="right"), [len(present)]]))
+            profile["numerical"][column] = {
+                "count" : int(len(present)),
+                "missing" : int(len(values) - len(present)),
+                "mean" : float(present.mean()),
+                "std" : float(present.std()),
+                "min" : float(present[0]),
+                "max" : float(present[-1]),
+                "quantiles" : np.quantile(present, np.linspace(0, 1, quantiles)).tolist(),
+                "edges" : edges.tolist(),
+                "counts" : counts.tolist()
+            }
+        for column in categorical_columns:
+            frequencies = dataframe[column].value_counts(dropna=True)
+            profile["categorical"][column] = {
+                "count" : int(frequencies.sum()),
+                "missing" : int(dataframe[column].isna().sum()),
+                "frequencies" : {str(category): int(count) for category, count in frequencies.items()}
+            }
+        return profile
+    except Exception as e:
+        raise CustomerChurnException(e,sys)
+
+class NumericalSketch:
+    def __init__(self, edges: list):
+        self.edges = list(edges)
+        self.counts = [0] * (len(self.edges) + 1)
+        self.count = 0
+        self.missing = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+
+    def update(self, value):
+        if value is None or value != value:
+            self.missing += 1
+            return
+        value = float(value)
+        self.counts[bisect.bisect_left(self.edges, value)] += 1
+        # Welford keeps mean and variance exact with O(1) state
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+
+    def update_array(self, values: np.ndarray):
+        values = pd.to_numeric(pd.Series(values), errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+        present = values[~np.isnan(values)]
+        self.missing += int(len(values) - len(present))
+        if len(present) == 0:
+            return
+        bin_counts = np.bincount(np.searchsorted(self.edges, present, side="left"), minlength=len(self.counts))
+        self.counts = (np.asarray(self.counts) + bin_counts).tolist()
+        # Chan's pairwise update merges the batch moments into the running ones
+        batch_count, batch_mean = len(present), float(present.mean())
+        batch_m2 = float(((present - batch_mean) ** 2).sum())
+        total = self.count + batch_count
+        delta = batch_mean - self.mean
+        self.mean += delta * batch_count / total
+        self._m2 += batch_m2 + delta ** 2 * self.count * batch_count / total
+        self.count = total
+
+    @property
+    def std(self)->float:
+        return (self._m2 / self.count) ** 0.5 if self.count else 0.0
+
+class CategoricalSketch:
+    def __init__(self, categories: list):
+        # Only training categories get a counter, everything unseen shares one, so memory stays fixed
+        self.counts = {category: 0 for category in categories}
+        self.other = 0
+        self.count = 0
+        self.missing = 0
+
+    def update(self, value):
+        if value is None or value != value:
+            self.missing += 1
+            return
+        value = str(value)
+        if value in self.counts:
+            self.counts[value] += 1
+        else:
+            self.other += 1
+        self.count += 1
+
+    def update_array(self, values: pd.Series):
+        values = pd.Series(values)
+        self.missing += int(values.isna().sum())
+        for category, count in values.dropna().astype(str).value_counts().items():
+            if category in self.counts:
+                self.counts[category] += int(count)
+            else:
+                self.other += int(count)
+            self.count += int(count)
+
+def create_sketches(profile: dict)->dict:
+    try:
+        sketches = {column: NumericalSketch(spec["edges"]) for column, spec in profile["numerical"].items()}
+        sketches.update({
+            column: CategoricalSketch(list(spec["frequencies"])) for column, spec in profile["categorical"].items()
+        })
+        return sketches
+    except Exception as e:
+        raise CustomerChurnException(e,sys)
+
+def compare_to_profile(profile: dict, sketches: dict, psi_threshold: float = 0.2, min_observations: int = 100)->dict:
+    try:
+        columns = {}
+        for column, spec in profile["numerical"].items():
+            sketch: NumericalSketch = sketches[column]
+            reference_counts = np.asarray(spec["counts"], dtype=np.float64)
+            live_counts = np.asarray(sketch.counts, dtype=np.float64)
+            # KS on the shared bin grid, a lower bound of the exact statistic that needs no raw values
+            reference_cdf = np.cumsum(reference_counts) / reference_counts.sum()
+            live_cdf = np.cumsum(live_counts) / live_counts.sum() if sketch.count else np.zeros_like(reference_cdf)
+            columns[column] = {
+                "type" : "numerical",
+                "observed" : sketch.count,
+                "missing" : sketch.missing,
+                "psi" : population_stability_index(reference_counts, live_counts),
+                "ks" : float(np.abs(reference_cdf - live_cdf).max()),
+                "mean" : sketch.mean,
+                "reference_mean" : spec["mean"],
+                "mean_shift" : (sketch.mean - spec["mean"]) / spec["std"] if spec["std"] > 0 else 0.0,
+                "std" : sketch.std,
+                "reference_std" : spec["std"]
+            }
+        for column, spec in profile["categorical"].items():
+            sketch: CategoricalSketch = sketches[column]
+            reference_counts = np.asarray(list(spec["frequencies"].values()) + [0], dtype=np.float64)
+            live_counts = np.asarray(list(sketch.counts.values()) + [sketch.other], dtype=np.float64)
+            columns[column] = {
+                "type" : "categorical",
+                "observed" : sketch.count,
+                "missing" : sketch.missing,
+                "psi" : population_stability_index(reference_counts, live_counts),
+                "unseen" : sketch.other,
+                "frequencies" : dict(sketch.counts, **{OTHER_CATEGORY : sketch.other})
+            }
+
+        for result in columns.values():
+            if result["observed"] < min_observations:
+                result["drift_status"] = None
+            else:
+                result["drift_status"] = result["psi"] > psi_threshold
+
+        return {
+            "drift_detected" : any(result["drift_status"] for result in columns.values()),
+            "reference_rows" : profile["rows"],
+            "columns" : columns
+        }
+    except Exception as e:
+        raise CustomerChurnException(e,sys)
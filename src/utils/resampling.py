@@ -0,0 +1,154 @@
+import os
+import sys
+import time
+import numpy as np
+import scipy.sparse as sp
+from sklearn.neighbors import NearestNeighbors
+from sklearn.utils.class_weight import compute_sample_weight
+
+from src.exception.exception import CustomerChurnException
+from src.logging.logger import logging
+from src.utils.main_utils import (
+    get_array_fingerprint, load_numpy_array_data, save_numpy_array_data, save_sparse_array_data
+)
+from src.utils.instrumentation import PeakMemoryMonitor
+
+RESAMPLING_STRATEGIES: tuple = ("smote", "class_weight", "undersample", "none")
+
+class Resampler:
+    def __init__(self, strategy: str = "smote", k_neighbors: int = 5, algorithm: str = "auto",
+                 max_rows: int = None, random_state: int = 42, cache_dir: str = None, n_jobs: int = -1):
+        try:
+            if strategy not in RESAMPLING_STRATEGIES:
+                raise ValueError(f"Unknown resampling strategy : {strategy}, expected one of {RESAMPLING_STRATEGIES}")
+            self.strategy = strategy
+            self.k_neighbors = k_neighbors
+            self.algorithm = algorithm
+            self.max_rows = max_rows
+            self.random_state = random_state
+            self.cache_dir = cache_dir
+            # Evaluation workers lower this to their own thread budget
+            self.n_jobs = n_jobs
+        except Exception as e:
+            raise CustomerChurnException(e,sys)
+
+    @property
+    def settings(self)->dict:
+        return {
+            "strategy" : self.strategy, "k_neighbors" : self.k_neighbors, "algorithm" : self.algorithm,
+            "max_rows" : self.max_rows, "random_state" : self.random_state
+        }
+
+    def _cache_file_path(self, *parts)->str:
+        if self.cache_dir is None:
+            return None
+        return os.path.join(self.cache_dir, "_".join(str(part) for part in parts) + ".npy")
+
+    def _minority_neighbors(self, X_minority, k: int)->tuple:
+        # The neighbor graph only depends on the minority rows, so any sampling setting can reuse it
+        cache_file_path = self._cache_file_path("neighbors", get_array_fingerprint(X_minority), k, self.algorithm)
+        if cache_file_path is not None and os.path.exists(cache_file_path):
+            return load_numpy_array_data(cache_file_path), True
+
+        index = NearestNeighbors(n_neighbors=k + 1, algorithm=self.algorithm, n_jobs=self.n_jobs).fit(X_minority)
+        neighbors = index.kneighbors(X_minority, return_distance=False)[:, 1:]
+        if cache_file_path is not None:
+            save_numpy_array_data(neighbors, cache_file_path)
+        return neighbors, False
+
+    def _smote(self, X, y, report: dict)->tuple:
+        classes, counts = np.unique(y, return_counts=True)
+        majority_count = counts.max()
+        rng = np.random.default_rng(self.random_state)
+        synthetic_X, synthetic_y = [], []
+        for label, count in zip(classes, counts):
+            n_samples = majority_count - count
+            if n_samples == 0:
+                continue
+            X_minority = X[np.flatnonzero(y == label)]
+            k = min(self.k_neighbors, count - 1)
+            if k < 1:
+                raise ValueError(f"Class {label} has {count} rows, SMOTE needs at least 2")
+            neighbors, reused = self._minority_neighbors(X_minority, k)
+            report["neighbors_reused"] = report.get("neighbors_reused", True) and reused
+
+            # Every synthetic row lies on the segment between a minority row and one of its neighbors
+            base = rng.integers(0, count, size=n_samples)
+            neighbor = neighbors[base, rng.integers(0, k, size=n_samples)]
+            gaps = rng.random(n_samples)
+            if sp.issparse(X_minority):
+                steps = sp.diags(gaps) @ (X_minority[neighbor] - X_minority[base])
+                synthetic_X.append(sp.csr_matrix(X_minority[base] + steps))
+            else:
+                synthetic_X.append(X_minority[base] + gaps[:, None] * (X_minority[neighbor] - X_minority[base]))
+            synthetic_y.append(np.full(n_samples, label, dtype=y.dtype))
+
+        if not synthetic_X:
+            return X, y
+        if sp.issparse(X):
+            X_resampled = sp.vstack([X] + synthetic_X, format="csr")
+        else:
+            X_resampled = np.vstack([np.asarray(X)] + synthetic_X)
+        return X_resampled, np.concatenate([y] + synthetic_y)
+
+    def _undersample(self, X, y)->tuple:
+        classes, counts = np.unique(y, return_counts=True)
+        minority_count = counts.min()
+        rng = np.random.default_rng(self.random_state)
+        rows = np.sort(np.concatenate([
+            rng.choice(np.flatnonzero(y == label), minority_count, replace=False) for label in classes
+        ]))
+        return X[rows], y[rows]
+
+    def _load_resampled(self, file_path: str)->tuple:
+        data = load_numpy_array_data(file_path)
+        if sp.issparse(data):
+            return data[:, :-1].tocsr(), data[:, -1].toarray().ravel()
+        return data[:, :-1], data[:, -1]
+
+    def _save_resampled(self, file_path: str, X, y):
+        if sp.issparse(X):
+            save_sparse_array_data(sp.hstack([X, sp.csr_matrix(y.reshape(-1, 1))], format="csr"), file_path)
+        else:
+            save_numpy_array_data(np.column_stack([X, y]), file_path)
+
+    def fit_resample(self, X, y)->tuple:
+        try:
+            start_time = time.perf_counter()
+            # RSS sampling instead of tracemalloc, which would slow every thread and end a caller's own tracing
+            with PeakMemoryMonitor() as memory_monitor:
+                X, y, sample_weight, report = self._fit_resample(X, y)
+            report.update({
+                "output_rows" : int(X.shape[0]),
+                "class_counts" : {str(label) : int(count) for label, count in zip(*np.unique(y, return_counts=True))},
+                "elapsed_ms" : round((time.perf_counter() - start_time) * 1000, 3),
+                "peak_memory_mb" : round(memory_monitor.peak_mb - memory_monitor.start_mb, 3)
+            })
+            return X, y, sample_weight, report
+        except Exception as e:
+            raise CustomerChurnException(e,sys)
+
+    def _fit_resample(self, X, y)->tuple:
+        y = np.asarray(y)
+        strategy = self.strategy
+        if strategy in ("smote", "undersample") and self.max_rows is not None and X.shape[0] > self.max_rows:
+            logging.info(f"{X.shape[0]} training rows exceed {self.max_rows}, using class weights instead of {strategy}")
+            strategy = "class_weight"
+
+        report = {"strategy" : strategy, "input_rows" : int(X.shape[0]), "cached" : False}
+        sample_weight = None
+        if strategy == "class_weight":
+            sample_weight = compute_sample_weight("balanced", y)
+        elif strategy in ("smote", "undersample"):
+            fingerprint = get_array_fingerprint(X, y)
+            cache_file_path = self._cache_file_path(
+                strategy, fingerprint, self.k_neighbors, self.algorithm, self.random_state
+            )
+            if cache_file_path is not None and os.path.exists(cache_file_path):
+                X, y = self._load_resampled(cache_file_path)
+                report["cached"] = True
+            else:
+                X, y = self._smote(X, y, report) if strategy == "smote" else self._undersample(X, y)
+                if cache_file_path is not None:
+                    self._save_resampled(cache_file_path, X, y)
+        return X, y, sample_weight, report
@@ -0,0 +1,93 @@
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+from src.exception.exception import CustomerChurnException
+from src.utils.main_utils import read_yaml_file
+
+NUMERIC_TYPES: tuple = ("int", "float")
+
+class SchemaValidator:
+    def __init__(self, schema: dict):
+        try:
+            # Each column spec is compiled once into the list of checks that apply to it
+            self.columns = {}
+            for column, spec in schema["columns"].items():
+                rules = ["dtype"]
+                if spec.get("nullable", True) is False:
+                    rules.append("nullable")
+                if "min" in spec or "max" in spec:
+                    rules.append("range")
+                if "allowed" in spec:
+                    rules.append("allowed")
+                self.columns[column] = {
+                    "type" : spec["type"],
+                    "min" : spec.get("min"),
+                    "max" : spec.get("max"),
+                    "allowed" : None if "allowed" not in spec else pd.Index([str(value) for value in spec["allowed"]]),
+                    "rules" : rules
+                }
+        except Exception as e:
+            raise CustomerChurnException(e,sys)
+
+    @classmethod
+    def from_yaml(cls, schema_file_path: str):
+        try:
+            return cls(read_yaml_file(schema_file_path))
+        except Exception as e:
+            raise CustomerChurnException(e,sys)
+
+    def _column_masks(self, series: pd.Series, spec: dict)->dict:
+        masks = {}
+        missing = series.isna().to_numpy()
+        if spec["type"] in NUMERIC_TYPES:
+            values = pd.to_numeric(series, errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+            not_numeric = np.isnan(values) & ~missing
+            if spec["type"] == "int":
+                not_numeric |= np.isfinite(values) & (values != np.floor(values))
+            masks["dtype"] = not_numeric
+            if "range" in spec["rules"]:
+                out_of_range = np.zeros(len(values), dtype=bool)
+                # NaN compares False on both sides, so missing values never fail a range rule
+                if spec["min"] is not None:
+                    out_of_range |= values < spec["min"]
+                if spec["max"] is not None:
+                    out_of_range |= values > spec["max"]
+                masks["range"] = out_of_range
+        else:
+            masks["dtype"] = np.zeros(len(series), dtype=bool)
+            if "allowed" in spec["rules"]:
+                values = series if pd.api.types.is_string_dtype(series) else series.astype(str)
+                masks["allowed"] = ~values.isin(spec["allowed"]).to_numpy() & ~missing
+        if "nullable" in spec["rules"]:
+            masks["nullable"] = missing
+        return masks
+
+    def validate(self, dataframe: pd.DataFrame)->tuple:
+        try:
+            start_time = time.perf_counter()
+            missing_columns = [column for column in self.columns if column not in dataframe.columns]
+            unexpected_columns = [column for column in dataframe.columns if column not in self.columns]
+
+            invalid = np.zeros(len(dataframe), dtype=bool)
+            rules = {}
+            for column, spec in self.columns.items():
+                if column in missing_columns:
+                    continue
+                for rule, mask in self._column_masks(dataframe[column], spec).items():
+                    rules[f"{column}.{rule}"] = int(mask.sum())
+                    invalid |= mask
+
+            report = {
+                "status" : not missing_columns and not invalid.any(),
+                "rows" : len(dataframe),
+                "invalid_rows" : int(invalid.sum()),
+                "missing_columns" : missing_columns,
+                "unexpected_columns" : unexpected_columns,
+                "rules" : rules,
+                "elapsed_ms" : round((time.perf_counter() - start_time) * 1000, 3)
+            }
+            return ~invalid, report
+        except Exception as e:
+            raise CustomerChurnException(e,sys)
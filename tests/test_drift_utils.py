@@ -0,0 +1,31 @@
+import numpy as np
+import pytest
+from scipy.stats import ks_2samp, wasserstein_distance
+
+from src.utils.drift_utils import numerical_drift
+
+SAMPLES = {
+    "continuous" : lambda rng: (rng.normal(0, 1, 800), rng.normal(0.3, 1.2, 500)),
+    "tied" : lambda rng: (rng.integers(0, 12, 800).astype(float), rng.integers(2, 14, 500).astype(float)),
+    "identical" : lambda rng: (np.arange(200, dtype=float), np.arange(200, dtype=float))
+}
+
+@pytest.mark.parametrize("sample", list(SAMPLES))
+def test_ks_matches_scipy(sample):
+    base, current = SAMPLES[sample](np.random.default_rng(0))
+    result = numerical_drift(base, current, ["ks"])["ks"]
+    expected = ks_2samp(base, current, method="asymp")
+    assert result["statistic"] == pytest.approx(expected.statistic, abs=1e-12)
+    assert result["pvalue"] == pytest.approx(expected.pvalue, rel=1e-9, abs=1e-12)
+
+@pytest.mark.parametrize("sample", list(SAMPLES))
+def test_wasserstein_matches_scipy(sample):
+    base, current = SAMPLES[sample](np.random.default_rng(0))
+    result = numerical_drift(base, current, ["wasserstein"])["wasserstein"]
+    assert result["statistic"] == pytest.approx(wasserstein_distance(base, current), rel=1e-9, abs=1e-12)
+
+def test_missing_values_are_ignored():
+    rng = np.random.default_rng(1)
+    base, current = rng.normal(0, 1, 300), rng.normal(0, 1, 300)
+    with_missing = np.concatenate([current, [np.nan] * 20])
+    assert numerical_drift(base, with_missing, ["ks", "wasserstein"]) == numerical_drift(base, current, ["ks", "wasserstein"])
@@ -0,0 +1,18 @@
+import numpy as np
+import pytest
+
+from src.constant.training import DATA_TRANSFORMATION_IMPUTER_STRATEGY_PARAMS
+from src.utils.imputers import get_imputer
+
+SUPPORTED_STRATEGIES = ("knn", "knn_index", "mean", "median", "most_frequent", "iterative")
+
+@pytest.mark.parametrize("strategy", SUPPORTED_STRATEGIES)
+def test_every_supported_strategy_builds_and_imputes(strategy):
+    X = np.array([[1.0, 2.0], [np.nan, 3.0], [4.0, np.nan], [5.0, 6.0], [2.0, 2.0]])
+    imputer = get_imputer(strategy, DATA_TRANSFORMATION_IMPUTER_STRATEGY_PARAMS[strategy])
+    imputed = imputer.fit(X).transform(X)
+    assert imputed.shape == X.shape
+    assert not np.isnan(imputed).any()
+
+def test_every_supported_strategy_has_params():
+    assert set(SUPPORTED_STRATEGIES) <= set(DATA_TRANSFORMATION_IMPUTER_STRATEGY_PARAMS)
@@ -0,0 +1,85 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.preprocessing import OneHotEncoder
+from sklearn.impute import KNNImputer
+from sklearn.pipeline import Pipeline
+from sklearn.linear_model import LogisticRegression
+from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier
+from sklearn.neighbors import KNeighborsClassifier
+from xgboost import XGBClassifier
+
+from src.exception.exception import CustomerChurnException
+from src.components.model_trainer import ModelTrainer
+from src.utils.inference_graph import compile_inference_graph
+from src.utils.ml_utils import transform_input, predict_proba_batch
+
+CATEGORICAL_COLUMNS = ["contract", "payment_method"]
+
+MODELS = {
+    "Logistic Regression" : lambda: LogisticRegression(max_iter=1000),
+    "Random Forest Classifier" : lambda: RandomForestClassifier(n_estimators=20, max_depth=5, random_state=42),
+    "Gradient Boosting Classifier" : lambda: GradientBoostingClassifier(n_estimators=20, random_state=42),
+    "XGBoost Classifier" : lambda: XGBClassifier(n_estimators=20, max_depth=4, random_state=42)
+}
+
+def make_frame(n_rows: int, random_state: int)->pd.DataFrame:
+    rng = np.random.default_rng(random_state)
+    data = pd.DataFrame({
+        "tenure" : rng.integers(0, 72, n_rows).astype(float),
+        "monthly_charges" : rng.normal(70, 30, n_rows).round(2),
+        "contract" : rng.choice(["Month-to-month", "One year", "Two year"], n_rows),
+        "payment_method" : rng.choice(["Electronic check", "Mailed check", "Credit card"], n_rows)
+    })
+    # Missing numerics exercise the imputer on both paths
+    data.loc[rng.random(n_rows) < 0.1, "tenure"] = np.nan
+    data.loc[rng.random(n_rows) < 0.1, "monthly_charges"] = np.nan
+    return data
+
+@pytest.fixture(scope="module")
+def fitted_transformers():
+    train = make_frame(400, random_state=0)
+    ohe = OneHotEncoder(handle_unknown="ignore").fit(train[CATEGORICAL_COLUMNS])
+    encoded = pd.concat([
+        train.drop(CATEGORICAL_COLUMNS, axis=1),
+        pd.DataFrame(ohe.transform(train[CATEGORICAL_COLUMNS]).toarray(), columns=ohe.get_feature_names_out(), index=train.index)
+    ], axis=1)
+    preprocessor = Pipeline([("imputer", KNNImputer(n_neighbors=3))]).fit(encoded)
+
+    X = transform_input(train, ohe, preprocessor)
+    y = ((train["contract"] == "Month-to-month") & (train["tenure"].fillna(36) < 24)).astype(int).to_numpy()
+    return ohe, preprocessor, X, y
+
+@pytest.mark.parametrize("model_name", list(MODELS))
+def test_compiled_graph_matches_the_sklearn_path(fitted_transformers, model_name):
+    ohe, preprocessor, X, y = fitted_transformers
+    model = MODELS[model_name]().fit(X, y)
+    inference_graph = compile_inference_graph(ohe, preprocessor, model)
+
+    data = make_frame(300, random_state=1)
+    expected = predict_proba_batch(data, ohe, preprocessor, model, chunk_size=128)
+    actual = predict_proba_batch(data, None, None, None, chunk_size=128, inference_graph=inference_graph)
+    np.testing.assert_allclose(actual, expected, atol=1e-6)
+
+def test_unsupported_estimators_fall_back_to_the_pickled_model(fitted_transformers, tmp_path):
+    ohe, preprocessor, X, y = fitted_transformers
+    model = KNeighborsClassifier().fit(X, y)
+    with pytest.raises(CustomerChurnException, match="cannot be compiled"):
+        compile_inference_graph(ohe, preprocessor, model)
+
+    # The trainer skips the export instead of failing the run, serving keeps using the pickles
+    model_trainer = ModelTrainer.__new__(ModelTrainer)
+    model_trainer.model_trainer_config = type("Config", (), {
+        name : str(tmp_path / f"{name}.bin")
+        for name in ("encoder_file_path", "preprocessor_file_path", "model_file_path", "inference_graph_file_path")
+    })()
+    for name in ("encoder_file_path", "preprocessor_file_path", "model_file_path"):
+        (tmp_path / f"{name}.bin").write_bytes(b"")
+    assert model_trainer.export_inference_graph(ohe, preprocessor, model) is False
+    assert not os.path.exists(model_trainer.model_trainer_config.inference_graph_file_path)
+
+    data = make_frame(50, random_state=2)
+    predictions = predict_proba_batch(data, ohe, preprocessor, model, chunk_size=16)
+    assert predictions.shape == (50,)
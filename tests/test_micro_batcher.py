@@ -0,0 +1,66 @@
+import asyncio
+
+import pytest
+
+from src.serving.micro_batcher import MicroBatcher
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+def test_every_caller_gets_its_own_prediction_in_order():
+    batch_sizes = []
+    def score_batch(records):
+        batch_sizes.append(len(records))
+        return [record["x"] * 2 for record in records]
+
+    async def scenario():
+        micro_batcher = MicroBatcher(score_batch, max_batch_size=16, max_wait_ms=5.0)
+        await micro_batcher.start()
+        try:
+            return await asyncio.gather(*[micro_batcher.submit({"x" : x}) for x in range(100)])
+        finally:
+            await micro_batcher.stop()
+
+    assert run(scenario()) == [x * 2 for x in range(100)]
+    # Concurrent requests share batches, none exceeds the size limit
+    assert max(batch_sizes) == 16
+    assert len(batch_sizes) < 100
+
+def test_a_lone_request_does_not_wait_for_the_window():
+    async def scenario():
+        micro_batcher = MicroBatcher(lambda records: [0.5] * len(records), max_wait_ms=10000.0)
+        await micro_batcher.start()
+        try:
+            return await asyncio.wait_for(micro_batcher.submit({"x" : 1}), timeout=1.0), micro_batcher.metrics()
+        finally:
+            await micro_batcher.stop()
+
+    prediction, metrics = run(scenario())
+    assert prediction == 0.5
+    assert metrics["flushed_on_idle"] == 1
+
+def test_a_failed_batch_only_fails_its_own_requests():
+    def score_batch(records):
+        if any(record["x"] < 0 for record in records):
+            raise ValueError("bad batch")
+        return [record["x"] for record in records]
+
+    async def scenario():
+        micro_batcher = MicroBatcher(score_batch, max_batch_size=4, max_wait_ms=5.0)
+        await micro_batcher.start()
+        try:
+            failed = await asyncio.gather(*[micro_batcher.submit({"x" : x}) for x in (1, -1, 2)], return_exceptions=True)
+            # The batcher keeps serving once a batch has failed
+            succeeded = await asyncio.gather(*[micro_batcher.submit({"x" : x}) for x in (3, 4)])
+            return failed, succeeded, micro_batcher.metrics()
+        finally:
+            await micro_batcher.stop()
+
+    failed, succeeded, metrics = run(scenario())
+    assert all(isinstance(result, ValueError) for result in failed)
+    assert succeeded == [3, 4]
+    assert metrics["failed_batches"] == 1
+
+def test_submit_requires_a_started_batcher():
+    with pytest.raises(RuntimeError):
+        run(MicroBatcher(lambda records: records).submit({"x" : 1}))
@@ -0,0 +1,52 @@
+import os
+import shutil
+
+import pytest
+
+from src.entity.config_entity import TrainingPipelineConfig, ModelTrainerConfig
+from src.serving.model_registry import ModelRegistry
+from src.utils.main_utils import write_artifact_manifest
+
+REPO_FINAL_MODELS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "final_models")
+
+def get_registry(final_models_dir: str)->ModelRegistry:
+    return ModelRegistry(ModelTrainerConfig(TrainingPipelineConfig(final_models=final_models_dir)))
+
+def publish(model_trainer_config: ModelTrainerConfig):
+    write_artifact_manifest(model_trainer_config.manifest_file_path, {
+        "encoder" : model_trainer_config.encoder_file_path,
+        "preprocessor" : model_trainer_config.preprocessor_file_path,
+        "model" : model_trainer_config.model_file_path
+    })
+
+def test_loads_the_shipped_models_without_a_manifest():
+    registry = get_registry(REPO_FINAL_MODELS_DIR)
+    bundle = registry.load()
+    assert registry.is_loaded
+    assert bundle.model is not None
+    # Legacy pickles are not watched, nothing changes until a manifest is published
+    assert registry.reload_if_changed() is False
+
+def test_a_published_manifest_replaces_the_legacy_load(tmp_path):
+    final_models_dir = str(tmp_path / "final_models")
+    shutil.copytree(REPO_FINAL_MODELS_DIR, final_models_dir)
+    registry = get_registry(final_models_dir)
+    legacy_version = registry.load().version
+
+    publish(registry.model_trainer_config)
+    assert registry.reload_if_changed() is True
+    assert registry.bundle.version == legacy_version
+
+def test_artifacts_that_do_not_match_the_manifest_are_refused(tmp_path):
+    final_models_dir = str(tmp_path / "final_models")
+    shutil.copytree(REPO_FINAL_MODELS_DIR, final_models_dir)
+    registry = get_registry(final_models_dir)
+    publish(registry.model_trainer_config)
+    version = registry.load().version
+
+    with open(registry.model_trainer_config.model_file_path, "ab") as file:
+        file.write(b"partially written")
+    os.utime(registry.model_trainer_config.manifest_file_path, ns=(0, 0))
+    with pytest.raises(Exception):
+        registry.reload_if_changed()
+    assert registry.bundle.version == version
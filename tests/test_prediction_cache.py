@@ -0,0 +1,29 @@
+from src.serving.prediction_cache import PredictionCache
+
+FIELDS = ("tenure", "contract")
+RECORD = {"tenure" : 12, "contract" : "One year"}
+
+def test_hits_only_for_the_version_that_scored():
+    cache = PredictionCache(FIELDS, max_size=8, ttl=None)
+    assert cache.get("v1", RECORD) is None
+    cache.put("v1", RECORD, 0.25)
+    assert cache.get("v1", {"contract" : "One year", "tenure" : 12}) == 0.25
+
+def test_a_new_version_invalidates_every_entry():
+    cache = PredictionCache(FIELDS, max_size=8, ttl=None)
+    cache.get("v1", RECORD)
+    cache.put("v1", RECORD, 0.25)
+    assert cache.get("v2", RECORD) is None
+    stats = cache.stats()
+    assert stats["version"] == "v2"
+    assert stats["size"] == 0
+    assert stats["invalidations"] == 1
+
+def test_results_from_a_replaced_version_are_not_stored():
+    cache = PredictionCache(FIELDS, max_size=8, ttl=None)
+    cache.get("v1", RECORD)
+    # The request was scored by v1, but v2 was swapped in while it was in flight
+    cache.get("v2", {"tenure" : 1, "contract" : "Two year"})
+    cache.put("v1", RECORD, 0.25)
+    assert cache.get("v2", RECORD) is None
+    assert cache.stats()["size"] == 0
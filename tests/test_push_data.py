@@ -0,0 +1,72 @@
+import pandas as pd
+import pytest
+from bson import ObjectId
+from pymongo.errors import AutoReconnect, BulkWriteError, DuplicateKeyError
+
+import push_data
+from push_data import CustomerDataExtract
+
+mongomock = pytest.importorskip("mongomock")
+
+class FlakyCollection:
+    # Stands in for a server that drops the connection part way through a batch and rejects some documents
+    def __init__(self, collection, dropped_connections: int = 0, rejected_ids: set = frozenset()):
+        self.collection = collection
+        self.dropped_connections = dropped_connections
+        self.rejected_ids = rejected_ids
+        self.calls = 0
+
+    def insert_many(self, records: list, ordered: bool = True):
+        self.calls += 1
+        for record in records:
+            # pymongo stamps the _id on the caller's documents before sending them
+            record.setdefault("_id", ObjectId())
+        if self.dropped_connections:
+            self.dropped_connections -= 1
+            self.collection.insert_many(records[:len(records) // 2])
+            raise AutoReconnect("connection dropped")
+
+        inserted, write_errors = 0, []
+        for index, record in enumerate(records):
+            if record["CustomerId"] in self.rejected_ids:
+                write_errors.append({"index" : index, "code" : 121, "errmsg" : "Document failed validation"})
+                continue
+            try:
+                self.collection.insert_one(record)
+                inserted += 1
+            except DuplicateKeyError:
+                write_errors.append({"index" : index, "code" : push_data.DUPLICATE_KEY_ERROR_CODE, "errmsg" : "E11000"})
+        if write_errors:
+            raise BulkWriteError({"writeErrors" : write_errors, "nInserted" : inserted})
+        return type("InsertManyResult", (), {"inserted_ids" : [record["_id"] for record in records]})()
+
+def make_records(n_records: int)->list:
+    return [{"CustomerId" : customer_id, "Balance" : float(customer_id)} for customer_id in range(n_records)]
+
+def test_retried_batch_counts_records_an_earlier_attempt_landed():
+    collection = FlakyCollection(mongomock.MongoClient().db.customers, dropped_connections=1)
+    inserted = CustomerDataExtract().insert_batch(collection, make_records(10), max_retries=2, retry_backoff=0)
+    assert inserted == 10
+    assert collection.calls == 2
+    assert collection.collection.count_documents({}) == 10
+
+def test_failed_batch_reports_what_it_inserted():
+    collection = FlakyCollection(mongomock.MongoClient().db.customers, dropped_connections=1, rejected_ids={7})
+    with pytest.raises(BulkWriteError) as error:
+        CustomerDataExtract().insert_batch(collection, make_records(10), max_retries=2, retry_backoff=0)
+    assert error.value.inserted == 9
+    assert collection.collection.count_documents({}) == 9
+
+def test_bulk_insert_report_includes_partially_failed_batches(tmp_path, monkeypatch):
+    file_path = tmp_path / "customers.csv"
+    pd.DataFrame(make_records(25)).to_csv(file_path, index=False)
+    collection = FlakyCollection(mongomock.MongoClient().db.customers, rejected_ids={3, 12})
+    monkeypatch.setattr(push_data.pymongo, "MongoClient", lambda *args, **kwargs: {"db" : {"customers" : collection}})
+
+    report = CustomerDataExtract().bulk_insert_csv(
+        str(file_path), "db", "customers", chunk_size=10, batch_size=5, max_workers=2, max_retries=1
+    )
+    assert report["records"] == 25
+    assert report["batches"] == 5
+    assert report["failed_batches"] == 2
+    assert report["inserted"] == 23 == collection.collection.count_documents({})